@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+from unittest import TestCase
+
+import motorengine
+
+
+class MotorDocument(motorengine.Document):
+    field1 = motorengine.StringField()
+    field2 = motorengine.IntField()
+    field3 = motorengine.ReferenceField('benchmark.test_attribute_access.MotorDocument')
+
+
+class InterceptedMotorDocument(MotorDocument):
+    # attribute access as it was done before fields became descriptors
+    def __getattribute__(self, name):
+        if name in ['_fields']:
+            return object.__getattribute__(self, name)
+
+        if name in self._fields:
+            field = self._fields[name]
+            is_reference_field = self.is_reference_field(field)
+            value = field.get_value(self._values.get(name, None))
+
+            if is_reference_field and value is not None and not isinstance(value, field.reference_type):
+                raise motorengine.errors.LoadReferencesRequiredError(name)
+
+            return value
+
+        return object.__getattribute__(self, name)
+
+
+class TestAttributeAccess(TestCase):
+    def run_attribute_reads(self, document, iterations):
+        start = time.time()
+
+        for i in range(iterations):
+            document.field1
+            document.field2
+            document.field3
+            document.is_lazy
+            document.save
+
+        return time.time() - start
+
+    def test_attribute_access(self):
+        iterations = 100000
+        reads = iterations * 5
+
+        intercepted_time = self.run_attribute_reads(
+            InterceptedMotorDocument(field1="whatever", field2=10), iterations
+        )
+        descriptor_time = self.run_attribute_reads(
+            MotorDocument(field1="whatever", field2=10), iterations
+        )
+
+        print
+        print
+        print("[__getattribute__] %d attribute reads done in %.2fs (%.2f reads/s)" % (reads, intercepted_time, (float(reads) / intercepted_time)))
+        print("[Descriptors] %d attribute reads done in %.2fs (%.2f reads/s)" % (reads, descriptor_time, (float(reads) / descriptor_time)))
+        print
+        print
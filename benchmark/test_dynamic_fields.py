@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+from unittest import TestCase
+
+import motorengine
+
+
+class MotorDocument(motorengine.Document):
+    field1 = motorengine.StringField()
+    field2 = motorengine.IntField()
+    field3 = motorengine.StringField()
+
+
+class TestDynamicFields(TestCase):
+    def run_round_trips(self, iterations):
+        son = MotorDocument(field1="whatever", field2=10, field3="other").to_son()
+        start = time.time()
+
+        for i in range(iterations):
+            document = MotorDocument.from_son(dict(son))
+            document.validate()
+            document.to_son()
+
+        return time.time() - start
+
+    def ingest_dynamic_keys(self, documents, keys_per_document):
+        for i in range(documents):
+            son = dict(
+                ("dynamic_%d_%d" % (i, j), j) for j in range(keys_per_document)
+            )
+            son["field1"] = "whatever"
+            MotorDocument.from_son(son)
+
+    def test_dynamic_fields(self):
+        iterations = 10000
+        documents = 10000
+        keys_per_document = 5
+
+        before_time = self.run_round_trips(iterations)
+        self.ingest_dynamic_keys(documents, keys_per_document)
+        after_time = self.run_round_trips(iterations)
+
+        print
+        print
+        print("[Before] %d round trips done in %.2fs (%.2f ops/s)" % (iterations, before_time, (float(iterations) / before_time)))
+        print("[After %d distinct dynamic keys] %d round trips done in %.2fs (%.2f ops/s) - %d class fields" % (
+            documents * keys_per_document, iterations, after_time, (float(iterations) / after_time), len(MotorDocument._fields)
+        ))
+        print
+        print
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+from unittest import TestCase
+
+import motorengine
+from motorengine import serializers
+
+
+FIELD_COUNT = 40
+
+WideDocument = type('WideDocument', (motorengine.Document, ), dict(
+    ('field%d' % index, motorengine.StringField(db_field='db_field%d' % index))
+    for index in range(FIELD_COUNT)
+))
+
+
+class LinearScanWideDocument(WideDocument):
+    # db_field lookup as it was done before the per-class index
+    @classmethod
+    def get_field_by_db_name(cls, name):
+        for field_name, field in cls._fields.items():
+            if name == field.db_field or name.lstrip("_") == field.db_field:
+                return field
+        return None
+
+
+def get_son():
+    return dict(
+        ('db_field%d' % index, 'value %d' % index)
+        for index in range(FIELD_COUNT)
+    )
+
+
+class TestFromSon(TestCase):
+    def setUp(self):
+        # compiled serializers never look fields up by db_field
+        serializers.COMPILE_SERIALIZERS = False
+
+    def tearDown(self):
+        serializers.COMPILE_SERIALIZERS = True
+
+    def run_from_son(self, document_class, iterations):
+        start = time.time()
+
+        for i in range(iterations):
+            document_class.from_son(get_son())
+
+        return time.time() - start
+
+    def test_from_son(self):
+        iterations = 5000
+
+        linear_time = self.run_from_son(LinearScanWideDocument, iterations)
+        indexed_time = self.run_from_son(WideDocument, iterations)
+
+        print
+        print
+        print("[Linear scan] %d from_son calls (%d fields) done in %.2fs (%.2f ops/s)" % (iterations, FIELD_COUNT, linear_time, (float(iterations) / linear_time)))
+        print("[db_field index] %d from_son calls (%d fields) done in %.2fs (%.2f ops/s)" % (iterations, FIELD_COUNT, indexed_time, (float(iterations) / indexed_time)))
+        print
+        print
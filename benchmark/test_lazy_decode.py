@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+from datetime import datetime
+from decimal import Decimal
+from unittest import TestCase
+
+import motorengine
+
+
+class MotorEmbeddedDocument(motorengine.Document):
+    field1 = motorengine.StringField()
+    field2 = motorengine.DateTimeField()
+
+
+class MotorDocument(motorengine.Document):
+    field1 = motorengine.StringField()
+    field2 = motorengine.IntField()
+    field3 = motorengine.DateTimeField()
+    field4 = motorengine.DecimalField()
+    field5 = motorengine.EmbeddedDocumentField(MotorEmbeddedDocument)
+    field6 = motorengine.ListField(motorengine.EmbeddedDocumentField(MotorEmbeddedDocument))
+    field7 = motorengine.ListField(motorengine.DateTimeField())
+    field8 = motorengine.DecimalField()
+    field9 = motorengine.DateTimeField()
+    field10 = motorengine.StringField()
+
+
+def get_son():
+    return MotorDocument(
+        field1="whatever", field2=10, field3=datetime.now(), field4=Decimal("10.20"),
+        field5=MotorEmbeddedDocument(field1="a", field2=datetime.now()),
+        field6=[MotorEmbeddedDocument(field1="b", field2=datetime.now()) for i in range(10)],
+        field7=[datetime.now() for i in range(10)], field8=Decimal("1.5"),
+        field9=datetime.now(), field10="other"
+    ).to_son()
+
+
+class TestLazyDecode(TestCase):
+    def run_list_page(self, iterations, lazy_decode):
+        son = get_son()
+        start = time.time()
+
+        for i in range(iterations):
+            document = MotorDocument.from_son(dict(son), _lazy_decode=lazy_decode)
+            document.field1
+            document.field2
+            document.field10
+
+        return time.time() - start
+
+    def test_lazy_decode(self):
+        iterations = 5000
+
+        eager_time = self.run_list_page(iterations, lazy_decode=False)
+        lazy_time = self.run_list_page(iterations, lazy_decode=True)
+
+        print
+        print
+        print("[Eager] %d documents loaded (3 fields read) in %.2fs (%.2f docs/s)" % (iterations, eager_time, (float(iterations) / eager_time)))
+        print("[Lazy] %d documents loaded (3 fields read) in %.2fs (%.2f docs/s)" % (iterations, lazy_time, (float(iterations) / lazy_time)))
+        print
+        print
@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+from unittest import TestCase
+
+import motorengine
+from motorengine import Q, Param
+
+
+class MotorDocument(motorengine.Document):
+    field1 = motorengine.StringField()
+    field2 = motorengine.IntField()
+    field3 = motorengine.DateTimeField()
+
+
+class TestPreparedQuery(TestCase):
+    def test_prepared_query(self):
+        iterations = 10000
+
+        start = time.time()
+        for i in range(iterations):
+            queryset = MotorDocument.objects.filter(field1="name %d" % i, field2__gt=i)
+            queryset.get_query_from_filters(queryset._filters)
+        filter_time = time.time() - start
+
+        prepared = MotorDocument.objects.prepare(Q(field1=Param('name'), field2__gt=Param('value')))
+        start = time.time()
+        for i in range(iterations):
+            queryset = prepared.bind(name="name %d" % i, value=i)
+            queryset.get_query_from_filters(queryset._filters)
+        prepared_time = time.time() - start
+
+        print
+        print
+        print("[Filter] %d queries built in %.2fs (%.2f ops/s)" % (iterations, filter_time, (float(iterations) / filter_time)))
+        print("[Prepared] %d queries built in %.2fs (%.2f ops/s)" % (iterations, prepared_time, (float(iterations) / prepared_time)))
+        print
+        print
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+from unittest import TestCase
+
+import motorengine
+from motorengine import Q
+from motorengine.query_builder.cache import query_cache
+
+
+class MotorEmbeddedDocument(motorengine.Document):
+    field1 = motorengine.StringField(db_field="f1")
+
+
+class MotorDocument(motorengine.Document):
+    field1 = motorengine.StringField()
+    field2 = motorengine.IntField()
+    field3 = motorengine.EmbeddedDocumentField(MotorEmbeddedDocument)
+    field4 = motorengine.ListField(motorengine.IntField())
+
+
+def get_query(index):
+    return (
+        Q(field1="name %d" % index) & Q(field2__gt=index) & Q(field3__field1__startswith="a")
+    ) | Q(field2__in=[index, index + 1], field4=[index])
+
+
+class TestQueryCache(TestCase):
+    def run_queries(self, iterations, cached):
+        start = time.time()
+
+        for i in range(iterations):
+            query = get_query(i)
+            if cached:
+                query.to_query(MotorDocument)
+            else:
+                query.compile_query(MotorDocument)
+
+        return time.time() - start
+
+    def test_query_cache(self):
+        iterations = 10000
+        query_cache.clear()
+
+        compiled_time = self.run_queries(iterations, cached=False)
+        cached_time = self.run_queries(iterations, cached=True)
+
+        print
+        print
+        print("[Compiled] %d queries done in %.2fs (%.2f ops/s)" % (iterations, compiled_time, (float(iterations) / compiled_time)))
+        print("[Cached] %d queries done in %.2fs (%.2f ops/s) - %d hits, %d misses" % (iterations, cached_time, (float(iterations) / cached_time), query_cache.hits, query_cache.misses))
+        print
+        print
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+from datetime import datetime
+from unittest import TestCase
+
+import motorengine
+from motorengine import serializers
+
+
+class MotorEmbeddedDocument(motorengine.Document):
+    field1 = motorengine.StringField()
+    field2 = motorengine.IntField()
+
+
+class MotorDocument(motorengine.Document):
+    field1 = motorengine.StringField()
+    field2 = motorengine.IntField()
+    field3 = motorengine.DateTimeField()
+    field4 = motorengine.BooleanField()
+    field5 = motorengine.StringField(sparse=True)
+    field6 = motorengine.ListField(motorengine.StringField())
+    field7 = motorengine.EmbeddedDocumentField(MotorEmbeddedDocument)
+    field8 = motorengine.ListField(motorengine.EmbeddedDocumentField(MotorEmbeddedDocument))
+    field9 = motorengine.StringField(db_field="db_field9")
+    field10 = motorengine.FloatField()
+
+
+def get_document():
+    return MotorDocument(
+        field1="whatever", field2=10, field3=datetime.now(), field4=True,
+        field6=["a", "b", "c"], field7=MotorEmbeddedDocument(field1="a", field2=1),
+        field8=[MotorEmbeddedDocument(field1="b", field2=2) for i in range(5)],
+        field9="other", field10=1.5
+    )
+
+
+class TestSerializers(TestCase):
+    def tearDown(self):
+        serializers.COMPILE_SERIALIZERS = True
+
+    def run_to_son(self, iterations):
+        document = get_document()
+        start = time.time()
+
+        for i in range(iterations):
+            document.to_son()
+
+        return time.time() - start
+
+    def run_from_son(self, iterations):
+        son = get_document().to_son()
+        start = time.time()
+
+        for i in range(iterations):
+            MotorDocument.from_son(dict(son))
+
+        return time.time() - start
+
+    def test_serializers(self):
+        iterations = 10000
+
+        serializers.COMPILE_SERIALIZERS = False
+        generic_to_son_time = self.run_to_son(iterations)
+        generic_from_son_time = self.run_from_son(iterations)
+
+        serializers.COMPILE_SERIALIZERS = True
+        compiled_to_son_time = self.run_to_son(iterations)
+        compiled_from_son_time = self.run_from_son(iterations)
+
+        print
+        print
+        print("[Generic] %d to_son calls done in %.2fs (%.2f ops/s)" % (iterations, generic_to_son_time, (float(iterations) / generic_to_son_time)))
+        print("[Compiled] %d to_son calls done in %.2fs (%.2f ops/s)" % (iterations, compiled_to_son_time, (float(iterations) / compiled_to_son_time)))
+        print("[Generic] %d from_son calls done in %.2fs (%.2f ops/s)" % (iterations, generic_from_son_time, (float(iterations) / generic_from_son_time)))
+        print("[Compiled] %d from_son calls done in %.2fs (%.2f ops/s)" % (iterations, compiled_from_son_time, (float(iterations) / compiled_from_son_time)))
+        print
+        print
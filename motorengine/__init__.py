@@ -18,6 +18,8 @@ try:
 
     from motorengine.aggregation.base import Aggregation  # NOQA
     from motorengine.query_builder.node import Q, QNot  # NOQA
+    from motorengine.query_builder.param import Param  # NOQA
+    from motorengine.identity_map import IdentityMap  # NOQA
 
 except ImportError as e:  # NOQA
     # likely setup.py trying to import version
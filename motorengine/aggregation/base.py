@@ -64,7 +64,9 @@ class Match(PipelineOperation):
         from motorengine import Q
         match_obj = {'$match': {}}
 
-        query = self.aggregation.queryset.get_query_from_filters(Q(**self.filters))
+        queryset = self.aggregation.queryset
+        # compared with the collation the whole pipeline runs with (see `QuerySet.get_aggregate_options`)
+        query = Q(**self.filters).to_query(queryset.__klass__, queryset.get_collation())
 
         update(match_obj['$match'], query)
 
@@ -77,7 +79,7 @@ class Unwind(PipelineOperation):
         self.field = self.aggregation.get_field(field)
 
     def to_query(self):
-        return {'$unwind': '$%s' % self.field.db_field}
+        return {'$unwind': '$%s' % self.aggregation.get_field_name(self.field)}
 
 
 class OrderBy(PipelineOperation):
@@ -87,7 +89,7 @@ class OrderBy(PipelineOperation):
         self.direction = direction
 
     def to_query(self):
-        return {'$sort': {self.field.db_field: self.direction}}
+        return {'$sort': {self.aggregation.get_field_name(self.field): self.direction}}
 
 
 class Aggregation(object):
@@ -100,7 +102,8 @@ class Aggregation(object):
 
     def get_field_name(self, field):
         if isinstance(field, six.string_types):
-            return field
+            # paths of declared fields are translated to their names in the database
+            return self.queryset.__klass__.get_db_field_path(field) or field
 
         return field.db_field
 
@@ -156,7 +159,8 @@ class Aggregation(object):
     @return_future
     def fetch(self, callback=None, alias=None):
         coll = self.queryset.coll(alias)
-        coll.aggregate(self.to_query()).to_list(None, callback=self.handle_aggregation(callback))
+        cursor = coll.aggregate(self.to_query(), **self.queryset.get_aggregate_options())
+        cursor.to_list(None, callback=self.handle_aggregation(callback))
 
     @classmethod
     def avg(cls, field, alias=None):
@@ -27,6 +27,8 @@ try:
 
     from motorengine.aiomotorengine.aggregation.base import Aggregation  # NOQA
     from motorengine.query_builder.node import Q, QNot  # NOQA
+    from motorengine.query_builder.param import Param  # NOQA
+    from motorengine.identity_map import IdentityMap  # NOQA
 
 except ImportError:  # NOQA
     pass  # likely setup.py trying to import version
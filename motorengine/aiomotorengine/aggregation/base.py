@@ -13,7 +13,9 @@ class Aggregation(motorengine.Aggregation):
         results = []
         try:
             # from motor-0.5 coll.aggregate return AsyncIOMotorAggregateCursor
-            lst = yield from coll.aggregate(self.to_query(), cursor=False)
+            lst = yield from coll.aggregate(
+                self.to_query(), cursor=False, **self.queryset.get_aggregate_options()
+            )
             for item in lst:
                 self.fill_ids(item)
                 results.append(edict(item))
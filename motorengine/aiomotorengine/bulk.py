@@ -0,0 +1,80 @@
+import asyncio
+
+from pymongo.errors import BulkWriteError
+
+import motorengine.bulk
+
+
+class BulkOperations(motorengine.bulk.BulkOperations):
+    __doc__ = motorengine.bulk.BulkOperations.__doc__
+
+    @asyncio.coroutine
+    def execute(self, alias=None):
+        '''
+        Sends all the operations added so far (one unordered bulk write for each chunk) and returns the result.
+        '''
+        operations, self.operations = self.operations, []
+        bulk_result = motorengine.bulk.BulkResult(operations)
+
+        for chunk in self.get_chunks(operations):
+            requests = [operations[index].request for index in chunk]
+
+            try:
+                result = yield from self.queryset.coll(alias).bulk_write(requests, ordered=False)
+            except BulkWriteError as error:
+                details = error.details
+            else:
+                details = result.bulk_api_result
+
+            bulk_result.add_chunk(chunk, details)
+
+        return self.finish(bulk_result)
+
+
+class BulkInsert(motorengine.bulk.BulkInsert):
+    __doc__ = motorengine.bulk.BulkInsert.__doc__
+
+    @asyncio.coroutine
+    def insert_chunk(self, collection, chunk):
+        try:
+            yield from collection.insert_many(chunk.sons, ordered=self.ordered)
+        except BulkWriteError as error:
+            return self.add_chunk_result(chunk, error)
+
+        return self.add_chunk_result(chunk, None)
+
+    @asyncio.coroutine
+    def wait_for_chunks(self, pending, return_when=asyncio.ALL_COMPLETED):
+        done, pending = yield from asyncio.wait(pending, return_when=return_when)
+
+        for task in done:
+            if not task.result():
+                self.stopped = True
+
+        return pending
+
+    @asyncio.coroutine
+    def execute(self, documents, alias=None):
+        collection = self.queryset.coll(alias)
+        pending = set()
+
+        chunks = self.get_chunks(documents, collection.codec_options)
+        chunk = next(chunks, None)
+
+        while chunk is not None:
+            pending.add(asyncio.ensure_future(self.insert_chunk(collection, chunk)))
+
+            # the next chunk is built while this one is being inserted
+            yield from asyncio.sleep(0)
+            chunk = next(chunks, None)
+
+            if len(pending) >= self.concurrency:
+                pending = yield from self.wait_for_chunks(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            if self.stopped:
+                break
+
+        if pending:
+            yield from self.wait_for_chunks(pending)
+
+        return self.get_result()
@@ -13,11 +13,18 @@ class BaseDocument(motorengine.document.BaseDocument):
         return (yield from cls.objects.ensure_index())
 
     @asyncio.coroutine
-    def save(self, alias=None):
+    def save(self, alias=None, upsert=False):
         '''
         Creates or updates the current instance of this document.
         '''
-        return (yield from self.objects.save(self, alias=alias))
+        return (yield from self.objects.save(self, alias=alias, upsert=upsert))
+
+    @asyncio.coroutine
+    def reload(self, alias=None):
+        '''
+        Loads the values of this document again from the database and returns it, or None if it was deleted.
+        '''
+        return (yield from self.objects.reload(self, alias=alias))
 
     @asyncio.coroutine
     def delete(self, alias=None):
@@ -60,21 +67,33 @@ class BaseDocument(motorengine.document.BaseDocument):
                 'loaded_values': []
             }
 
-        for (
-            dereference_function, document_id, values_collection,
-            field_name, fill_values_method
-        ) in references:
-            doc = yield from dereference_function(document_id)
-            if fill_values_method is None:
-                fill_values_method = self.fill_values_collection
-
-            fill_values_method(values_collection, field_name, doc)
+        values_collection = yield from self.fetch_references(references)
 
         return {
             'loaded_reference_count': reference_count,
             'loaded_values': values_collection
         }
 
+    @asyncio.coroutine
+    def fetch_references(self, references):
+        '''
+        Loads the documents of `references` (as returned by `find_references`, possibly
+        for several documents) with one query per batch and fills them in place.
+
+        Returns the values collection of the last reference.
+        '''
+        self.resolve_references_from_identity_map(references)
+
+        loaded_documents = {}
+        for key, document_type, projection, ids in self.get_reference_batches(references):
+            queryset = self.get_reference_batch_queryset(document_type, projection, ids)
+            documents = loaded_documents.setdefault(key, {})
+
+            for doc in (yield from queryset.find_all()):
+                documents[doc._id] = doc
+
+        return self.fill_references(references, loaded_documents)
+
 
 class Document(six.with_metaclass(DocumentMetaClass, BaseDocument)):
     '''
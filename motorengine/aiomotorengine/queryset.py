@@ -1,17 +1,73 @@
-import sys
 import asyncio
+from collections import deque
 
+from pymongo import ReturnDocument
 from pymongo.errors import DuplicateKeyError
 from easydict import EasyDict as edict
 from bson.objectid import ObjectId
 
 from motorengine.aiomotorengine.aggregation.base import Aggregation
+from motorengine.aiomotorengine.bulk import BulkInsert, BulkOperations
 from motorengine.aiomotorengine import get_connection
 from motorengine.errors import (
     UniqueKeyViolationError, PartlyLoadedDocumentError
 )
 
 import motorengine.queryset
+from motorengine.explain import get_plan_summary, check_query_plan
+
+
+class QuerySetIterator(object):
+    '''
+    Asynchronous iterator over the documents of a queryset (see `QuerySet.iterate`).
+    '''
+
+    def __init__(self, queryset, cursor, batch_size, lazy=None):
+        self.queryset = queryset
+        self.cursor = cursor
+        self.batch_size = batch_size
+        self.lazy = lazy
+        self.batch = deque()
+        self.closed = False
+
+    @asyncio.coroutine
+    def fetch_batch(self):
+        docs = yield from self.cursor.to_list(length=self.batch_size)
+        if not docs:
+            return False
+
+        self.batch.extend((yield from self.queryset.load_documents(docs, lazy=self.lazy)))
+        return True
+
+    @asyncio.coroutine
+    def close(self):
+        '''
+        Closes the cursor in the server.
+        '''
+        if not self.closed:
+            self.closed = True
+            self.batch.clear()
+            yield from self.cursor.close()
+
+    def __aiter__(self):
+        return self
+
+    @asyncio.coroutine
+    def __anext__(self):
+        if not self.batch:
+            if self.closed or not (yield from self.fetch_batch()):
+                yield from self.close()
+                raise StopAsyncIteration
+
+        return self.batch.popleft()
+
+    @asyncio.coroutine
+    def __aenter__(self):
+        return self
+
+    @asyncio.coroutine
+    def __aexit__(self, exc_type, exc_value, traceback):
+        yield from self.close()
 
 
 class QuerySet(motorengine.queryset.QuerySet):
@@ -48,7 +104,12 @@ class QuerySet(motorengine.queryset.QuerySet):
         return (yield from self.save(document=document, alias=alias))
 
     @asyncio.coroutine
-    def save(self, document, alias=None):
+    def save(self, document, alias=None, upsert=False):
+        '''
+        Inserts or updates `document` and returns it.
+
+        See `motorengine.queryset.QuerySet.save` for `upsert`.
+        '''
         if document.is_partly_loaded:
             msg = (
                 "Partly loaded document {0} can't be saved. Document should "
@@ -62,14 +123,22 @@ class QuerySet(motorengine.queryset.QuerySet):
         self.update_field_on_save_values(document, document._id is not None)
         if self.validate_document(document):
             yield from self.ensure_index(alias=alias)
-            return (yield from self.save_document(document, alias=alias))
+            return (yield from self.save_document(document, alias=alias, upsert=upsert))
 
     @asyncio.coroutine
-    def save_document(self, document, alias=None):
-        ''' Insert or update document '''
-        doc = document.to_son()
+    def save_document(self, document, alias=None, upsert=False):
+        ''' Insert, update or upsert document '''
+        upsert_filter = self.get_upsert_filter(document) if upsert else None
+
+        if upsert_filter is not None:
+            yield from self.upsert_document(document, upsert_filter, alias=alias)
+        elif document._id is not None:
+            doc = self.get_update_definition(document)
+
+            if doc is None:
+                # nothing changed since the document was loaded
+                return document
 
-        if document._id is not None:
             try:
                 yield from self.coll(alias).update({'_id': document._id}, doc)
             except DuplicateKeyError as e:
@@ -77,6 +146,7 @@ class QuerySet(motorengine.queryset.QuerySet):
                     str(e), self.__klass__
                 )
         else:
+            doc = document.to_son()
             try:
                 doc_id = yield from self.coll(alias).insert(doc)
             except DuplicateKeyError as e:
@@ -84,60 +154,66 @@ class QuerySet(motorengine.queryset.QuerySet):
                     str(e), self.__klass__
                 )
             document._id = doc_id
+
+        document._clear_changed_fields()
+        self.update_identity_map(document)
         return document
 
     @asyncio.coroutine
-    def bulk_insert(self, documents, alias=None):
-        '''
-        Inserts all documents passed to this method in one go.
-        '''
-
-        is_valid = True
-        docs_to_insert = []
+    def upsert_document(self, document, upsert_filter, alias=None):
+        doc = document.to_son()
 
-        for document_index, document in enumerate(documents):
-            self.update_field_on_save_values(
-                document, document._id is not None
+        try:
+            if '_id' in upsert_filter:
+                yield from self.coll(alias).replace_one(upsert_filter, doc, upsert=True)
+            else:
+                # the _id of the document replaced (or inserted) is returned in the same round trip
+                instance = yield from self.coll(alias).find_one_and_replace(
+                    upsert_filter, doc, projection={'_id': True}, upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+                document._id = instance['_id']
+        except DuplicateKeyError as e:
+            raise UniqueKeyViolationError.from_pymongo(
+                str(e), self.__klass__
             )
-            try:
-                is_valid = is_valid and self.validate_document(document)
-            except Exception:
-                err = sys.exc_info()[1]
-                raise ValueError((
-                    "Validation for document %d in the documents "
-                    "you are saving failed with: %s"
-                ) % (
-                    document_index,
-                    str(err)
-                ))
 
-            if not is_valid:
-                return
-
-            docs_to_insert.append(document.to_son())
-
-        if not is_valid:
-            return
+    @asyncio.coroutine
+    def bulk_insert(self, documents, alias=None, ordered=True, chunk_size=None, max_chunk_bytes=None,
+                    concurrency=None):
+        '''
+        Inserts all documents passed to this method (a list or any other iterable, like a generator) in chunks
+        and returns the list of documents in the same order, with their ids set.
 
-        doc_ids = yield from self.coll(alias).insert(docs_to_insert)
+        See `motorengine.queryset.QuerySet.bulk_insert` for the other arguments.
+        '''
 
-        for object_index, object_id in enumerate(doc_ids):
-            documents[object_index]._id = object_id
-        return documents
+        bulk_insert = BulkInsert(
+            self, ordered=ordered, chunk_size=chunk_size, max_chunk_bytes=max_chunk_bytes, concurrency=concurrency
+        )
+        return (yield from bulk_insert.execute(documents, alias=alias))
 
     @asyncio.coroutine
-    def update(self, definition, alias=None):
+    def update(self, definition=None, alias=None, **kwargs):
+        '''
+        Updates all the documents that match the filters of the queryset (if any) and returns the number
+        of documents updated (`count`) and `updated_existing`.
 
-        definition = self.transform_definition(definition)
+        See `motorengine.queryset.QuerySet.update` for the update operators.
+        '''
+        update_document = self.get_update_document(definition, **kwargs)
 
         update_filters = {}
         if self._filters:
             update_filters = self.get_query_from_filters(self._filters)
 
+        self.invalidate_identity_map()
+
         update_arguments = dict(
             spec=update_filters,
-            document={'$set': definition},
+            document=update_document,
             multi=True,
+            **self.get_write_options()
         )
         res = yield from self.coll(alias).update(**update_arguments)
 
@@ -146,6 +222,93 @@ class QuerySet(motorengine.queryset.QuerySet):
             "updated_existing": res['updatedExisting']
         })
 
+    @asyncio.coroutine
+    def modify(self, definition=None, alias=None, new=True, upsert=False, sort=None, **kwargs):
+        '''
+        Atomically updates the first document that matches the filters of the queryset and returns it,
+        or None if no document matches.
+
+        See `motorengine.queryset.QuerySet.modify` for the other arguments.
+        '''
+        update_document = self.get_update_document(definition, **kwargs)
+
+        modify_filters = {}
+        if self._filters:
+            modify_filters = self.get_sorted_queryset(sort).get_query_from_filters(self._filters)
+
+        try:
+            instance = yield from self.coll(alias).find_one_and_update(
+                modify_filters, update_document, **self.get_modify_options(new=new, upsert=upsert, sort=sort)
+            )
+        except DuplicateKeyError as e:
+            raise UniqueKeyViolationError.from_pymongo(
+                str(e), self.__klass__
+            )
+
+        if instance is None:
+            return None
+
+        doc = self.get_modified_document(instance, new=new)
+
+        references = self.find_related_references([doc], load_all_references=not self.is_lazy)
+        if references:
+            yield from doc.fetch_references(references)
+        return doc
+
+    @asyncio.coroutine
+    def get_or_create(self, defaults=None, alias=None, **filters):
+        '''
+        Gets the document that matches `filters` or atomically inserts a new one (with the values in
+        `defaults` as well) if there is none, and returns a `(document, created)` tuple.
+
+        See `motorengine.queryset.QuerySet.get_or_create`.
+        '''
+        from motorengine.aiomotorengine import Q
+
+        query, update_document = self.get_or_create_definition(defaults, **filters)
+
+        yield from self.ensure_index(alias=alias)
+
+        try:
+            instance = yield from self.coll(alias).find_one_and_update(
+                query, update_document, **self.get_modify_options(upsert=True, filters=Q(**filters))
+            )
+        except DuplicateKeyError as e:
+            raise UniqueKeyViolationError.from_pymongo(
+                str(e), self.__klass__
+            )
+
+        doc = self.get_modified_document(instance)
+
+        references = self.find_related_references([doc], load_all_references=not self.is_lazy)
+        if references:
+            yield from doc.fetch_references(references)
+        return doc, doc._id == update_document['$setOnInsert']['_id']
+
+    @asyncio.coroutine
+    def reload(self, document, alias=None):
+        '''
+        Loads the values of the fields of `document` again (with the projection of the queryset) and returns it,
+        or None if it no longer exists.
+        '''
+        if document._id is None:
+            raise ValueError("Document %r must be saved before it can be reloaded." % document)
+
+        instance = yield from self.coll(alias).find_one(
+            {'_id': document._id}, projection=self.get_projection(), **self.get_find_options()
+        )
+
+        if instance is None:
+            return None
+
+        document._reload_from(self.get_modified_document(instance))
+
+        if not document.is_partly_loaded:
+            # keep the reloaded instance instead of the one just loaded
+            self.update_identity_map(document)
+
+        return document
+
     @asyncio.coroutine
     def delete(self, alias=None):
         '''
@@ -182,11 +345,14 @@ class QuerySet(motorengine.queryset.QuerySet):
 
         if instance is not None:
             if hasattr(instance, '_id') and instance._id:
+                self.invalidate_identity_map(instance)
                 res = yield from self.coll(alias).remove(instance._id)
         else:
+            self.invalidate_identity_map()
+
             if self._filters:
                 remove_filters = self.get_query_from_filters(self._filters)
-                res = yield from self.coll(alias).remove(remove_filters)
+                res = yield from self.coll(alias).remove(remove_filters, **self.get_write_options())
             else:
                 res = yield from self.coll(alias).remove()
         return res['n']
@@ -196,44 +362,63 @@ class QuerySet(motorengine.queryset.QuerySet):
         '''
         Gets a single item of the current queryset collection using it's id.
 
+        If neither an id nor filters are passed, the filters of the queryset are used.
+
         In order to query a different database, please specify the `alias` of the database to query.
         '''
 
         from motorengine.aiomotorengine import Q
 
-        if id is None and not kwargs:
+        if id is None and not kwargs and not self._filters:
             raise RuntimeError("Either an id or a filter must be provided to get")
 
         if id is not None:
             if not isinstance(id, ObjectId):
                 id = ObjectId(id)
 
+            query_filters = None
             filters = {
                 "_id": id
             }
+        elif kwargs:
+            query_filters = Q(**kwargs)
+            filters = self.get_query_from_filters(query_filters)
+        else:
+            query_filters = self._filters
+            filters = self.get_query_from_filters(self._filters)
+
+        document = self.get_from_identity_map(id)
+        if document is not None:
+            return document
+
+        if self._lookup_related:
+            pipeline = [{'$match': filters}, {'$limit': 1}] + self.get_lookup_stages()
+            cursor = self.coll(alias).aggregate(pipeline, **self.get_aggregate_options(query_filters))
+            instances = yield from cursor.to_list(None)
+            instance = instances[0] if instances else None
         else:
-            filters = Q(**kwargs)
-            filters = self.get_query_from_filters(filters)
+            if self.should_explain(alias, filters):
+                yield from self.run_in_strict_mode(alias, filters, self._get_find_one_cursor(alias, filters, query_filters))
+
+            instance = yield from self.coll(alias).find_one(
+                filters, projection=self.get_projection(), **self.get_find_options(query_filters)
+            )
 
-        instance = yield from self.coll(alias).find_one(
-            filters, projection=self._loaded_fields.to_query(self.__klass__)
-        )
         if instance is None:
             return None
         else:
-            doc = self.__klass__.from_son(
-                instance,
-                # if _loaded_fields is not empty then
-                # document is partly loaded
-                _is_partly_loaded=bool(self._loaded_fields),
-                # set projections for references (if any)
-                _reference_loaded_fields=self._reference_loaded_fields
-            )
-            if self.is_lazy:
-                return doc
-            else:
-                yield from doc.load_references()
-                return doc
+            joined_fields = self.pop_lookup_fields(instance)
+
+            # if _loaded_fields is not empty then
+            # document is partly loaded
+            doc = self.get_document_from_son(instance, is_partly_loaded=bool(self._loaded_fields))
+            joined_documents = self.fill_lookup_fields(doc, joined_fields)
+
+            references = self.find_related_references([doc], load_all_references=self.should_load_all_references())
+            self.find_joined_references(joined_documents, references)
+            if references:
+                yield from doc.fetch_references(references)
+            return doc
 
     @asyncio.coroutine
     def find_all(self, lazy=None, alias=None):
@@ -254,59 +439,228 @@ class QuerySet(motorengine.queryset.QuerySet):
         else:
             to_list_arguments['length'] = motorengine.queryset.DEFAULT_LIMIT
 
-        cursor = self._get_find_cursor(alias=alias)
+        cursor = self._get_results_cursor(alias, limit=to_list_arguments['length'])
+
+        if self.should_explain(alias):
+            yield from self.run_in_strict_mode(alias, self.get_query_from_filters(self._filters), cursor)
 
         self._filters = {}
 
         docs = yield from cursor.to_list(**to_list_arguments)
 
-        # if _loaded_fields is not empty then documents are partly loaded
-        is_partly_loaded = bool(self._loaded_fields)
-
-        result = []
-        for doc in docs:
-            obj = self.__klass__.from_son(
-                doc,
-                # set projections for references (if any)
-                _reference_loaded_fields=self._reference_loaded_fields,
-                _is_partly_loaded=is_partly_loaded
-            )
+        return (yield from self.load_documents(docs, lazy=lazy))
 
-            if (lazy is not None and not lazy) or not obj.is_lazy:
-                yield from obj.load_references(obj._fields)
+    @asyncio.coroutine
+    def load_documents(self, docs, lazy=None):
+        '''
+        Returns the documents for the data loaded by a query, with their references loaded if needed.
+        '''
+        result, references = self.get_documents_from_son(docs, lazy=lazy)
 
-            result.append(obj)
+        if references:
+            # references of all the documents are loaded together
+            yield from result[0].fetch_references(references)
 
         return result
 
     @asyncio.coroutine
-    def count(self, alias=None):
+    def paginate_after(self, last_doc_or_key, page_size, lazy=None, alias=None):
+        '''
+        Returns a page of at most `page_size` documents that match specified filters (if any), after
+        `last_doc_or_key` in the order specified with `order_by` (with `_id` as a tiebreaker).
+
+        Instead of skipping documents (which is as slow as the number of documents skipped), each page is
+        queried with range filters on the order fields, so every page costs the same when the collection has
+        an index with these fields (followed by `_id`).
+
+        `last_doc_or_key` is either `None` for the first page, the `next` token of the previous page, the last
+        document of the previous page or the list of its values for the order fields (followed by its `_id`).
+
+        Returns an object with the documents in `items` and the token of the next page in `next`
+        (`None` in the last page). `skip` and `limit` are not applied.
+
+        Usage::
+
+            queryset = User.objects.filter(active=True).order_by('last_name').order_by('first_name')
+            page = yield from queryset.paginate_after(None, 50)
+
+            while page.next is not None:
+                page = yield from queryset.paginate_after(page.next, 50)
+        '''
+        sort = self.get_keyset_sort()
+        cursor = self._get_page_cursor(last_doc_or_key, page_size, sort, alias)
+
+        docs = yield from cursor.to_list(length=page_size + 1)
+        docs, next_token = self.get_page(docs, page_size, sort)
+
+        items = yield from self.load_documents(docs, lazy=lazy)
+        return edict(items=items, next=next_token)
+
+    @asyncio.coroutine
+    def each_batch(self, batch_size, handler, lazy=None, alias=None):
+        '''
+        Calls `handler` with lists of (at most) `batch_size` documents in the current queryset collection that
+        match specified filters (if any) and returns the number of documents handled.
+
+        If `handler` returns a coroutine or a Future the next batch is only fetched once it is done. If `handler`
+        fails the cursor is closed and the error is raised.
+
+        See `motorengine.queryset.QuerySet.each_batch`.
+        '''
+        cursor = self._get_results_cursor(alias, limit=self._limit)
+        if not self._lookup_related:
+            cursor.batch_size(batch_size)
+
+        document_count = 0
+
+        try:
+            while True:
+                docs = yield from cursor.to_list(length=batch_size)
+                if not docs:
+                    return document_count
+
+                documents = yield from self.load_documents(docs, lazy=lazy)
+                document_count += len(documents)
+
+                handler_result = handler(documents)
+                if asyncio.iscoroutine(handler_result) or asyncio.isfuture(handler_result):
+                    # backpressure: the next batch is only fetched after the handler is done with this one
+                    handler_result = yield from handler_result
+
+                if handler_result is False:
+                    # the handler asked to stop before the cursor was exhausted
+                    yield from cursor.close()
+                    return document_count
+        except Exception:
+            yield from cursor.close()
+            raise
+
+    def iterate(self, batch_size=100, lazy=None, alias=None):
+        '''
+        Returns an asynchronous iterator over the documents in the current queryset collection that
+        match specified filters (if any), without the `DEFAULT_LIMIT` of `find_all`.
+
+        Documents are loaded and decoded `batch_size` at a time (references of each batch are loaded
+        together if needed), so only one batch is kept in memory. Use it in an `async with` block (or
+        call `close`) to close the cursor in the server when leaving the loop early.
+
+        Usage::
+
+            async for user in User.objects.filter(active=True).iterate(batch_size=500):
+                # do something with user
+                pass
+
+            async with User.objects.iterate() as users:
+                async for user in users:
+                    if user.email == email:
+                        break
+        '''
+        cursor = self._get_results_cursor(alias, limit=self._limit)
+        if not self._lookup_related:
+            cursor.batch_size(batch_size)
+
+        self._filters = {}
+
+        return QuerySetIterator(self, cursor, batch_size=batch_size, lazy=lazy)
+
+    @asyncio.coroutine
+    def count(self, alias=None, approximate=False, with_limit_and_skip=False):
         '''
         Returns the number of documents in the collection that match the specified filters, if any.
+
+        Documents are counted with an aggregation, so the `hint`, `max_time_ms`, `comment` and `collation` of
+        the queryset are applied. `skip` and `limit` are only applied if `with_limit_and_skip` is True.
+
+        If `approximate` is True (or a number) counting stops at `DEFAULT_APPROXIMATE_COUNT` (or that number)
+        documents, so a result equal to it means "that many or more".
+
+        Usage::
+
+            count = yield from User.objects.filter(active=True).count(approximate=100)
+            print("%d%s users" % (count, "+" if count == 100 else ""))
+        '''
+        pipeline = self.get_count_pipeline(
+            with_limit_and_skip=with_limit_and_skip, max_count=self.get_max_count(approximate)
+        )
+
+        # the collation of the filters is used before they are cleared
+        options = self.get_aggregate_options()
+
+        if self.should_explain(alias):
+            cursor = self._get_find_cursor(alias=alias)
+            yield from self.run_in_strict_mode(alias, self.get_query_from_filters(self._filters), cursor)
+
+        self._filters = {}
+
+        result = yield from self.coll(alias).aggregate(pipeline, **options).to_list(None)
+        return self.get_count_from_result(result)
+
+    @asyncio.coroutine
+    def estimated_count(self, alias=None):
+        '''
+        Returns the number of documents in the collection using its metadata, without scanning documents or
+        index keys. The result may be inaccurate after unclean shutdowns or in sharded clusters with orphaned
+        documents.
+
+        If the queryset has filters, the documents that match them are counted with `count` instead.
+
+        Usage::
+
+            count = yield from User.objects.estimated_count()
+        '''
+        if self._filters:
+            return (yield from self.count(alias=alias))
+
+        return (yield from self.coll(alias).count(**self.get_estimated_count_options()))
+
+    @asyncio.coroutine
+    def run_in_strict_mode(self, alias, query_filters, cursor):
+        '''
+        Explains `cursor` and checks its plan (see `motorengine.explain.check_query_plan`).
+        '''
+        result = yield from cursor.explain()
+        check_query_plan(self.get_alias(alias), self.get_query_description(query_filters), get_plan_summary(result))
+
+    @asyncio.coroutine
+    def explain(self, alias=None):
+        '''
+        Explains the query that `find_all` would run with the current filters, order, projection and options.
+
+        Returns the winning plan (`winning_plan`), the names of its stages (`stages`), the index used
+        (`index_name`, `None` for collection scans, and `index_names` if more than one is used), the number of
+        index keys examined (`keys_examined`), documents examined (`docs_examined`) and returned (`returned`),
+        whether it is a collection scan (`is_collection_scan`) and the result of the explain command (`raw`).
+
+        Usage::
+
+            plan = yield from User.objects.filter(last_name="Heynemann").explain()
+            assert not plan.is_collection_scan, "Missing index on last_name"
         '''
         cursor = self._get_find_cursor(alias=alias)
         self._filters = {}
-        return (yield from cursor.count())
+
+        result = yield from cursor.explain()
+        return get_plan_summary(result)
 
     @property
     def aggregate(self):
         return Aggregation(self)
 
+    @property
+    def bulk(self):
+        return BulkOperations(self)
+
     @asyncio.coroutine
     def ensure_index(self, alias=None):
         fields_with_index = []
         for field_name, field in self.__klass__._fields.items():
-            if field.unique or field.sparse:
+            if field.unique or field.sparse or field.collation is not None:
                 fields_with_index.append(field)
 
         created_indexes = []
 
         for field in fields_with_index:
-            res = yield from self.coll(alias).ensure_index(
-                field.db_field,
-                unique=field.unique,
-                sparse=field.sparse
-            )
+            res = yield from self.coll(alias).ensure_index(field.db_field, **self.get_index_options(field))
             created_indexes.append(res)
 
         return len(created_indexes)
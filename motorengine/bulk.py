@@ -0,0 +1,487 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Unordered bulk writes (see `QuerySet.bulk`).
+
+Operations are accumulated in a `BulkOperations` builder from documents or from
+`Q` filters and sent with `bulk_write(ordered=False)` when it is executed, in
+chunks of at most `BULK_CHUNK_SIZE` operations and `BULK_CHUNK_BYTES` bytes of
+BSON, so one failing operation does not stop the others:
+
+.. code-block:: python
+
+    bulk = User.objects.bulk
+    for user in users:
+        user.last_name = user.last_name.title()
+        bulk.update(user)
+
+    bulk.update(Q(active=False), {'plan': 'free'})
+    bulk.delete(Q(last_login__lt=one_year_ago))
+
+    bulk.execute(callback=handle_bulk)
+
+The result has the counts of documents matched, modified, upserted and
+deleted, the result of each operation (in the order they were added) and
+the errors of the operations that failed.
+'''
+
+import sys
+
+from bson import BSON
+from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
+from easydict import EasyDict as edict
+from pymongo import UpdateOne, UpdateMany, ReplaceOne, DeleteOne, DeleteMany
+from pymongo.errors import BulkWriteError
+from tornado.concurrent import return_future
+
+from motorengine.errors import BulkInsertError, PartlyLoadedDocumentError
+
+BULK_CHUNK_SIZE = 1000
+BULK_CHUNK_BYTES = 16 * 1024 * 1024
+
+# number of chunks being inserted at the same time by unordered bulk inserts
+BULK_INSERT_CONCURRENCY = 4
+
+
+class BulkResult(object):
+    '''
+    Accumulates the results of each chunk of a bulk write.
+    '''
+
+    def __init__(self, operations):
+        self.operations = operations
+        self.matched_count = 0
+        self.modified_count = 0
+        self.upserted_count = 0
+        self.deleted_count = 0
+        self.upserted_ids = {}
+        self.errors = {}
+
+    def add_chunk(self, chunk, details):
+        '''
+        Adds the result of the bulk write of `chunk` (a list of operation indexes). `details` is
+        the result of the bulk write command (`bulk_api_result` or the details of a `BulkWriteError`).
+        '''
+        self.matched_count += details.get('nMatched', 0)
+        self.modified_count += details.get('nModified', 0) or 0
+        self.deleted_count += details.get('nRemoved', 0)
+
+        for upserted in details.get('upserted', []):
+            self.upserted_ids[chunk[upserted['index']]] = upserted['_id']
+        self.upserted_count += len(details.get('upserted', []))
+
+        for error in details.get('writeErrors', []):
+            self.errors[chunk[error['index']]] = edict(
+                index=chunk[error['index']],
+                code=error.get('code'),
+                message=error.get('errmsg'),
+            )
+
+    def to_result(self):
+        results = []
+        for index, operation in enumerate(self.operations):
+            results.append(edict(
+                index=index,
+                document=operation.document,
+                upserted_id=self.upserted_ids.get(index),
+                error=self.errors.get(index),
+            ))
+
+        return edict(
+            matched_count=self.matched_count,
+            modified_count=self.modified_count,
+            upserted_count=self.upserted_count,
+            deleted_count=self.deleted_count,
+            upserted=[edict(index=index, _id=self.upserted_ids[index]) for index in sorted(self.upserted_ids)],
+            results=results,
+            errors=[self.errors[index] for index in sorted(self.errors)],
+        )
+
+
+class BulkOperations(object):
+    '''
+    Builder of unordered bulk writes for the documents of a queryset (see `motorengine.bulk`).
+
+    Each operation receives either a document (matched by its `_id`) or a `Q` filter (matching all
+    the documents of the queryset class that match it):
+
+    * `update(document_or_filter, definition=None, **kwargs)` - Updates the changed fields of the document
+      or sets the values in `definition` and applies the update operators in `kwargs` (see `QuerySet.update`)
+      in the documents that match the filter;
+    * `upsert(document_or_filter, definition=None, **kwargs)` - Same as `update`, inserting the document (or
+      a document with the values of the filter and of the update) if it does not exist;
+    * `replace(document, upsert=False)` - Replaces the whole stored document;
+    * `delete(document_or_filter)` - Removes the document or all the documents that match the filter.
+    '''
+
+    def __init__(self, queryset, chunk_size=None, max_chunk_bytes=None):
+        self.queryset = queryset
+        self.chunk_size = chunk_size or BULK_CHUNK_SIZE
+        self.max_chunk_bytes = max_chunk_bytes or BULK_CHUNK_BYTES
+        self.operations = []
+
+    def __len__(self):
+        return len(self.operations)
+
+    def add(self, request, filters, definition, document=None, updating=False, deleting=False):
+        size = len(BSON.encode(filters)) + len(BSON.encode(definition or {}))
+
+        self.operations.append(edict(
+            request=request, size=size, document=document, updating=updating, deleting=deleting
+        ))
+        return self
+
+    def get_filters(self, filters):
+        from motorengine.query_builder.node import QNode
+
+        if not isinstance(filters, QNode):
+            raise ValueError(
+                "Bulk operations receive either a document or a Q filter, not '%s'." % type(filters).__name__
+            )
+
+        return self.queryset.get_query_from_filters(filters), self.queryset.get_collation(filters)
+
+    def prepare_document(self, document, upsert=False):
+        if document.is_partly_loaded:
+            raise PartlyLoadedDocumentError(
+                "Partly loaded document %s can't be saved in bulk." % document.__class__.__name__
+            )
+
+        if not upsert and document._id is None:
+            raise ValueError("Document %r must be saved before it can be updated in bulk." % document)
+
+        self.queryset.update_field_on_save_values(document, document._id is not None)
+
+        try:
+            self.queryset.validate_document(document)
+        except Exception:
+            err = sys.exc_info()[1]
+            raise ValueError("Validation for operation %d in the bulk operations failed with: %s" % (
+                len(self.operations),
+                str(err)
+            ))
+
+    def update(self, document_or_filter, definition=None, upsert=False, **kwargs):
+        if not self.is_document(document_or_filter):
+            filters, collation = self.get_filters(document_or_filter)
+            definition = self.queryset.get_update_document(definition, **kwargs)
+
+            if upsert:
+                return self.add(UpdateOne(filters, definition, upsert=True, collation=collation), filters, definition)
+
+            return self.add(UpdateMany(filters, definition, collation=collation), filters, definition)
+
+        document = document_or_filter
+        if upsert:
+            return self.replace(document, upsert=True)
+
+        self.prepare_document(document)
+        definition = self.queryset.get_update_definition(document)
+
+        if definition is None:
+            # nothing changed since the document was loaded
+            return self.add(None, {}, None, document=document, updating=True)
+
+        filters = {'_id': document._id}
+        if document._changed_fields is None:
+            request = ReplaceOne(filters, definition)
+        else:
+            request = UpdateOne(filters, definition)
+
+        return self.add(request, filters, definition, document=document, updating=True)
+
+    def upsert(self, document_or_filter, definition=None, **kwargs):
+        return self.update(document_or_filter, definition, upsert=True, **kwargs)
+
+    def replace(self, document, upsert=False):
+        if not self.is_document(document):
+            raise ValueError("Only documents can be replaced in bulk.")
+
+        self.prepare_document(document, upsert=upsert)
+
+        if document._id is None:
+            document._id = ObjectId()
+
+        filters = {'_id': document._id}
+        son = document.to_son()
+
+        return self.add(ReplaceOne(filters, son, upsert=upsert), filters, son, document=document, updating=True)
+
+    def delete(self, document_or_filter):
+        if not self.is_document(document_or_filter):
+            filters, collation = self.get_filters(document_or_filter)
+            return self.add(DeleteMany(filters, collation=collation), filters, None)
+
+        document = document_or_filter
+        if document._id is None:
+            raise ValueError("Document %r must be saved before it can be deleted in bulk." % document)
+
+        filters = {'_id': document._id}
+        return self.add(DeleteOne(filters), filters, None, document=document, deleting=True)
+
+    def is_document(self, value):
+        from motorengine.document import BaseDocument
+
+        return isinstance(value, BaseDocument)
+
+    def get_chunks(self, operations):
+        '''
+        Returns the indexes of the `operations` to be sent in each bulk write.
+        '''
+        chunks = []
+        chunk = []
+        chunk_bytes = 0
+
+        for index, operation in enumerate(operations):
+            if operation.request is None:
+                continue
+
+            if chunk and (len(chunk) >= self.chunk_size or chunk_bytes + operation.size > self.max_chunk_bytes):
+                chunks.append(chunk)
+                chunk = []
+                chunk_bytes = 0
+
+            chunk.append(index)
+            chunk_bytes += operation.size
+
+        if chunk:
+            chunks.append(chunk)
+
+        return chunks
+
+    def get_chunk_details(self, result, error):
+        if isinstance(error, BulkWriteError):
+            return error.details
+
+        if error:
+            raise error
+
+        return result.bulk_api_result
+
+    def finish(self, bulk_result):
+        '''
+        Updates the documents written and the identity map after all chunks were written.
+        '''
+        invalidate_class = False
+
+        for index, operation in enumerate(bulk_result.operations):
+            if index in bulk_result.errors:
+                continue
+
+            document = operation.document
+            if document is None:
+                invalidate_class = True
+            elif operation.deleting:
+                self.queryset.invalidate_identity_map(document)
+            elif operation.updating:
+                if index in bulk_result.upserted_ids:
+                    document._id = bulk_result.upserted_ids[index]
+                document._clear_changed_fields()
+                self.queryset.update_identity_map(document)
+
+        if invalidate_class:
+            self.queryset.invalidate_identity_map()
+
+        return bulk_result.to_result()
+
+    def handle_chunk(self, chunks, chunk_index, bulk_result, callback, alias):
+        def handle(*arguments, **kw):
+            details = self.get_chunk_details(arguments[0], arguments[1] if len(arguments) > 1 else None)
+            bulk_result.add_chunk(chunks[chunk_index], details)
+
+            self.execute_chunk(chunks, chunk_index + 1, bulk_result, callback, alias)
+
+        return handle
+
+    def execute_chunk(self, chunks, chunk_index, bulk_result, callback, alias):
+        if chunk_index >= len(chunks):
+            callback(self.finish(bulk_result))
+            return
+
+        requests = [bulk_result.operations[index].request for index in chunks[chunk_index]]
+        self.queryset.coll(alias).bulk_write(
+            requests, ordered=False,
+            callback=self.handle_chunk(chunks, chunk_index, bulk_result, callback, alias)
+        )
+
+    @return_future
+    def execute(self, callback=None, alias=None):
+        '''
+        Sends all the operations added so far (one unordered bulk write for each chunk) and calls
+        back with the result.
+        '''
+        if callback is None:
+            raise RuntimeError("The callback argument is required")
+
+        operations, self.operations = self.operations, []
+        bulk_result = BulkResult(operations)
+
+        self.execute_chunk(self.get_chunks(operations), 0, bulk_result, callback, alias)
+
+
+class BulkInsert(object):
+    '''
+    Inserts the documents of any iterable in chunks (see `QuerySet.bulk_insert`).
+
+    Documents are validated and converted to BSON only when the chunk they belong to is built, so the input
+    is consumed as it is inserted and only the BSON of the chunks being inserted is kept in memory. The next
+    chunk is built while the previous one is being inserted. Ordered inserts send one chunk at a time and stop
+    at the first error: the documents before an invalid document are inserted and then its ValueError is
+    raised. Unordered inserts keep up to `concurrency` chunks in flight and report the documents that failed
+    validation or could not be inserted after all the others are inserted.
+    '''
+
+    def __init__(self, queryset, ordered=True, chunk_size=None, max_chunk_bytes=None, concurrency=None):
+        self.queryset = queryset
+        self.ordered = ordered
+        self.chunk_size = chunk_size or BULK_CHUNK_SIZE
+        self.max_chunk_bytes = max_chunk_bytes or BULK_CHUNK_BYTES
+        self.concurrency = 1 if ordered else (concurrency or BULK_INSERT_CONCURRENCY)
+
+        self.documents = []
+        self.errors = {}
+        # ValueError of the invalid document that ended an ordered insert
+        self.validation_error = None
+        self.next_chunk = None
+        self.in_flight = 0
+        self.exhausted = False
+        self.stopped = False
+
+    def prepare_document(self, index, document):
+        self.queryset.update_field_on_save_values(document, document._id is not None)
+
+        try:
+            self.queryset.validate_document(document)
+        except Exception:
+            err = sys.exc_info()[1]
+            raise ValueError("Validation for document %d in the documents you are saving failed with: %s" % (
+                index,
+                str(err)
+            ))
+
+    def get_chunks(self, documents, codec_options):
+        '''
+        Yields the chunks (the indexes, ids and BSON of their documents) to be inserted. An invalid document ends
+        ordered inserts with the chunk of the valid documents before it.
+        '''
+        chunk = edict(indexes=[], ids=[], sons=[], size=0)
+
+        for index, document in enumerate(documents):
+            self.documents.append(document)
+
+            try:
+                self.prepare_document(index, document)
+            except ValueError:
+                if self.ordered:
+                    self.validation_error = sys.exc_info()[1]
+                    break
+
+                self.errors[index] = edict(index=index, code=None, message=str(sys.exc_info()[1]), document=document)
+                continue
+
+            son = document.to_son()
+            son['_id'] = document._id if document._id is not None else ObjectId()
+            raw_son = RawBSONDocument(BSON.encode(son, codec_options=codec_options))
+
+            size = len(raw_son.raw)
+            if chunk.indexes and (len(chunk.indexes) >= self.chunk_size or chunk.size + size > self.max_chunk_bytes):
+                yield chunk
+                chunk = edict(indexes=[], ids=[], sons=[], size=0)
+
+            chunk.indexes.append(index)
+            chunk.ids.append(son['_id'])
+            chunk.sons.append(raw_son)
+            chunk.size += size
+
+        if chunk.indexes:
+            yield chunk
+
+    def add_chunk_result(self, chunk, error):
+        '''
+        Sets the ids of the documents of `chunk` that were inserted. Returns False if no more
+        chunks should be inserted.
+        '''
+        if error and not isinstance(error, BulkWriteError):
+            raise error
+
+        failed = set()
+        for write_error in error.details.get('writeErrors', []) if error else []:
+            position = write_error['index']
+            failed.add(position)
+
+            index = chunk.indexes[position]
+            self.errors[index] = edict(
+                index=index, code=write_error.get('code'), message=write_error.get('errmsg'),
+                document=self.documents[index]
+            )
+
+        # ordered inserts stop at the first error
+        inserted = min(failed) if failed and self.ordered else len(chunk.indexes)
+
+        for position, index in enumerate(chunk.indexes[:inserted]):
+            if position in failed:
+                continue
+
+            document = self.documents[index]
+            document._id = chunk.ids[position]
+            document._clear_changed_fields()
+
+        chunk.sons = None
+        return not (failed and self.ordered)
+
+    def get_result(self):
+        if not self.errors:
+            if self.validation_error is not None:
+                raise self.validation_error
+
+            return self.documents
+
+        raise BulkInsertError(
+            "%d of the %d documents you are saving could not be inserted." % (len(self.errors), len(self.documents)),
+            [self.errors[index] for index in sorted(self.errors)],
+            self.documents
+        )
+
+    def handle_chunk(self, collection, chunks, chunk, callback):
+        def handle(*arguments, **kw):
+            self.in_flight -= 1
+
+            if not self.add_chunk_result(chunk, arguments[1] if len(arguments) > 1 else None):
+                self.stopped = True
+
+            self.send_chunks(collection, chunks, callback)
+
+        return handle
+
+    def get_next_chunk(self, chunks):
+        chunk, self.next_chunk = self.next_chunk, None
+        if chunk is None:
+            chunk = next(chunks, None)
+
+        return chunk
+
+    def send_chunks(self, collection, chunks, callback):
+        while not self.exhausted and not self.stopped and self.in_flight < self.concurrency:
+            chunk = self.get_next_chunk(chunks)
+            if chunk is None:
+                self.exhausted = True
+                break
+
+            self.in_flight += 1
+            collection.insert_many(
+                chunk.sons, ordered=self.ordered, callback=self.handle_chunk(collection, chunks, chunk, callback)
+            )
+
+            # the next chunk is built while this one is being inserted
+            self.next_chunk = next(chunks, None)
+            if self.next_chunk is None:
+                self.exhausted = True
+
+        if self.in_flight == 0 and (self.exhausted or self.stopped):
+            callback(self.get_result())
+
+    def execute(self, documents, callback, alias=None):
+        collection = self.queryset.coll(alias)
+        self.send_chunks(collection, self.get_chunks(documents, collection.codec_options), callback)
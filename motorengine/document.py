@@ -1,18 +1,140 @@
 # -*- coding: utf-8 -*-
 
+import copy
+
 import six
+from bson.objectid import ObjectId
 from tornado.concurrent import return_future
 
+from motorengine import serializers
 from motorengine.metaclasses import DocumentMetaClass
-from motorengine.errors import InvalidDocumentError, LoadReferencesRequiredError
+from motorengine.errors import InvalidDocumentError
+from motorengine.identity_map import get_identity_map
 
 
 AUTHORIZED_FIELDS = [
-    '_id', '_values', '_reference_loaded_fields', 'is_partly_loaded'
+    '_id', '_values', '_reference_loaded_fields', 'is_partly_loaded',
+    '_changed_fields', '_dynamic_fields', '_loading_options', '_snapshots'
 ]
 
+MISSING = object()
+
+# maximum number of ids loaded by each query in load_references
+REFERENCE_BATCH_SIZE = 500
+
+# maximum number of field paths resolved by get_fields cached in each document class
+FIELD_PATH_CACHE_SIZE = 1000
+
+
+class LazyValues(dict):
+    '''
+    Values of a document loaded with lazy decoding.
+
+    The values loaded from MongoDB are kept as they are in `raw_values` and
+    each one is converted with the `from_son` of its field only the first time
+    it is read. Iterating over the values converts all of them.
+    '''
+
+    def __init__(self, values, raw_values, fields):
+        dict.__init__(self, ((k, v) for k, v in values.items() if k not in raw_values))
+        self.raw_values = raw_values
+        self.fields = fields
+
+    def decode(self, name):
+        value = self.fields[name].from_son(self.raw_values.pop(name))
+        dict.__setitem__(self, name, value)
+        return value
+
+    def decode_all(self):
+        for name in list(self.raw_values):
+            self.decode(name)
+
+    def __missing__(self, name):
+        if name in self.raw_values:
+            return self.decode(name)
+        raise KeyError(name)
+
+    def get(self, name, default=None):
+        if name in self.raw_values:
+            return self.decode(name)
+        return dict.get(self, name, default)
+
+    def __contains__(self, name):
+        return name in self.raw_values or dict.__contains__(self, name)
+
+    def __setitem__(self, name, value):
+        self.raw_values.pop(name, None)
+        dict.__setitem__(self, name, value)
+
+    def __delitem__(self, name):
+        if self.raw_values.pop(name, MISSING) is MISSING:
+            dict.__delitem__(self, name)
+
+    def pop(self, name, *default):
+        if name in self.raw_values:
+            self.decode(name)
+        return dict.pop(self, name, *default)
+
+    def setdefault(self, name, default=None):
+        if name not in self:
+            self[name] = default
+        return self[name]
+
+    def update(self, *args, **kw):
+        for name, value in dict(*args, **kw).items():
+            self[name] = value
+
+    def __len__(self):
+        return len(self.raw_values) + dict.__len__(self)
+
+    def __iter__(self):
+        self.decode_all()
+        return dict.__iter__(self)
+
+    def keys(self):
+        self.decode_all()
+        return dict.keys(self)
+
+    def values(self):
+        self.decode_all()
+        return dict.values(self)
+
+    def items(self):
+        self.decode_all()
+        return dict.items(self)
+
+    def copy(self):
+        self.decode_all()
+        return dict(self)
+
+    def __eq__(self, other):
+        self.decode_all()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        self.decode_all()
+        return dict.__repr__(self)
+
 
 class BaseDocument(object):
+    # names of the fields changed since the document was loaded from the
+    # database, or None if changes are not being tracked (the document was
+    # never loaded nor saved) and it must be written as a whole
+    _changed_fields = None
+    # name -> SON of the list and dict values read while tracking changes, to
+    # find the ones changed in place (they are saved only if they differ)
+    _snapshots = None
+    # name -> db_field of the fields that are not declared in the class,
+    # kept per instance so the class-level _fields never grows
+    _dynamic_fields = None
+
+    # options of the query that loaded the document, used by the identity map
+    # (None for documents that were not loaded by a query)
+    _loading_options = None
+
     def __init__(
         self, _is_partly_loaded=False, _reference_loaded_fields=None, **kw
     ):
@@ -23,8 +145,6 @@ class BaseDocument(object):
         reference fields if any. Default: None.
         :param kw: pairs of fields of the document and their values
         """
-        from motorengine.fields.dynamic_field import DynamicField
-
         self._id = kw.pop('_id', None)
         self._values = {}
         self.is_partly_loaded = _is_partly_loaded
@@ -42,9 +162,14 @@ class BaseDocument(object):
 
         for key, value in kw.items():
             if key not in self._fields:
-                self._fields[key] = DynamicField(db_field="_%s" % key.lstrip('_'))
+                self._add_dynamic_field(key, "_%s" % key.lstrip('_'))
             self._values[key] = value
 
+    def _add_dynamic_field(self, name, db_field):
+        if self._dynamic_fields is None:
+            self._dynamic_fields = {}
+        self._dynamic_fields[name] = db_field
+
     @classmethod
     @return_future
     def ensure_index(cls, callback=None):
@@ -67,34 +192,211 @@ class BaseDocument(object):
         return isinstance(field, EmbeddedDocumentField) or (isinstance(field, type) and issubclass(field, EmbeddedDocumentField))
 
     @classmethod
-    def from_son(cls, dic, _is_partly_loaded=False, _reference_loaded_fields=None):
-        field_values = {}
+    def from_son(cls, dic, _is_partly_loaded=False, _reference_loaded_fields=None, _lazy_decode=None):
+        """
+        :param _lazy_decode: if `True` the values of the fields are kept as
+        loaded from MongoDB and are only converted when first accessed.
+        Default: `__lazy_decode__` of the document class.
+        """
+        if _lazy_decode is None:
+            _lazy_decode = cls.__lazy_decode__
+
+        if _lazy_decode:
+            return cls.lazy_from_son(
+                dic,
+                _is_partly_loaded=_is_partly_loaded,
+                _reference_loaded_fields=_reference_loaded_fields
+            )
+
+        _object_id = dic.pop('_id', None)
+
+        if serializers.COMPILE_SERIALIZERS:
+            if cls._compiled_from_son is None:
+                cls.compile_serializers()
+            field_values = cls._compiled_from_son(dic)
+        else:
+            field_values = {}
+            for name, value in dic.items():
+                field = cls.get_field_by_db_name(name)
+                if field:
+                    field_values[field.name] = field.from_son(value)
+                else:
+                    field_values[cls.get_dynamic_field_name(name)] = value
+
+        field_values["_id"] = _object_id
+
+        document = cls(
+            _is_partly_loaded=_is_partly_loaded,
+            _reference_loaded_fields=_reference_loaded_fields,
+            **field_values
+        )
+        document._changed_fields = set()
+
+        return document
+
+    @classmethod
+    def lazy_from_son(cls, dic, _is_partly_loaded=False, _reference_loaded_fields=None):
         _object_id = dic.pop('_id', None)
+
+        raw_values = {}
+        field_values = {}
         for name, value in dic.items():
+            field = cls._db_field_index.get(name)
+            if field is not None:
+                raw_values[field.name] = value
+                continue
+
             field = cls.get_field_by_db_name(name)
             if field:
                 field_values[field.name] = field.from_son(value)
             else:
-                field_values[name] = value
+                field_values[cls.get_dynamic_field_name(name)] = value
+
         field_values["_id"] = _object_id
 
-        return cls(
+        document = cls(
             _is_partly_loaded=_is_partly_loaded,
             _reference_loaded_fields=_reference_loaded_fields,
             **field_values
         )
+        document._values = LazyValues(document._values, raw_values, document._fields)
+        document._changed_fields = set()
+
+        return document
+
+    def _reload_from(self, document):
+        '''
+        Replaces the values of this document with the values of `document`, of the same class, just
+        loaded from the database.
+        '''
+        self._values = document._values
+        self._dynamic_fields = document._dynamic_fields
+        self._reference_loaded_fields = document._reference_loaded_fields
+        self.is_partly_loaded = document.is_partly_loaded
+        self._changed_fields = set()
+        self._snapshots = None
+
+    def _is_raw_value(self, name):
+        '''
+        Returns True if the value of the field was not converted since it was loaded (see `LazyValues`).
+        '''
+        raw_values = getattr(self._values, 'raw_values', None)
+        return raw_values is not None and name in raw_values
 
     def to_son(self):
+        raw_values = getattr(self._values, 'raw_values', None)
+
+        if serializers.COMPILE_SERIALIZERS and not raw_values:
+            cls = self.__class__
+            if cls._compiled_to_son is None:
+                cls.compile_serializers()
+            return cls._compiled_to_son(self)
+
         data = dict()
 
         for name, field in self._fields.items():
+            if raw_values and name in raw_values:
+                # untouched value of a lazy decoded document
+                value = raw_values[name]
+                if field.sparse and value is None:
+                    continue
+                data[field.db_field] = value
+                continue
+
             value = self.get_field_value(name)
             if field.sparse and value is None:
                 continue
             data[field.db_field] = field.to_son(value)
 
+        if self._dynamic_fields:
+            for name, db_field in self._dynamic_fields.items():
+                data[db_field] = self._values.get(name, None)
+
         return data
 
+    def _mark_as_changed(self, name):
+        if self._changed_fields is not None:
+            self._changed_fields.add(name)
+
+    def _get_snapshot(self, name, value):
+        field = self._fields.get(name)
+        if field is not None:
+            value = field.to_son(value)
+
+        return copy.deepcopy(value)
+
+    def _take_snapshot(self, name, value):
+        '''
+        Keeps a copy of a list or dict value that is being read, since it can be changed in place.
+        '''
+        if self._changed_fields is None or name in self._changed_fields:
+            return
+
+        if self._snapshots is None:
+            self._snapshots = {}
+
+        if name not in self._snapshots:
+            self._snapshots[name] = self._get_snapshot(name, value)
+
+    def _is_changed_in_place(self, name):
+        if not self._snapshots or name not in self._snapshots:
+            return False
+
+        return self._get_snapshot(name, self._values.get(name, None)) != self._snapshots[name]
+
+    def _clear_changed_fields(self):
+        '''
+        Starts tracking changes from the current state of the document (and of its embedded documents).
+        '''
+        self._changed_fields = set()
+        self._snapshots = None
+
+        for name, field in self._fields.items():
+            if self.is_embedded_field(field) and not self._is_raw_value(name):
+                value = self._values.get(name, None)
+                if value is not None:
+                    value._clear_changed_fields()
+
+    def _delta(self):
+        '''
+        Returns the `$set` and `$unset` documents with the db paths of the fields changed since the document was loaded.
+        '''
+        set_values = {}
+        unset_values = {}
+        self._fill_delta(set_values, unset_values, prefix="")
+
+        return set_values, unset_values
+
+    def _fill_delta(self, set_values, unset_values, prefix):
+        for name, field in self._fields.items():
+            path = prefix + field.db_field
+
+            if name not in self._changed_fields and not self._is_changed_in_place(name):
+                if not self.is_embedded_field(field) or self._is_raw_value(name):
+                    continue
+
+                value = self._values.get(name, None)
+                if value is None:
+                    continue
+
+                if value._changed_fields is not None:
+                    value._fill_delta(set_values, unset_values, prefix="%s." % path)
+                    continue
+
+                # embedded document that is not tracking its changes,
+                # so it has to be written as a whole
+
+            value = self.get_field_value(name)
+            if field.sparse and value is None:
+                unset_values[path] = ""
+            else:
+                set_values[path] = field.to_son(value)
+
+        if self._dynamic_fields:
+            for name, db_field in self._dynamic_fields.items():
+                if name in self._changed_fields or self._is_changed_in_place(name):
+                    set_values[prefix + db_field] = self._values.get(name, None)
+
     def validate(self):
         return self.validate_fields()
 
@@ -117,6 +419,14 @@ class BaseDocument(object):
         '''
         self.objects.save(self, callback=callback, alias=alias, upsert=upsert)
 
+    @return_future
+    def reload(self, callback, alias=None):
+        '''
+        Loads the values of this document again from the database and calls back with it, or with None if it was
+        deleted. Changes not saved yet are discarded.
+        '''
+        self.objects.reload(self, callback=callback, alias=alias)
+
     @return_future
     def delete(self, callback, alias=None):
         '''
@@ -162,21 +472,145 @@ class BaseDocument(object):
             collection[field_name] = []
         collection[field_name].append(value)
 
-    def handle_load_reference(self, callback, references, reference_count, values_collection, field_name, fill_values_method=None):
-        if fill_values_method is None:
-            fill_values_method = self.fill_values_collection
+    def get_reference_batches(self, references):
+        '''
+        Groups the references by document type and projection.
+
+        Returns a list of `(key, document_type, projection, ids)` with at most
+        `REFERENCE_BATCH_SIZE` distinct ids each, so each batch can be loaded
+        with a single `$in` query.
+        '''
+        groups = []
+        groups_by_key = {}
+
+        for document_type, projection, document_id, values_collection, field_name, fill_values_method in references:
+            if document_id is None or isinstance(document_id, BaseDocument):
+                # missing or already loaded
+                continue
+
+            key = self._get_reference_batch_key(document_type, projection)
+            if key not in groups_by_key:
+                groups_by_key[key] = (key, document_type, projection, [], set())
+                groups.append(groups_by_key[key])
+
+            ids, seen = groups_by_key[key][3:]
+            document_id = self._get_reference_id(document_id)
+            if document_id not in seen:
+                seen.add(document_id)
+                ids.append(document_id)
+
+        batches = []
+        for key, document_type, projection, ids, seen in groups:
+            for index in range(0, len(ids), REFERENCE_BATCH_SIZE):
+                batches.append((key, document_type, projection, ids[index:index + REFERENCE_BATCH_SIZE]))
+
+        return batches
+
+    def _get_reference_batch_key(self, document_type, projection):
+        if not projection:
+            return (document_type, None)
+        return (document_type, repr(sorted(projection.items())))
+
+    def _get_reference_id(self, document_id):
+        if not isinstance(document_id, ObjectId):
+            document_id = ObjectId(document_id)
+        return document_id
+
+    def resolve_references_from_identity_map(self, references):
+        '''
+        Replaces the ids of the references already in the active identity map (if any) with the documents in it.
+        '''
+        identity_map = get_identity_map()
+        if identity_map is None:
+            return
+
+        for reference in references:
+            document_type, projection, document_id = reference[:3]
+            if projection or document_id is None or isinstance(document_id, BaseDocument):
+                continue
+
+            document = identity_map.get(document_type, self._get_reference_id(document_id))
+            if document is not None:
+                reference[2] = document
+
+    def get_reference_batch_queryset(self, document_type, projection, ids):
+        queryset = document_type.objects
+        if projection:
+            queryset = queryset.fields(**projection)
+
+        return queryset.filter({'_id': {'$in': ids}}).limit(len(ids))
+
+    def fill_references(self, references, loaded_documents):
+        '''
+        Replaces the ids of the references with the loaded documents, keeping the original order of lists.
+
+        `loaded_documents` maps batch keys to dicts of id -> loaded document. References to
+        documents that do not exist are filled with None.
+        '''
+        values_collection = None
+
+        for document_type, projection, document_id, values_collection, field_name, fill_values_method in references:
+            if fill_values_method is None:
+                fill_values_method = self.fill_values_collection
+
+            if document_id is None or isinstance(document_id, BaseDocument):
+                value = document_id
+            else:
+                key = self._get_reference_batch_key(document_type, projection)
+                value = loaded_documents.get(key, {}).get(self._get_reference_id(document_id))
+
+            fill_values_method(values_collection, field_name, value)
 
+        return values_collection
+
+    def handle_load_reference_batch(self, callback, references, batches, loaded_documents, key):
         def handle(*args, **kw):
-            fill_values_method(values_collection, field_name, args[0])
+            documents = loaded_documents.setdefault(key, {})
+            for document in args[0]:
+                documents[document._id] = document
 
-            if reference_count > 0:
-                references.pop()
+            batches.pop()
 
-            if len(references) == 0:
-                callback({
-                    'loaded_reference_count': reference_count,
-                    'loaded_values': values_collection
-                })
+            if len(batches) == 0:
+                callback(self.fill_references(references, loaded_documents))
+
+        return handle
+
+    @return_future
+    def fetch_references(self, references, callback=None):
+        '''
+        Loads the documents of `references` (as returned by `find_references`, possibly
+        for several documents) with one query per batch and fills them in place.
+
+        Calls back with the values collection of the last reference.
+        '''
+        self.resolve_references_from_identity_map(references)
+        batches = self.get_reference_batches(references)
+        loaded_documents = {}
+
+        if not batches:
+            callback(self.fill_references(references, loaded_documents))
+            return
+
+        pending_batches = list(batches)
+        for key, document_type, projection, ids in batches:
+            queryset = self.get_reference_batch_queryset(document_type, projection, ids)
+            queryset.find_all(
+                callback=self.handle_load_reference_batch(
+                    callback=callback,
+                    references=references,
+                    batches=pending_batches,
+                    loaded_documents=loaded_documents,
+                    key=key
+                )
+            )
+
+    def handle_fetch_references(self, callback, reference_count):
+        def handle(values_collection):
+            callback({
+                'loaded_reference_count': reference_count,
+                'loaded_values': values_collection
+            })
 
         return handle
 
@@ -195,18 +629,9 @@ class BaseDocument(object):
             })
             return
 
-        for dereference_function, document_id, values_collection, field_name, fill_values_method in references:
-            dereference_function(
-                document_id,
-                callback=self.handle_load_reference(
-                    callback=callback,
-                    references=references,
-                    reference_count=reference_count,
-                    values_collection=values_collection,
-                    field_name=field_name,
-                    fill_values_method=fill_values_method
-                )
-            )
+        self.fetch_references(
+            references, callback=self.handle_fetch_references(callback, reference_count)
+        )
 
     def find_references(self, document, fields=None, results=None):
         if results is None:
@@ -231,23 +656,17 @@ class BaseDocument(object):
 
         return results
 
-    def _get_load_function(self, document, field_name, document_type):
-        """Get appropriate method to load reference field of the document"""
-        if field_name in document._reference_loaded_fields:
-            # there is a projection for this field
-            fields = document._reference_loaded_fields[field_name]
-            return document_type.objects.fields(**fields).get
-        return document_type.objects.get
+    def _get_reference_projection(self, document, field_name):
+        """Get the projection (if any) used to load reference field of the document"""
+        return document._reference_loaded_fields.get(field_name)
 
     def find_reference_field(self, document, results, field_name, field):
         if self.is_reference_field(field):
             value = document._values.get(field_name, None)
-            load_function = self._get_load_function(
-                document, field_name, field.reference_type
-            )
             if value is not None:
                 results.append([
-                    load_function,
+                    field.reference_type,
+                    self._get_reference_projection(document, field_name),
                     value,
                     document._values,
                     field_name,
@@ -262,12 +681,11 @@ class BaseDocument(object):
                 document_type = values[0].__class__
                 if isinstance(field._base_field, ReferenceField):
                     document_type = field._base_field.reference_type
-                    load_function = self._get_load_function(
-                        document, field_name, document_type
-                    )
+                    projection = self._get_reference_projection(document, field_name)
                     for value in values:
                         results.append([
-                            load_function,
+                            document_type,
+                            projection,
                             value,
                             document._values,
                             field_name,
@@ -284,6 +702,9 @@ class BaseDocument(object):
                 self.find_references(document=value, results=results)
 
     def get_field_value(self, name):
+        if self._dynamic_fields and name in self._dynamic_fields:
+            return self._values.get(name, None)
+
         if name not in self._fields:
             raise ValueError("Field %s not found in instance of %s." % (
                 name,
@@ -295,72 +716,111 @@ class BaseDocument(object):
 
         return value
 
-    def __getattribute__(self, name):
-        # required for the next test
-        if name in ['_fields']:
-            return object.__getattribute__(self, name)
-
-        if name in self._fields:
-            field = self._fields[name]
-            is_reference_field = self.is_reference_field(field)
-            value = field.get_value(self._values.get(name, None))
-
-            if is_reference_field and value is not None and not isinstance(value, field.reference_type):
-                message = "The property '%s' can't be accessed before calling 'load_references'" + \
-                    " on its instance first (%s) or setting __lazy__ to False in the %s class."
-
-                raise LoadReferencesRequiredError(
-                    message % (name, self.__class__.__name__, self.__class__.__name__)
-                )
+    def __getattr__(self, name):
+        # declared fields are resolved by the descriptors installed in
+        # DocumentMetaClass, so only dynamic fields get this far
+        dynamic_fields = self.__dict__.get('_dynamic_fields')
 
+        if dynamic_fields and name in dynamic_fields:
+            value = self._values.get(name, None)
+            if isinstance(value, (list, dict)):
+                # it can be changed in place
+                self._take_snapshot(name, value)
             return value
 
-        return object.__getattribute__(self, name)
+        raise AttributeError("'%s' object has no attribute '%s'" % (
+            self.__class__.__name__,
+            name
+        ))
 
     def __setattr__(self, name, value):
-        from motorengine.fields.dynamic_field import DynamicField
-
-        if name not in AUTHORIZED_FIELDS and name not in self._fields:
-            self._fields[name] = DynamicField(db_field="_%s" % name)
-
-        if name in self._fields:
-            self._values[name] = value
+        if name in AUTHORIZED_FIELDS:
+            object.__setattr__(self, name, value)
             return
 
-        object.__setattr__(self, name, value)
+        if name not in self._fields and (not self._dynamic_fields or name not in self._dynamic_fields):
+            self._add_dynamic_field(name, "_%s" % name)
+
+        self._values[name] = value
+        self._mark_as_changed(name)
 
     @classmethod
     def get_field_by_db_name(cls, name):
-        for field_name, field in cls._fields.items():
-            if name == field.db_field or name.lstrip("_") == field.db_field:
-                return field
-        return None
+        index = cls._db_field_index
+        field = index.get(name)
+        if field is None:
+            field = index.get(name.lstrip("_"))
+        return field
+
+    @classmethod
+    def get_dynamic_field_name(cls, db_field):
+        '''
+        Returns the name of the dynamic field for a key loaded from MongoDB that is not declared in the
+        document. Dynamic fields are stored with a leading underscore (`a` is stored as `_a`).
+        '''
+        if db_field.startswith('_'):
+            return db_field[1:]
+        return db_field
 
     @classmethod
     def get_fields(cls, name, fields=None):
+        '''
+        Returns the chain of fields for a dotted path (e.g. `address.city`), with a `DynamicField`
+        for names that are not declared in the document.
+
+        Chains are cached per class and path, so the same field objects are shared between
+        queries, `order_by`, projections and aggregations.
+        '''
+        field_chain = cls._field_paths.get(name)
+
+        if field_chain is None:
+            field_chain = cls._resolve_fields(name)
+
+            if len(cls._field_paths) < FIELD_PATH_CACHE_SIZE:
+                cls._field_paths[name] = field_chain
+
+        if fields is None:
+            return list(field_chain)
+
+        fields.extend(field_chain)
+        return fields
+
+    @classmethod
+    def _resolve_fields(cls, name):
         from motorengine import EmbeddedDocumentField, ListField
         from motorengine.fields.dynamic_field import DynamicField
 
-        if fields is None:
-            fields = []
+        field_values = name.split('.', 1)
 
-        if '.' not in name:
-            dyn_field = DynamicField(db_field="_%s" % name)
-            fields.append(cls._fields.get(name, dyn_field))
-            return fields
+        obj = cls._fields.get(field_values[0])
+        if obj is None:
+            obj = DynamicField(db_field="_%s" % field_values[0])
 
-        field_values = name.split('.')
-        dyn_field = DynamicField(db_field="_%s" % field_values[0])
-        obj = cls._fields.get(field_values[0], dyn_field)
-        fields.append(obj)
+        fields = [obj]
 
-        if isinstance(obj, (EmbeddedDocumentField, )):
-            obj.embedded_type.get_fields(".".join(field_values[1:]), fields=fields)
+        if len(field_values) > 1:
+            if isinstance(obj, (EmbeddedDocumentField, )):
+                obj.embedded_type.get_fields(field_values[1], fields=fields)
 
-        if isinstance(obj, (ListField, )):
-            obj.item_type.get_fields(".".join(field_values[1:]), fields=fields)
+            if isinstance(obj, (ListField, )):
+                obj.item_type.get_fields(field_values[1], fields=fields)
 
-        return fields
+        return tuple(fields)
+
+    @classmethod
+    def get_db_field_path(cls, name):
+        '''
+        Returns the path in the database for a dotted path of declared fields or None if any of them
+        is not declared.
+        '''
+        from motorengine.fields.dynamic_field import DynamicField
+
+        fields = cls.get_fields(name)
+
+        if len(fields) != len(name.split('.')) or any(isinstance(field, DynamicField) for field in fields):
+            return None
+
+        return ".".join([field.db_field for field in fields])
 
 
 class Document(six.with_metaclass(DocumentMetaClass, BaseDocument)):
@@ -16,6 +16,21 @@ class PartlyLoadedDocumentError(ValueError):
     pass
 
 
+class BulkInsertError(RuntimeError):
+    def __init__(self, message, errors, documents):
+        super(BulkInsertError, self).__init__(message)
+
+        self.errors = errors
+        self.documents = documents
+
+
+class QueryPlanError(RuntimeError):
+    def __init__(self, message, plan):
+        super(QueryPlanError, self).__init__(message)
+
+        self.plan = plan
+
+
 # E11000 duplicate key error index: test.UniqueFieldDocument.$name_1  dup key: { : "test" }
 PYMONGO_ERROR_REGEX = re.compile(r"(?P<error_code>.+?)\s(?P<error_type>.+?):\s*(?P<index_name>.+?)\s+(?P<error>.+?)")
 
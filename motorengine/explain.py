@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Query plan inspection (see `QuerySet.explain`) and strict mode.
+
+When strict mode is enabled for a connection alias, the first query of each
+shape (the filter with its values replaced, the sort and the projection) is
+explained before it runs and the plan is reported if it scans the whole
+collection or if it examines too many documents for each document returned:
+
+.. code-block:: python
+
+    from motorengine.explain import enable_strict_mode
+
+    enable_strict_mode()  # logs a warning for the default alias
+    enable_strict_mode(alias="reports", raise_error=True, max_docs_examined_ratio=100)
+
+Reported plans are logged to the `motorengine.explain` logger or raise
+`QueryPlanError` if `raise_error` is set.
+'''
+
+import logging
+
+from easydict import EasyDict as edict
+
+from motorengine.connection import DEFAULT_CONNECTION_NAME
+from motorengine.errors import QueryPlanError
+
+DEFAULT_MAX_DOCS_EXAMINED_RATIO = 10
+
+logger = logging.getLogger('motorengine.explain')
+
+_strict_mode = {}
+_explained_shapes = {}
+
+
+def enable_strict_mode(alias=DEFAULT_CONNECTION_NAME, raise_error=False,
+                       max_docs_examined_ratio=DEFAULT_MAX_DOCS_EXAMINED_RATIO):
+    '''
+    Explains the first query of each shape in the `alias` database and logs (or raises
+    `QueryPlanError` if `raise_error` is set) when its plan is a collection scan or when it
+    examines more than `max_docs_examined_ratio` documents for each document returned.
+    '''
+    _strict_mode[alias] = edict(raise_error=raise_error, max_docs_examined_ratio=max_docs_examined_ratio)
+    _explained_shapes[alias] = set()
+
+
+def disable_strict_mode(alias=DEFAULT_CONNECTION_NAME):
+    _strict_mode.pop(alias, None)
+    _explained_shapes.pop(alias, None)
+
+
+def get_strict_mode(alias=DEFAULT_CONNECTION_NAME):
+    return _strict_mode.get(alias)
+
+
+def get_query_shape(value):
+    '''
+    Returns a hashable representation of a query without its values, so queries that only
+    differ in the values compared have the same shape.
+    '''
+    if isinstance(value, dict):
+        return tuple(sorted((key, get_query_shape(item)) for key, item in value.items()))
+
+    if isinstance(value, (list, tuple)):
+        return tuple(get_query_shape(item) for item in value)
+
+    return None
+
+
+def should_explain(alias, collection, shape):
+    '''
+    Returns True the first time a query with `shape` is run in `collection` while strict mode
+    is enabled for `alias`.
+    '''
+    if alias not in _strict_mode:
+        return False
+
+    key = (collection, shape)
+    explained_shapes = _explained_shapes[alias]
+
+    if key in explained_shapes:
+        return False
+
+    explained_shapes.add(key)
+    return True
+
+
+def get_plan_stages(plan):
+    stages = [plan]
+
+    for child in plan.get('inputStages', []) + [plan.get('inputStage')]:
+        if child:
+            stages.extend(get_plan_stages(child))
+
+    for shard in plan.get('shards', []):
+        stages.extend(get_plan_stages(shard.get('winningPlan', {})))
+
+    return stages
+
+
+def get_plan_summary(explain_result):
+    '''
+    Returns the relevant parts of the result of the explain command: the winning plan, its
+    stages, the names of the indexes used, the number of keys and documents examined and the
+    number of documents returned.
+    '''
+    winning_plan = explain_result.get('queryPlanner', {}).get('winningPlan', {})
+    execution_stats = explain_result.get('executionStats', {})
+
+    stages = get_plan_stages(winning_plan)
+    index_names = [stage['indexName'] for stage in stages if 'indexName' in stage]
+    stage_names = [stage['stage'] for stage in stages if 'stage' in stage]
+
+    return edict(
+        winning_plan=winning_plan,
+        stages=stage_names,
+        index_name=index_names[0] if index_names else None,
+        index_names=index_names,
+        keys_examined=execution_stats.get('totalKeysExamined'),
+        docs_examined=execution_stats.get('totalDocsExamined'),
+        returned=execution_stats.get('nReturned'),
+        is_collection_scan='COLLSCAN' in stage_names,
+        raw=explain_result,
+    )
+
+
+def get_plan_problem(summary, max_docs_examined_ratio=DEFAULT_MAX_DOCS_EXAMINED_RATIO):
+    '''
+    Returns why the plan in `summary` is reported by strict mode or None.
+    '''
+    if summary.is_collection_scan:
+        return "the query plan is a collection scan (COLLSCAN)"
+
+    if summary.docs_examined is None or max_docs_examined_ratio is None:
+        return None
+
+    ratio = float(summary.docs_examined) / max(summary.returned or 0, 1)
+    if ratio > max_docs_examined_ratio:
+        return "the query examined %d documents to return %d (more than %s per document returned)" % (
+            summary.docs_examined, summary.returned or 0, max_docs_examined_ratio
+        )
+
+    return None
+
+
+def check_query_plan(alias, description, summary):
+    '''
+    Logs or raises `QueryPlanError` (depending on the strict mode settings of `alias`) if the
+    plan in `summary` has a problem.
+    '''
+    settings = _strict_mode.get(alias)
+    if settings is None:
+        return
+
+    problem = get_plan_problem(summary, settings.max_docs_examined_ratio)
+    if problem is None:
+        return
+
+    message = "Inefficient query in %s: %s." % (description, problem)
+
+    if settings.raise_error:
+        raise QueryPlanError(message, summary)
+
+    logger.warning(message)
@@ -14,6 +14,7 @@ class BaseField(object):
     * `on_save` - A function of the form `lambda doc, updating` that is called right before sending the document to the DB.
     * `unique` - Indicates whether an unique index should be created for this field.
     * `sparse` - Indicates whether a sparse index should be created for this field. This also will not pass empty values to DB.
+    * `collation` - The collation (e.g. `{'locale': 'en', 'strength': 2}` to compare strings case insensitively) of the index created for this field. Filters with the `iexact` and `istartswith` operators on this field are compiled to comparisons that run with this collation and can use the index, instead of regular expressions, when every other string in the query (and its order) is compared with the same collation.
 
     To create a new field, four methods can be overwritten:
 
@@ -25,7 +26,8 @@ class BaseField(object):
 
     total_creation_counter = 0
 
-    def __init__(self, db_field=None, default=None, required=False, on_save=None, unique=None, sparse=False):
+    def __init__(self, db_field=None, default=None, required=False, on_save=None, unique=None, sparse=False,
+                 collation=None):
         global creation_counter
         self.creation_counter = BaseField.total_creation_counter
         BaseField.total_creation_counter += 1
@@ -36,6 +38,7 @@ class BaseField(object):
         self.on_save = on_save
         self.unique = unique
         self.sparse = sparse
+        self.collation = collation
 
     def is_empty(self, value):
         return value is None
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import weakref
+from collections import OrderedDict
+
+try:
+    import contextvars
+except ImportError:  # python < 3.7
+    contextvars = None
+
+
+DEFAULT_MAX_SIZE = 1000
+
+if contextvars is not None:
+    _current_identity_map = contextvars.ContextVar('motorengine_identity_map', default=None)
+else:
+    _current_identity_map = None
+
+
+def get_identity_map():
+    '''
+    Returns the identity map active in the current context or None.
+    '''
+    if _current_identity_map is None:
+        return None
+
+    return _current_identity_map.get()
+
+
+def _set_identity_map(identity_map):
+    if _current_identity_map is None:
+        # without contextvars the only scope available is the thread, shared by all the
+        # requests handled by the IOLoop, so documents would leak between them
+        raise RuntimeError(
+            "IdentityMap requires contextvars (Python 3.7+) to keep a separate map for each request or task."
+        )
+
+    return _current_identity_map.get(), _current_identity_map.set(identity_map)
+
+
+def _reset_identity_map(previous, token):
+    try:
+        _current_identity_map.reset(token)
+    except ValueError:
+        # the block was left in a different context than the one it was entered in
+        # (e.g. after yielding in a coroutine)
+        _current_identity_map.set(previous)
+
+
+class IdentityMap(object):
+    '''
+    Keeps a single in-memory instance per document class and `_id`.
+
+    While an identity map is active, `get`, `find_all` and reference loading return the instance
+    already in the map instead of building a new one from the loaded data (and `get` by id does not
+    query the database at all). Saving a document updates the map and deleting or updating documents
+    through a queryset invalidates it.
+
+    The identity map is active inside the `with` block, in the current context (using `contextvars`, so
+    each request or task gets its own map). Entering the block raises RuntimeError on Python versions
+    without `contextvars` (before 3.7):
+
+    .. code-block:: python
+
+        with IdentityMap():
+            user = yield User.objects.get(user_id)
+            same_user = yield User.objects.get(user_id)  # no round trip
+            assert user is same_user
+
+    * `max_size` - Maximum number of documents kept in the map, evicting the least recently used ones.
+      If `None` the map is unbounded but only keeps weak references to the documents.
+
+    Partly loaded documents (with `only`, `exclude` or `fields`) are never kept in the map. Documents loaded
+    by a query are only reused by queries that load them the same way (with the same `lazy_decode`, reference
+    projections, `select_related`, `lookup_related` and loading of references); other queries build a new
+    instance and keep the one in the map.
+    '''
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self._contexts = []
+
+        if max_size is None:
+            self._documents = weakref.WeakValueDictionary()
+        else:
+            self._documents = OrderedDict()
+
+    def get(self, document_class, document_id, loading_options=None):
+        '''
+        Returns the document in the map, if any. If `loading_options` are specified, documents loaded
+        with different options are not returned.
+        '''
+        key = (document_class, document_id)
+        document = self._documents.get(key)
+
+        if document is None:
+            return None
+
+        if loading_options is not None and document._loading_options not in (None, loading_options):
+            return None
+
+        if self.max_size is not None:
+            # most recently used documents are kept at the end
+            del self._documents[key]
+            self._documents[key] = document
+
+        return document
+
+    def add(self, document, loading_options=None):
+        '''
+        Keeps the document in the map, with the `loading_options` of the query that loaded it (if any).
+        '''
+        if document._id is None or document.is_partly_loaded:
+            return
+
+        if loading_options is not None:
+            document._loading_options = loading_options
+
+        key = (document.__class__, document._id)
+
+        if self.max_size is None:
+            self._documents[key] = document
+            return
+
+        self._documents.pop(key, None)
+        self._documents[key] = document
+
+        while len(self._documents) > self.max_size:
+            self._documents.popitem(last=False)
+
+    def remove(self, document_class, document_id):
+        self._documents.pop((document_class, document_id), None)
+
+    def remove_class(self, document_class):
+        for key in list(self._documents.keys()):
+            if issubclass(key[0], document_class):
+                self._documents.pop(key, None)
+
+    def clear(self):
+        self._documents.clear()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def __contains__(self, document):
+        return (document.__class__, document._id) in self._documents
+
+    def __enter__(self):
+        self._contexts.append(_set_identity_map(self))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _reset_identity_map(*self._contexts.pop())
@@ -3,9 +3,10 @@
 
 # code adapted from https://github.com/MongoEngine/mongoengine/blob/master/mongoengine/base/metaclasses.py
 
-from motorengine.fields import BaseField
-from motorengine.errors import InvalidDocumentError
+from motorengine.fields import BaseField, ReferenceField
+from motorengine.errors import InvalidDocumentError, LoadReferencesRequiredError
 from motorengine.queryset import QuerySet
+from motorengine.serializers import compile_to_son, compile_from_son
 
 
 class classproperty(property):
@@ -13,6 +14,64 @@ class classproperty(property):
         return classmethod(self.fget).__get__(None, owner)()
 
 
+class FieldDescriptor(object):
+    '''
+    Data descriptor installed by DocumentMetaClass for every declared field.
+
+    Accessing the attribute on the class returns the field itself (so
+    `User.name` can still be used in `only`, `order_by` and aggregations),
+    while accessing it on an instance returns the value of the field.
+
+    Reading a list or dict value of a document that tracks its changes keeps
+    a snapshot of it, so changes made to it in place are saved (only if the
+    value is different from the snapshot when the document is saved).
+    '''
+
+    def __init__(self, field):
+        self.field = field
+        self.name = field.name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self.field
+
+        value = self.field.get_value(instance._values.get(self.name, None))
+        if isinstance(value, (list, dict)):
+            # it can be changed in place
+            instance._take_snapshot(self.name, value)
+
+        return value
+
+    def __set__(self, instance, value):
+        instance._values[self.name] = value
+        instance._mark_as_changed(self.name)
+
+
+class ReferenceFieldDescriptor(FieldDescriptor):
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self.field
+
+        value = self.field.get_value(instance._values.get(self.name, None))
+
+        if value is not None and not isinstance(value, self.field.reference_type):
+            message = "The property '%s' can't be accessed before calling 'load_references'" + \
+                " on its instance first (%s) or setting __lazy__ to False in the %s class."
+
+            raise LoadReferencesRequiredError(
+                message % (self.name, instance.__class__.__name__, instance.__class__.__name__)
+            )
+
+        return value
+
+
+def get_field_descriptor(field):
+    if isinstance(field, ReferenceField):
+        return ReferenceFieldDescriptor(field)
+
+    return FieldDescriptor(field)
+
+
 class DocumentMetaClass(type):
     query_set_class = QuerySet
 
@@ -41,6 +100,7 @@ class DocumentMetaClass(type):
             if not attr_value.db_field:
                 attr_value.db_field = attr_name
             doc_fields[attr_name] = attr_value
+            attrs[attr_name] = get_field_descriptor(attr_value)
 
             # Count names to ensure no db_field redefinitions
             field_names[attr_value.db_field] = field_names.get(
@@ -62,6 +122,15 @@ class DocumentMetaClass(type):
                                          for v in doc_fields.values()))
         attrs['_reverse_db_field_map'] = dict(
             (v, k) for k, v in attrs['_db_field_map'].items())
+        # db_field -> field index used when decoding documents coming
+        # from MongoDB (see BaseDocument.get_field_by_db_name)
+        attrs['_db_field_index'] = dict(
+            (v.db_field, v) for v in doc_fields.values())
+        # field chains resolved by BaseDocument.get_fields, by path
+        attrs['_field_paths'] = {}
+        # generated on first use by compile_serializers
+        attrs['_compiled_to_son'] = None
+        attrs['_compiled_from_son'] = None
 
         new_class = super_new(cls, name, bases, attrs)
 
@@ -71,6 +140,12 @@ class DocumentMetaClass(type):
         if '__lazy__' not in attrs:
             new_class.__lazy__ = True
 
+        if '__lazy_decode__' not in attrs:
+            new_class.__lazy_decode__ = False
+
+        if not hasattr(new_class, '__max_time_ms__'):
+            new_class.__max_time_ms__ = None
+
         if '__alias__' not in attrs:
             new_class.__alias__ = None
 
@@ -78,6 +153,13 @@ class DocumentMetaClass(type):
 
         return new_class
 
+    def compile_serializers(cls):
+        '''
+        Generates the specialized to_son/from_son functions of this document class.
+        '''
+        cls._compiled_to_son = staticmethod(compile_to_son(cls))
+        cls._compiled_from_son = staticmethod(compile_from_son(cls))
+
     @classmethod
     def _get_bases(cls, bases):
         if isinstance(bases, BasesTuple):
@@ -1,8 +1,20 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import re
+
 from motorengine.fields.base_field import BaseField
 
+REGEX_SPECIAL_CHARACTERS = re.compile(r'([\\^$.|?*+()\[\]{}])')
+
+
+def escape_regex(value):
+    '''
+    Escapes the characters of `value` that have a special meaning in a regular expression, so
+    it is matched literally (and a prefix match can still use an index).
+    '''
+    return REGEX_SPECIAL_CHARACTERS.sub(r'\\\1', "%s" % value)
+
 
 class QueryOperator(object):
     def get_value(self, field, raw_value):
@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from motorengine.query.base import QueryOperator
+from motorengine.query.base import QueryOperator, escape_regex
 
 
 class EndsWithOperator(QueryOperator):
@@ -43,5 +43,5 @@ class EndsWithOperator(QueryOperator):
 
     def to_query(self, field_name, value):
         return {
-            field_name: {"$regex": r'%s$' %value}
+            field_name: {"$regex": r'%s$' % escape_regex(value)}
         }
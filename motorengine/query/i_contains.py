@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from motorengine.query.base import QueryOperator
+from motorengine.query.base import QueryOperator, escape_regex
 
 
 class IContainsOperator(QueryOperator):
@@ -47,7 +47,7 @@ class IContainsOperator(QueryOperator):
     def to_query(self, field_name, value):
         return {
             field_name: {
-                "$regex": r'%s' %value,
+                "$regex": r'%s' % escape_regex(value),
                 "$options": 'i'
             }
         }
@@ -1,14 +1,15 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from motorengine.query.base import QueryOperator
+from motorengine.query.base import QueryOperator, escape_regex
 
 
 class IExactOperator(QueryOperator):
     '''
     Query operator used to return all documents which specified field is exactly as passed string value.
 
-    It is not case sensitive.
+    It is not case sensitive. Fields declared with a `collation` use `CollationIExactOperator` instead, which can use
+    the index with that collation.
 
     For more information on `$regex` go to https://docs.mongodb.org/manual/reference/operator/query/regex/
 
@@ -47,7 +48,22 @@ class IExactOperator(QueryOperator):
     def to_query(self, field_name, value):
         return {
             field_name: {
-                "$regex": r'^%s$' % value,
+                "$regex": r'^%s$' % escape_regex(value),
                 "$options": 'i'
             }
         }
+
+
+class CollationIExactOperator(QueryOperator):
+    '''
+    Query operator used instead of `IExactOperator` for fields declared with a case insensitive
+    `collation` (e.g. `StringField(collation={'locale': 'en', 'strength': 2})`).
+
+    It compiles to an equality, which the queryset runs with the collation of the field, so it
+    can use the index with that collation instead of scanning every key with a regular expression.
+    '''
+
+    def to_query(self, field_name, value):
+        return {
+            field_name: value
+        }
@@ -1,14 +1,20 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from motorengine.query.base import QueryOperator
+import six
+
+from motorengine.query.base import QueryOperator, escape_regex
+
+# sorts after every other character in the root collation (see http://www.unicode.org/reports/tr35/tr35-collation.html)
+COLLATION_MAX_CHARACTER = u'\uffff'
 
 
 class IStartsWithOperator(QueryOperator):
     '''
     Query operator used to return all documents which specified field starts with passed string value.
 
-    It is not case sensitive.
+    It is not case sensitive. Fields declared with a `collation` use `CollationIStartsWithOperator` instead, which can use
+    the index with that collation.
 
     For more information on `$regex` go to https://docs.mongodb.org/manual/reference/operator/query/regex/
 
@@ -47,7 +53,28 @@ class IStartsWithOperator(QueryOperator):
     def to_query(self, field_name, value):
         return {
             field_name: {
-                "$regex": r'^%s' % value,
+                "$regex": r'^%s' % escape_regex(value),
                 "$options": 'i'
             }
         }
+
+
+class CollationIStartsWithOperator(QueryOperator):
+    '''
+    Query operator used instead of `IStartsWithOperator` for fields declared with a case insensitive
+    `collation` (e.g. `StringField(collation={'locale': 'en', 'strength': 2})`).
+
+    It compiles to a range from the prefix up to the prefix followed by the character that sorts
+    last in the collation, which the queryset runs with the collation of the field, so it can use
+    the index with that collation instead of scanning every key with a regular expression.
+    '''
+
+    def to_query(self, field_name, value):
+        value = six.text_type(value)
+
+        return {
+            field_name: {
+                "$gte": value,
+                "$lt": value + COLLATION_MAX_CHARACTER
+            }
+        }
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Cache of compiled query plans.
+
+Compiling a query tree (`QNode.to_query`) simplifies the tree, sorts the keys
+of each `Q` and resolves their fields and operators. All of that only depends
+on the document class and on the shape of the tree (its combinations and the
+keys of its `Q` objects), not on the values being compared. The plan for each
+shape is compiled once and only the values are converted when it is executed:
+
+.. code-block:: python
+
+    from motorengine.query_builder.cache import query_cache
+
+    print(query_cache.hits, query_cache.misses)
+
+Plans are evicted in least recently used order when there are more than
+`QUERY_CACHE_SIZE` of them. Set `QUERY_CACHE_SIZE` to 0 (before using the
+cache) to disable it.
+'''
+
+from collections import OrderedDict
+
+from motorengine.query_builder.param import Param
+from motorengine.query_builder.transform import resolve_query_key, update, get_collation_key
+
+QUERY_CACHE_SIZE = 500
+
+
+class UncacheableQueryError(ValueError):
+    pass
+
+
+def get_query_shape(node):
+    '''
+    Returns a hashable representation of the structure of a query tree.
+    '''
+    from motorengine.query_builder.node import Q, QCombination, QNot
+
+    if isinstance(node, Q):
+        return ('q', tuple(sorted(node.query.keys())))
+
+    if isinstance(node, QCombination):
+        return ('c', node.operation, tuple(get_query_shape(child) for child in node.children))
+
+    if isinstance(node, QNot):
+        return ('not', get_query_shape(node.query))
+
+    # e.g. combinations already compiled in place by QNode.to_query
+    raise UncacheableQueryError()
+
+
+def compile_conditions(document, keys, collation=None):
+    steps = []
+
+    for key in keys:
+        if key == 'raw':
+            steps.append((key, None, None, None))
+        else:
+            steps.append((key, ) + resolve_query_key(document, key, collation))
+
+    def execute(query, params):
+        mongo_query = {}
+
+        for key, field, field_name, operator in steps:
+            if operator is None:
+                update(mongo_query, query[key])
+                continue
+
+            value = query[key]
+            if params is not None and isinstance(value, Param):
+                value = params[value.name]
+
+            update(mongo_query, operator.to_query(field_name, operator.get_value(field, value)))
+
+        return mongo_query
+
+    return execute
+
+
+def get_simplified_keys(combination):
+    '''
+    Returns the keys of the single `Q` that an AND combination of `Q` objects is simplified to
+    (see `SimplificationVisitor`), or None if it can't be simplified.
+    '''
+    from motorengine.query_builder.node import Q
+
+    if combination.operation != combination.AND:
+        return None
+
+    if not all(isinstance(child, Q) for child in combination.children):
+        return None
+
+    keys = set()
+    for child in combination.children:
+        if keys.intersection(child.query.keys()):
+            return None
+        keys.update(child.query.keys())
+
+    return sorted(keys)
+
+
+def compile_plan(document, node, collation=None):
+    '''
+    Returns a function that receives a query tree with the same shape as `node` (and the values
+    of its `Param` objects, if any) and returns the same query as `node.to_query(document, collation)` would.
+    '''
+    from motorengine.query_builder.node import Q, QCombination, QNot
+
+    if isinstance(node, Q):
+        execute_conditions = compile_conditions(document, sorted(node.query.keys()), collation)
+        return lambda node, params=None: execute_conditions(node.query, params)
+
+    if isinstance(node, QNot):
+        execute_query = compile_plan(document, node.query, collation)
+        return lambda node, params=None: QNot.negate(execute_query(node.query, params))
+
+    if isinstance(node, QCombination):
+        simplified_keys = get_simplified_keys(node)
+
+        if simplified_keys is not None:
+            execute_conditions = compile_conditions(document, simplified_keys, collation)
+
+            def execute_simplified(node, params=None):
+                query = {}
+                for child in node.children:
+                    query.update(child.query)
+
+                return execute_conditions(query, params)
+
+            return execute_simplified
+
+        operator = "$or" if node.operation == node.OR else "$and"
+        execute_children = [compile_plan(document, child, collation) for child in node.children]
+
+        def execute_combination(node, params=None):
+            return {operator: [
+                execute_child(child, params) for execute_child, child in zip(execute_children, node.children)
+            ]}
+
+        return execute_combination
+
+    raise UncacheableQueryError()
+
+
+class QueryCache(object):
+    '''
+    LRU cache of compiled query plans keyed by document class, query shape and collation.
+    '''
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._plans = OrderedDict()
+
+    def get_max_size(self):
+        if self.max_size is not None:
+            return self.max_size
+
+        return QUERY_CACHE_SIZE
+
+    def get_plan(self, document, node, collation=None):
+        key = (document, get_query_shape(node), get_collation_key(collation))
+        plan = self._plans.get(key)
+
+        if plan is not None:
+            self.hits += 1
+            # most recently used plans are kept at the end
+            del self._plans[key]
+            self._plans[key] = plan
+            return plan
+
+        self.misses += 1
+        plan = compile_plan(document, node, collation)
+        self._plans[key] = plan
+
+        while len(self._plans) > self.get_max_size():
+            self._plans.popitem(last=False)
+
+        return plan
+
+    def to_query(self, document, node, collation=None):
+        '''
+        Returns the query for `node`, or None if it can't be compiled with a cached plan.
+        '''
+        if self.get_max_size() <= 0:
+            return None
+
+        try:
+            plan = self.get_plan(document, node, collation)
+        except UncacheableQueryError:
+            return None
+
+        return plan(node)
+
+    def clear(self):
+        self._plans.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._plans)
+
+
+query_cache = QueryCache()
@@ -67,8 +67,9 @@ class QueryCompilerVisitor(QNodeVisitor):
     dictionary.
     """
 
-    def __init__(self, document):
+    def __init__(self, document, collation=None):
         self.document = document
+        self.collation = collation
 
     def visit_combination(self, combination):
         operator = "$and"
@@ -78,7 +79,7 @@ class QueryCompilerVisitor(QNodeVisitor):
         return {operator: combination.children}
 
     def visit_query(self, query):
-        return transform_query(self.document, **query.query)
+        return transform_query(self.document, _collation=self.collation, **query.query)
 
 
 class QNode(object):
@@ -88,9 +89,21 @@ class QNode(object):
     AND = 0
     OR = 1
 
-    def to_query(self, document):
+    def to_query(self, document, collation=None):
+        """Compiles the query tree for `document`, comparing the fields declared with `collation`
+        with the operators in `COLLATION_OPERATORS` (see `get_query_collation`).
+        """
+        from motorengine.query_builder.cache import query_cache
+
+        query = query_cache.to_query(document, self, collation)
+        if query is not None:
+            return query
+
+        return self.compile_query(document, collation)
+
+    def compile_query(self, document, collation=None):
         query = self.accept(SimplificationVisitor(), document)
-        query = query.accept(QueryCompilerVisitor(document), document)
+        query = query.accept(QueryCompilerVisitor(document, collation), document)
         return query
 
     def accept(self, visitor, document):
@@ -205,10 +218,16 @@ class QNot(QNode):
         self.query = query
 
     def accept(self, visitor, document):
-        return self.to_query(document)
+        if isinstance(visitor, QueryCompilerVisitor):
+            return self.to_query(document, visitor.collation)
+
+        return self
+
+    def to_query(self, document, collation=None):
+        return self.negate(self.query.to_query(document, collation))
 
-    def to_query(self, document):
-        query = self.query.to_query(document)
+    @staticmethod
+    def negate(query):
         result = {}
         for key, value in query.items():
             if isinstance(value, (dict, )):
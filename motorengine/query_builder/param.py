@@ -0,0 +1,25 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+class Param(object):
+    '''
+    Placeholder for a value in the filters of a prepared query (see `QuerySet.prepare`).
+
+    .. code-block:: python
+
+        users_by_name = User.objects.prepare(Q(name=Param('name'), age__gt=Param('min_age')))
+        users_by_name.find_all(name="Bernardo", min_age=18, callback=handle_users)
+    '''
+
+    # names of the arguments of the methods of prepared queries
+    RESERVED_NAMES = ('callback', 'lazy', 'alias')
+
+    def __init__(self, name):
+        if name in self.RESERVED_NAMES:
+            raise ValueError("Invalid parameter name '%s': The name is reserved." % name)
+
+        self.name = name
+
+    def __repr__(self):
+        return "Param(%r)" % self.name
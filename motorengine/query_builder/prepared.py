@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import copy
+
+from motorengine.query_builder.cache import compile_plan, get_query_shape
+from motorengine.query_builder.node import QNode, Q, QCombination, QNot
+from motorengine.query_builder.param import Param
+
+
+class CompiledQuery(QNode):
+    '''
+    Query tree node for a query that is already compiled to a MongoDB filter.
+    '''
+
+    def __init__(self, query):
+        self.query = query
+
+    def accept(self, visitor, document):
+        return self.query
+
+    def to_query(self, document, collation=None):
+        return self.query
+
+
+def get_param_names(node, names=None):
+    if names is None:
+        names = set()
+
+    if isinstance(node, Q):
+        names.update(value.name for value in node.query.values() if isinstance(value, Param))
+    elif isinstance(node, QCombination):
+        for child in node.children:
+            get_param_names(child, names)
+    elif isinstance(node, QNot):
+        get_param_names(node.query, names)
+
+    return names
+
+
+class PreparedQuery(object):
+    '''
+    Query with filters, fields, operators and projection compiled once (see `QuerySet.prepare`).
+
+    Each call of `find_all`, `get` or `count` only converts the values of the parameters and runs
+    the query with the other settings (order, limit, projection...) of the queryset it was prepared from.
+    '''
+
+    def __init__(self, queryset, node):
+        self.queryset = queryset
+        self.node = node
+        self.shape = get_query_shape(node)
+        self.param_names = frozenset(get_param_names(node))
+        # the compiled query has no fields left to get the collation from
+        self.collation = queryset.get_collation(node)
+        self.plan = compile_plan(queryset.__klass__, node, self.collation)
+        self.projection = queryset._loaded_fields.to_query(queryset.__klass__)
+
+    def get_query(self, **params):
+        '''
+        Returns the MongoDB filter for the values of the parameters.
+        '''
+        missing = self.param_names.difference(params.keys())
+        if missing:
+            raise ValueError("Missing values for parameters: %s." % ", ".join(sorted(missing)))
+
+        unknown = set(params.keys()).difference(self.param_names)
+        if unknown:
+            raise ValueError("Unknown parameters: %s." % ", ".join(sorted(unknown)))
+
+        return self.plan(self.node, params)
+
+    def bind(self, **params):
+        '''
+        Returns a queryset that runs this query with the values of the parameters.
+        '''
+        queryset = copy.copy(self.queryset)
+        queryset._filters = CompiledQuery(self.get_query(**params))
+        queryset._projection = self.projection
+        queryset._collation = self.collation
+
+        return queryset
+
+    def get_callback_arguments(self, params):
+        callback = params.pop('callback', None)
+        if callback is None:
+            return {}
+
+        return {'callback': callback}
+
+    def find_all(self, lazy=None, alias=None, **params):
+        arguments = self.get_callback_arguments(params)
+        return self.bind(**params).find_all(lazy=lazy, alias=alias, **arguments)
+
+    def get(self, alias=None, **params):
+        arguments = self.get_callback_arguments(params)
+        return self.bind(**params).get(alias=alias, **arguments)
+
+    def count(self, alias=None, **params):
+        arguments = self.get_callback_arguments(params)
+        return self.bind(**params).count(alias=alias, **arguments)
+
+    def __repr__(self):
+        return "<PreparedQuery %s %r>" % (self.queryset.__klass__.__name__, self.shape)
@@ -3,6 +3,8 @@
 
 import collections
 
+import six
+
 from motorengine.query.base import QueryOperator
 from motorengine.query.exists import ExistsQueryOperator
 from motorengine.query.greater_than import GreaterThanQueryOperator
@@ -20,8 +22,8 @@ from motorengine.query.exact import ExactOperator
 from motorengine.query.starts_with import StartsWithOperator
 from motorengine.query.i_contains import IContainsOperator
 from motorengine.query.i_ends_with import IEndsWithOperator
-from motorengine.query.i_exact import IExactOperator
-from motorengine.query.i_starts_with import IStartsWithOperator
+from motorengine.query.i_exact import IExactOperator, CollationIExactOperator
+from motorengine.query.i_starts_with import IStartsWithOperator, CollationIStartsWithOperator
 
 
 OPERATORS = {
@@ -44,6 +46,12 @@ OPERATORS = {
     'istartswith': IStartsWithOperator,
 }
 
+# operators used instead of the ones in OPERATORS for fields declared with a collation
+COLLATION_OPERATORS = {
+    'iexact': CollationIExactOperator,
+    'istartswith': CollationIStartsWithOperator,
+}
+
 
 class DefaultOperator(QueryOperator):
     def to_query(self, field_name, value):
@@ -63,7 +71,163 @@ def update(d, u):
     return d
 
 
-def transform_query(document, **query):
+def split_query_key(document, key):
+    '''
+    Returns the chain of fields, the field name in the database and the name of the operator
+    (empty for equality) of the `key` of a filter (e.g. `name__startswith`).
+    '''
+    if '__' not in key:
+        field = document.get_fields(key)[0]
+        return [field], field.db_field, ""
+
+    values = key.split('__')
+    field_reference_name, operator = ".".join(values[:-1]), values[-1]
+    if operator not in OPERATORS:
+        field_reference_name = "%s.%s" % (field_reference_name, operator)
+        operator = ""
+
+    fields = document.get_fields(field_reference_name)
+
+    field_name = ".".join([
+        hasattr(field, 'db_field') and field.db_field or field
+        for field in fields
+    ])
+
+    return fields, field_name, operator
+
+
+def resolve_query_key(document, key, collation=None):
+    '''
+    Returns the field, the field name in the database and the operator used for the `key`
+    of a filter (e.g. `name__startswith`).
+
+    The operators in `COLLATION_OPERATORS` are only used for fields declared with the same
+    `collation` the query runs with (see `get_query_collation`).
+    '''
+    fields, field_name, operator = split_query_key(document, key)
+
+    if operator in COLLATION_OPERATORS and is_same_collation(get_field_collation(fields[-1]), collation):
+        operator = COLLATION_OPERATORS[operator]()
+    else:
+        operator = OPERATORS.get(operator, DefaultOperator)()
+
+    return fields[-1], field_name, operator
+
+
+def get_field_collation(field):
+    return getattr(field, 'collation', None)
+
+
+def is_same_collation(collation, other):
+    if collation is None or other is None:
+        return False
+
+    return getattr(collation, 'document', collation) == getattr(other, 'document', other)
+
+
+def get_collation_key(collation):
+    '''
+    Returns a hashable representation of `collation` (a dict or a `pymongo.collation.Collation`).
+    '''
+    if collation is None:
+        return None
+
+    return tuple(sorted(getattr(collation, 'document', collation).items()))
+
+
+def is_string_field(field):
+    '''
+    Returns False for fields whose values are never compared as strings by MongoDB, and thus are
+    not affected by the collation of a query.
+    '''
+    from motorengine.fields import (
+        BooleanField, DateTimeField, IntField, FloatField, ObjectIdField, ReferenceField, BinaryField, ListField
+    )
+
+    if isinstance(field, ListField):
+        return is_string_field(field._base_field)
+
+    return not isinstance(
+        field, (BooleanField, DateTimeField, IntField, FloatField, ObjectIdField, ReferenceField, BinaryField)
+    )
+
+
+def has_string(value):
+    if isinstance(value, six.string_types):
+        return True
+
+    if isinstance(value, dict):
+        return any(has_string(key) or has_string(item) for key, item in value.items())
+
+    if isinstance(value, (list, tuple, set)):
+        return any(has_string(item) for item in value)
+
+    return False
+
+
+def is_string_comparison(field, value):
+    from motorengine.fields.dynamic_field import DynamicField
+    from motorengine.query_builder.param import Param
+
+    if isinstance(value, Param) or not isinstance(field, DynamicField):
+        return is_string_field(field)
+
+    return has_string(value)
+
+
+def get_query_collation(document, node, sort_fields=None):
+    '''
+    Returns the collation to run the query tree `node` with, sorted by `sort_fields` (a list of fields): the
+    collation of the fields compared with the operators in `COLLATION_OPERATORS`, as long as every other string
+    comparison and sort key of the query is on a field declared with the same collation.
+
+    Returns None (and the operators use regular expressions instead) otherwise, as the collation of a query
+    changes how every string in it is compared.
+    '''
+    from motorengine.query_builder.node import Q, QCombination, QNot
+
+    collations = []
+    comparisons = []
+
+    def collect(node):
+        if isinstance(node, Q):
+            for key, value in node.query.items():
+                if key == 'raw':
+                    if has_string(value):
+                        comparisons.append(None)
+                    continue
+
+                fields, field_name, operator = split_query_key(document, key)
+                field_collation = get_field_collation(fields[-1])
+
+                if operator in COLLATION_OPERATORS and field_collation is not None:
+                    collations.append(field_collation)
+                elif is_string_comparison(fields[-1], value):
+                    comparisons.append(field_collation)
+        elif isinstance(node, QCombination):
+            for child in node.children:
+                collect(child)
+        elif isinstance(node, QNot):
+            collect(node.query)
+
+    collect(node)
+
+    if not collations:
+        return None
+
+    for field in sort_fields or []:
+        if is_string_field(field):
+            comparisons.append(get_field_collation(field))
+
+    collation = collations[0]
+    for other_collation in collations[1:] + comparisons:
+        if not is_same_collation(other_collation, collation):
+            return None
+
+    return collation
+
+
+def transform_query(document, _collation=None, **query):
     mongo_query = {}
 
     for key, value in sorted(query.items()):
@@ -71,32 +235,109 @@ def transform_query(document, **query):
             update(mongo_query, value)
             continue
 
-        if '__' not in key:
-            field = document.get_fields(key)[0]
-            field_name = field.db_field
-            operator = DefaultOperator()
-            field_value = operator.get_value(field, value)
-        else:
-            values = key.split('__')
-            field_reference_name, operator = ".".join(values[:-1]), values[-1]
-            if operator not in OPERATORS:
-                field_reference_name = "%s.%s" % (field_reference_name, operator)
-                operator = ""
-
-            fields = document.get_fields(field_reference_name)
-
-            field_name = ".".join([
-                hasattr(field, 'db_field') and field.db_field or field
-                for field in fields
-            ])
-            operator = OPERATORS.get(operator, DefaultOperator)()
-            field_value = operator.get_value(fields[-1], value)
+        field, field_name, operator = resolve_query_key(document, key, _collation)
+        field_value = operator.get_value(field, value)
 
         update(mongo_query, operator.to_query(field_name, field_value))
 
     return mongo_query
 
 
+# MongoEngine style prefixes of the keys passed to `QuerySet.update` (e.g. `inc__views=1`)
+UPDATE_OPERATORS = {
+    'set': '$set',
+    'unset': '$unset',
+    'inc': '$inc',
+    'dec': '$inc',
+    'mul': '$mul',
+    'min': '$min',
+    'max': '$max',
+    'push': '$push',
+    'push_all': '$push',
+    'pull': '$pull',
+    'pull_all': '$pullAll',
+    'add_to_set': '$addToSet',
+    'pop': '$pop',
+    'current_date': '$currentDate',
+}
+
+
+def resolve_update_key(document, key):
+    '''
+    Returns the operator, the field and the field name in the database used for the `key`
+    of an update (e.g. `inc__views` or `set__address__city`).
+    '''
+    values = key.split('__')
+
+    operator = 'set'
+    if len(values) > 1 and values[0] in UPDATE_OPERATORS:
+        # a field named like an operator (e.g. `max__limit` for the `limit` of an embedded `max` document)
+        # is only read as the operator if the rest of the key is a field of the document as well
+        if values[0] not in document._fields or document.get_db_field_path(".".join(values[1:])) is not None:
+            operator, values = values[0], values[1:]
+
+    path = ".".join(values)
+    fields = document.get_fields(path)
+
+    if len(fields) != len(values):
+        raise ValueError(
+            "Invalid update '%s': sub-properties can only be updated in embedded document fields." % key
+        )
+
+    field_name = ".".join([field.db_field for field in fields])
+
+    return operator, fields[-1], field_name
+
+
+def get_update_value(operator, field, value):
+    from motorengine.fields.list_field import ListField
+
+    if operator == 'unset':
+        return 1
+
+    if operator == 'current_date':
+        return {'$type': value} if isinstance(value, six.string_types) else True
+
+    if operator == 'pop' or value is None:
+        return value
+
+    if operator in ('push_all', 'pull_all'):
+        value = field.to_son(list(value))
+        return {'$each': value} if operator == 'push_all' else value
+
+    if operator in ('push', 'add_to_set', 'pull') and isinstance(field, ListField):
+        if isinstance(value, (list, tuple)):
+            items = field.to_son(list(value))
+            # pulls every item that is equal to any of the values
+            return {'$in': items} if operator == 'pull' else {'$each': items}
+
+        return field._base_field.to_son(value)
+
+    value = field.to_son(value)
+
+    if operator == 'dec':
+        return -value
+
+    return value
+
+
+def transform_update(document, **update):
+    '''
+    Returns the update document for MongoEngine style keys (e.g. `inc__views=1, push__tags='new'`),
+    with the values converted by the `to_son` method of their fields. Keys without an operator
+    set the value of the field.
+    '''
+    mongo_update = {}
+
+    for key, value in sorted(update.items()):
+        operator, field, field_name = resolve_update_key(document, key)
+
+        values = mongo_update.setdefault(UPDATE_OPERATORS[operator], {})
+        values[field_name] = get_update_value(operator, field, value)
+
+    return mongo_update
+
+
 def validate_fields(document, query):
     from motorengine.fields.embedded_document_field import EmbeddedDocumentField
     from motorengine.fields.list_field import ListField
@@ -2,25 +2,47 @@
 # -*- coding: utf-8 -*-
 
 import sys
+import base64
+import binascii
+import copy
 import operator
 import itertools
 from datetime import datetime
+from functools import partial
 
+from pymongo import ReturnDocument
 from pymongo.errors import DuplicateKeyError
-from tornado.concurrent import return_future
+from tornado.concurrent import (
+    return_future, is_future, Future, future_set_exc_info, future_set_result_unless_cancelled
+)
+from tornado.ioloop import IOLoop
 from easydict import EasyDict as edict
+from bson import BSON
+from bson.errors import BSONError
 from bson.objectid import ObjectId
+from bson.son import SON
 
-from motorengine import ASCENDING
+from motorengine import ASCENDING, DESCENDING
 from motorengine.aggregation.base import Aggregation
-from motorengine.connection import get_connection
+from motorengine.bulk import BulkInsert, BulkOperations
+from motorengine.connection import get_connection, DEFAULT_CONNECTION_NAME
 from motorengine.errors import (
     UniqueKeyViolationError, PartlyLoadedDocumentError
 )
+from motorengine.explain import (
+    get_strict_mode, should_explain as should_explain_shape, get_query_shape, get_plan_summary, check_query_plan
+)
+from motorengine.identity_map import get_identity_map
 from motorengine.query_builder.field_list import QueryFieldList
 
 DEFAULT_LIMIT = 1000
 
+# maximum number of documents counted by count(approximate=True)
+DEFAULT_APPROXIMATE_COUNT = 1000
+
+# prefix of the temporary fields that hold the documents joined by $lookup
+LOOKUP_FIELD_PREFIX = "__lookup__"
+
 
 class QuerySet(object):
     def __init__(self, klass):
@@ -29,8 +51,21 @@ class QuerySet(object):
         self._limit = None
         self._skip = None
         self._order_fields = []
+        # fields of _order_fields, to check if they are compared with the collation of the query
+        self._sort_fields = []
         self._loaded_fields = QueryFieldList()
         self._reference_loaded_fields = {}
+        self._lazy_decode = None
+        self._select_related = []
+        self._lookup_related = []
+        self._batch_size = None
+        self._hint = None
+        self._max_time_ms = None
+        self._comment = None
+        self._no_cursor_timeout = False
+        self._collation = None
+        # projection compiled by prepared queries
+        self._projection = None
 
     @property
     def is_lazy(self):
@@ -50,6 +85,15 @@ class QuerySet(object):
 
         return conn[self.__klass__.__collection__]
 
+    def get_alias(self, alias=None):
+        if alias is not None:
+            return alias
+
+        if self.__klass__.__alias__ is not None:
+            return self.__klass__.__alias__
+
+        return DEFAULT_CONNECTION_NAME
+
     @return_future
     def create(self, callback, alias=None, **kwargs):
         '''
@@ -93,6 +137,8 @@ class QuerySet(object):
                     raise arguments[1]
 
             document._id = arguments[0]
+            document._clear_changed_fields()
+            self.update_identity_map(document)
             callback(document)
 
         return handle
@@ -105,10 +151,125 @@ class QuerySet(object):
                 else:
                     raise arguments[1]
 
+            document._clear_changed_fields()
+            self.update_identity_map(document)
             callback(document)
 
         return handle
 
+    def update_identity_map(self, document, loading_options=None):
+        identity_map = get_identity_map()
+        if identity_map is not None:
+            identity_map.add(document, loading_options)
+
+    def should_load_all_references(self, lazy=None):
+        return (lazy is not None and not lazy) or not self.is_lazy
+
+    def get_loading_options(self, lazy=None):
+        '''
+        Returns the options that change how this queryset loads its documents, so the identity map only
+        reuses the documents loaded the same way.
+        '''
+        lazy_decode = self.__klass__.__lazy_decode__ if self._lazy_decode is None else self._lazy_decode
+
+        return (
+            bool(lazy_decode),
+            repr(sorted(self._reference_loaded_fields.items())),
+            self.should_load_all_references(lazy),
+            tuple(tuple(path) for path in self._select_related),
+            tuple(field.name for field in self._lookup_related),
+        )
+
+    def invalidate_identity_map(self, instance=None):
+        '''
+        Removes the instance (or all the documents of this queryset class) from the active identity map.
+        '''
+        identity_map = get_identity_map()
+        if identity_map is None:
+            return
+
+        if instance is not None:
+            identity_map.remove(instance.__class__, instance._id)
+        else:
+            identity_map.remove_class(self.__klass__)
+
+    def get_document_from_son(self, instance, is_partly_loaded=False, lazy=None):
+        '''
+        Returns the document for the data loaded from MongoDB, reusing the instance in the active
+        identity map (if any) when it was loaded with the same options.
+        '''
+        # partly loaded documents are never kept in the identity map
+        identity_map = None if is_partly_loaded else get_identity_map()
+
+        if identity_map is None:
+            return self.load_document_from_son(instance, is_partly_loaded)
+
+        loading_options = self.get_loading_options(lazy)
+        document_id = instance.get('_id')
+
+        document = identity_map.get(self.__klass__, document_id, loading_options)
+        if document is not None:
+            return document
+
+        # a document loaded with different options is kept in the map
+        keep_document = identity_map.get(self.__klass__, document_id) is None
+
+        document = self.load_document_from_son(instance, is_partly_loaded)
+
+        if keep_document:
+            identity_map.add(document, loading_options)
+
+        return document
+
+    def load_document_from_son(self, instance, is_partly_loaded=False):
+        return self.__klass__.from_son(
+            instance,
+            _is_partly_loaded=is_partly_loaded,
+            # set projections for references (if any)
+            _reference_loaded_fields=self._reference_loaded_fields,
+            _lazy_decode=self._lazy_decode
+        )
+
+    def get_modified_document(self, instance, new=True):
+        '''
+        Returns the document for the data returned by `find_one_and_update` (or loaded again by `reload`),
+        replacing the stale instance in the active identity map (if any) with it.
+        '''
+        is_partly_loaded = bool(self._loaded_fields)
+        document = self.load_document_from_son(instance, is_partly_loaded)
+
+        if new and not is_partly_loaded:
+            self.update_identity_map(document, self.get_loading_options())
+        else:
+            self.invalidate_identity_map(document)
+
+        return document
+
+    def get_update_definition(self, document, upsert=False):
+        """Get the definition used to update an already saved document.
+
+        Documents that track their changes (loaded from or already saved to
+        the database) only send `$set`/`$unset` for the changed fields,
+        including fields of embedded documents. Any other document (or an
+        upsert) replaces the whole stored document.
+
+        :param document: document being saved
+        :param upsert: if `True` the document is being upserted
+        :returns: update definition or `None` if there is nothing to update
+        """
+        if upsert or document._changed_fields is None:
+            return document.to_son()
+
+        set_values, unset_values = document._delta()
+
+        definition = {}
+        if set_values:
+            definition['$set'] = set_values
+        if unset_values:
+            definition['$unset'] = unset_values
+
+        return definition or None
+
     def update_field_on_save_values(self, document, updating):
         """Recursively update fields of the document before saving.
 
@@ -140,6 +301,14 @@ class QuerySet(object):
                     self.update_field_on_save_values(doc, updating)
 
     def save(self, document, callback, alias=None, upsert=False):
+        '''
+        Inserts or updates `document` and calls back with it.
+
+        If `upsert` is True the whole document is written in a single round trip, replacing the stored
+        document with the same `_id` or, for documents without one, with the same values in the fields declared
+        as unique (see `get_upsert_filter`), and inserting it if there is none. Documents without an `_id` or
+        values in unique fields are just inserted.
+        '''
         if document.is_partly_loaded:
             msg = (
                 "Partly loaded document {0} can't be saved. Document should "
@@ -159,71 +328,112 @@ class QuerySet(object):
 
     def indexes_saved_before_save(self, document, callback, alias=None, upsert=False):
         def handle(*args, **kw):
-            doc = document.to_son()
+            upsert_filter = self.get_upsert_filter(document) if upsert else None
+
+            if upsert_filter is not None:
+                self.upsert_document(document, upsert_filter, callback, alias=alias)
+            elif document._id is not None:
+                doc = self.get_update_definition(document)
+
+                if doc is None:
+                    # nothing changed since the document was loaded
+                    callback(document)
+                    return
 
-            if document._id is not None:
                 self.coll(alias).update(
                     {'_id': document._id}, 
                     doc, 
                     callback=self.handle_update(document, callback),
-                    upsert=upsert,
                 )
             else:
+                doc = document.to_son()
                 self.coll(alias).insert(doc, callback=self.handle_save(document, callback))
 
         return handle
 
-    def validate_document(self, document):
-        if not isinstance(document, self.__klass__):
-            raise ValueError("This queryset for class '%s' can't save an instance of type '%s'." % (
-                self.__klass__.__name__,
-                document.__class__.__name__,
-            ))
+    def get_upsert_filter(self, document):
+        '''
+        Returns the filter of the stored document to be replaced when upserting `document`: its `_id` or else the
+        values of its fields declared as unique (if any). Returns None if there is nothing to match.
+        '''
+        if document._id is not None:
+            return {'_id': document._id}
 
-        return document.validate()
+        upsert_filter = {}
+        for name, field in document.__class__._fields.items():
+            if not field.unique:
+                continue
 
-    def handle_bulk_insert(self, documents, callback):
+            value = document.get_field_value(name)
+            if not field.is_empty(value):
+                upsert_filter[field.db_field] = field.to_son(value)
+
+        return upsert_filter or None
+
+    def handle_upsert(self, document, callback):
         def handle(*arguments, **kw):
             if len(arguments) > 1 and arguments[1]:
-                raise arguments[1]
+                if isinstance(arguments[1], (DuplicateKeyError, )):
+                    raise UniqueKeyViolationError.from_pymongo(str(arguments[1]), self.__klass__)
+                else:
+                    raise arguments[1]
 
-            for object_index, object_id in enumerate(arguments[0]):
-                documents[object_index]._id = object_id
-            callback(documents)
+            document._id = arguments[0]['_id']
+            document._clear_changed_fields()
+            self.update_identity_map(document)
+            callback(document)
 
         return handle
 
-    @return_future
-    def bulk_insert(self, documents, callback=None, alias=None):
-        '''
-        Inserts all documents passed to this method in one go.
-        '''
-
-        is_valid = True
-        docs_to_insert = []
+    def upsert_document(self, document, upsert_filter, callback, alias=None):
+        doc = document.to_son()
 
-        for document_index, document in enumerate(documents):
-            self.update_field_on_save_values(
-                document, document._id is not None
+        if '_id' in upsert_filter:
+            self.coll(alias).replace_one(
+                upsert_filter, doc, upsert=True, callback=self.handle_update(document, callback)
+            )
+        else:
+            # the _id of the document replaced (or inserted) is returned in the same round trip
+            self.coll(alias).find_one_and_replace(
+                upsert_filter, doc, projection={'_id': True}, upsert=True,
+                return_document=ReturnDocument.AFTER, callback=self.handle_upsert(document, callback)
             )
-            try:
-                is_valid = is_valid and self.validate_document(document)
-            except Exception:
-                err = sys.exc_info()[1]
-                raise ValueError("Validation for document %d in the documents you are saving failed with: %s" % (
-                    document_index,
-                    str(err)
-                ))
 
-            if not is_valid:
-                return
+    def validate_document(self, document):
+        if not isinstance(document, self.__klass__):
+            raise ValueError("This queryset for class '%s' can't save an instance of type '%s'." % (
+                self.__klass__.__name__,
+                document.__class__.__name__,
+            ))
 
-            docs_to_insert.append(document.to_son())
+        return document.validate()
 
-        if not is_valid:
-            return
+    @return_future
+    def bulk_insert(self, documents, callback=None, alias=None, ordered=True, chunk_size=None,
+                    max_chunk_bytes=None, concurrency=None):
+        '''
+        Inserts all documents passed to this method (a list or any other iterable, like a generator) in chunks
+        and calls back with the list of documents in the same order, with their ids set.
+
+        * `ordered` - If True (the default) chunks are inserted one at a time and the insert stops at the first
+          document that is invalid or can't be inserted. Otherwise all the other documents are inserted;
+        * `chunk_size` - Maximum number of documents in each chunk (`motorengine.bulk.BULK_CHUNK_SIZE` by default);
+        * `max_chunk_bytes` - Maximum size in bytes of the BSON of the documents in each chunk
+          (`motorengine.bulk.BULK_CHUNK_BYTES` by default);
+        * `concurrency` - Maximum number of chunks being inserted at the same time by unordered inserts
+          (`motorengine.bulk.BULK_INSERT_CONCURRENCY` by default).
+
+        Documents are validated as their chunks are built, so the input is consumed (and only the BSON of the
+        chunks being inserted is kept in memory) as the documents are inserted. In ordered inserts an invalid
+        document raises a `ValueError` after the documents before it are inserted (with their ids set), and the
+        documents after it are not read. Otherwise, documents that could not be inserted raise a `BulkInsertError`
+        after the insert, with the `errors` of each document (its `index`, the error `code` and `message`) and the
+        `documents` (the ones inserted have their ids set).
+        '''
 
-        self.coll(alias).insert(docs_to_insert, callback=self.handle_bulk_insert(documents, callback))
+        BulkInsert(
+            self, ordered=ordered, chunk_size=chunk_size, max_chunk_bytes=max_chunk_bytes, concurrency=concurrency
+        ).execute(documents, callback=callback, alias=alias)
 
     def handle_update_documents(self, callback):
         def handle(*arguments, **kwargs):
@@ -250,25 +460,297 @@ class QuerySet(object):
 
         return result
 
+    def get_update_document(self, definition=None, **kwargs):
+        '''
+        Returns the update document that sets the values in `definition` (a dict keyed by fields or their
+        names in the database) and applies the MongoEngine style operators in `kwargs`.
+        '''
+        from motorengine.query_builder.transform import transform_update
+
+        document = transform_update(self.__klass__, **kwargs)
+
+        if definition:
+            document.setdefault('$set', {}).update(self.transform_definition(definition))
+
+        if not document:
+            raise ValueError("Either a definition or update operators must be provided to update.")
+
+        return document
+
     @return_future
-    def update(self, definition, callback=None, alias=None):
+    def update(self, definition=None, callback=None, alias=None, **kwargs):
+        '''
+        Updates all the documents that match the filters of the queryset (if any) and calls back with the
+        number of documents updated (`count`) and `updated_existing`.
+
+        The values in `definition` are set as they are. Values can also be updated with MongoEngine style
+        keyword arguments, converted by the `to_son` method of their fields (several operators can be used
+        in the same update):
+
+        * `set__field` (or just `field`), `unset__field`;
+        * `inc__field`, `dec__field`, `mul__field`, `min__field`, `max__field`;
+        * `push__field`, `push_all__field`, `add_to_set__field` (a list adds each of its items),
+          `pull__field` (a list removes the items equal to any of its values), `pull_all__field`,
+          `pop__field` (1 removes the last item and -1 the first);
+        * `current_date__field` (True or `'timestamp'`).
+
+        Fields of embedded documents are separated by `__` (e.g. `set__address__city="Rio"`). Fields named like
+        an operator (e.g. `max`) are only updated without `set__` if the rest of the key is not a field too.
+
+        Usage::
+
+            Post.objects.filter(slug=slug).update(inc__views=1, push__tags="python", callback=handle_updated)
+        '''
         if callback is None:
             raise RuntimeError("The callback argument is required")
 
-        definition = self.transform_definition(definition)
+        update_document = self.get_update_document(definition, **kwargs)
 
         update_filters = {}
         if self._filters:
             update_filters = self.get_query_from_filters(self._filters)
 
+        self.invalidate_identity_map()
+
         update_arguments = dict(
             spec=update_filters,
-            document={'$set': definition},
+            document=update_document,
             multi=True,
-            callback=self.handle_update_documents(callback)
+            callback=self.handle_update_documents(callback),
+            **self.get_write_options()
         )
         self.coll(alias).update(**update_arguments)
 
+    def get_sort(self, sort):
+        '''
+        Returns the sort specification for a list of `(field, direction)` tuples, where field is either a
+        field or a (dotted) field name.
+        '''
+        from motorengine.fields.base_field import BaseField
+
+        result = []
+        for field_name, direction in sort:
+            if isinstance(field_name, (BaseField, )):
+                field_name = field_name.name
+
+            db_field_path = self.__klass__.get_db_field_path(field_name)
+
+            if db_field_path is None:
+                raise ValueError("Invalid sort field '%s': Field not found in '%s'." % (field_name, self.__klass__.__name__))
+
+            result.append((db_field_path, direction))
+
+        return result
+
+    def get_sorted_queryset(self, sort=None):
+        '''
+        Returns a copy of this queryset ordered by `sort` (see `get_sort`) instead of `order_by`,
+        or this queryset if `sort` is None.
+        '''
+        if sort is None:
+            return self
+
+        from motorengine.fields.base_field import BaseField
+
+        queryset = copy.copy(self)
+        queryset._order_fields = self.get_sort(sort)
+        queryset._sort_fields = [
+            field_name if isinstance(field_name, (BaseField, )) else self.__klass__.get_fields(field_name)[-1]
+            for field_name, direction in sort
+        ]
+
+        return queryset
+
+    def get_modify_options(self, new=True, upsert=False, sort=None, filters=None):
+        '''
+        Returns the keyword arguments to be passed to `find_one_and_update` when using `filters` (the filters
+        of the queryset by default).
+        '''
+        queryset = self.get_sorted_queryset(sort)
+
+        options = dict(
+            projection=self.get_projection(),
+            upsert=upsert,
+            return_document=ReturnDocument.AFTER if new else ReturnDocument.BEFORE,
+        )
+
+        if queryset._order_fields:
+            options['sort'] = queryset._order_fields
+
+        max_time_ms = self.get_max_time_ms()
+        if max_time_ms is not None:
+            options['maxTimeMS'] = max_time_ms
+
+        options.update(queryset.get_write_options(filters))
+
+        return options
+
+    def handle_modify(self, callback, new=True):
+        def handle(*arguments, **kw):
+            if len(arguments) > 1 and arguments[1]:
+                if isinstance(arguments[1], (DuplicateKeyError, )):
+                    raise UniqueKeyViolationError.from_pymongo(str(arguments[1]), self.__klass__)
+                else:
+                    raise arguments[1]
+
+            if arguments[0] is None:
+                callback(None)
+                return
+
+            doc = self.get_modified_document(arguments[0], new=new)
+
+            references = self.find_related_references([doc], load_all_references=not self.is_lazy)
+            if not references:
+                callback(doc)
+            else:
+                doc.fetch_references(references, callback=self.handle_auto_load_references(doc, callback))
+
+        return handle
+
+    @return_future
+    def modify(self, definition=None, callback=None, alias=None, new=True, upsert=False, sort=None, **kwargs):
+        '''
+        Atomically updates the first document that matches the filters of the queryset (in the order of `sort`,
+        a list of `(field, direction)` tuples, or of `order_by`) and calls back with it, or with None if no
+        document matches.
+
+        The update is the same as in `update` (a `definition` of values to set and update operators in `kwargs`).
+        The document is loaded with the projection of the queryset (`only`, `exclude` or `fields`).
+
+        * `new` - If True (the default) the document is returned as it is after the update, otherwise as it was before;
+        * `upsert` - If True a document is inserted if none matches the filters.
+
+        Usage::
+
+            Job.objects.filter(status="pending").modify(
+                set__status="running", inc__attempts=1, sort=[(Job.created_at, ASCENDING)], callback=handle_job
+            )
+        '''
+        if callback is None:
+            raise RuntimeError("The callback argument is required")
+
+        update_document = self.get_update_document(definition, **kwargs)
+
+        modify_filters = {}
+        if self._filters:
+            modify_filters = self.get_sorted_queryset(sort).get_query_from_filters(self._filters)
+
+        self.coll(alias).find_one_and_update(
+            modify_filters, update_document, callback=self.handle_modify(callback, new=new),
+            **self.get_modify_options(new=new, upsert=upsert, sort=sort)
+        )
+
+    def get_or_create_definition(self, defaults=None, **filters):
+        '''
+        Returns the query and the `$setOnInsert` update used by `get_or_create`. The document inserted gets
+        the values of `defaults` and of the fields compared by equality in `filters`, and a new `_id`.
+        '''
+        from motorengine.fields.base_field import BaseField
+        from motorengine.query_builder.node import Q
+
+        if not filters:
+            raise RuntimeError("Filters must be provided to get_or_create")
+
+        query = self.get_query_from_filters(Q(**filters))
+        if '_id' in query:
+            raise ValueError("Can't get or create filtering by _id. Please use save with upsert=True instead.")
+
+        values = dict((name, value) for name, value in filters.items() if name in self.__klass__._fields)
+        for name, value in (defaults or {}).items():
+            if isinstance(name, (BaseField, )):
+                name = name.name
+            values[name] = value
+
+        document = self.__klass__(**values)
+        self.update_field_on_save_values(document, False)
+        self.validate_document(document)
+
+        # fields compared by equality (even in embedded documents) are inserted by MongoDB from the query
+        query_fields = set()
+        for key, value in query.items():
+            is_operator = isinstance(value, dict) and any(name.startswith('$') for name in value)
+            if not key.startswith('$') and not is_operator:
+                query_fields.add(key.split('.')[0])
+
+        on_insert = dict(
+            (db_field, value) for db_field, value in document.to_son().items() if db_field not in query_fields
+        )
+        on_insert['_id'] = ObjectId()
+
+        return query, {'$setOnInsert': on_insert}
+
+    def handle_get_or_create(self, document_id, callback):
+        def handle(document):
+            callback((document, document is not None and document._id == document_id))
+
+        return handle
+
+    @return_future
+    def get_or_create(self, defaults=None, callback=None, alias=None, **filters):
+        '''
+        Gets the document that matches `filters` or atomically inserts a new one (with the values in
+        `defaults` as well) if there is none, and calls back with a `(document, created)` tuple.
+
+        The document is read or inserted in a single round trip, so concurrent calls with the same filters
+        don't need to find it first or to retry after duplicate key errors. Filtering by fields declared
+        as unique makes sure that only one document is ever created.
+
+        Usage::
+
+            User.objects.get_or_create(email="heynemann@gmail.com", defaults={"name": "Bernardo"}, callback=handle_user)
+        '''
+        if callback is None:
+            raise RuntimeError("The callback argument is required")
+
+        from motorengine.query_builder.node import Q
+
+        query, update_document = self.get_or_create_definition(defaults, **filters)
+        options = self.get_modify_options(upsert=True, filters=Q(**filters))
+
+        def handle(*args, **kw):
+            handle_document = self.handle_get_or_create(update_document['$setOnInsert']['_id'], callback)
+            self.coll(alias).find_one_and_update(
+                query, update_document, callback=self.handle_modify(handle_document), **options
+            )
+
+        self.ensure_index(callback=handle, alias=alias)
+
+    def handle_reload(self, document, callback):
+        def handle(*arguments, **kw):
+            if len(arguments) > 1 and arguments[1]:
+                raise arguments[1]
+
+            if arguments[0] is None:
+                callback(None)
+                return
+
+            document._reload_from(self.get_modified_document(arguments[0]))
+
+            if not document.is_partly_loaded:
+                # keep the reloaded instance instead of the one just loaded
+                self.update_identity_map(document)
+
+            callback(document)
+
+        return handle
+
+    @return_future
+    def reload(self, document, callback=None, alias=None):
+        '''
+        Loads the values of the fields of `document` again (with the projection of the queryset) and calls back
+        with it, or with None if it no longer exists.
+        '''
+        if callback is None:
+            raise RuntimeError("The callback argument is required")
+
+        if document._id is None:
+            raise ValueError("Document %r must be saved before it can be reloaded." % document)
+
+        self.coll(alias).find_one(
+            {'_id': document._id}, projection=self.get_projection(),
+            callback=self.handle_reload(document, callback), **self.get_find_options()
+        )
+
     @return_future
     def delete(self, callback=None, alias=None):
         '''
@@ -319,11 +801,16 @@ class QuerySet(object):
 
         if instance is not None:
             if hasattr(instance, '_id') and instance._id:
+                self.invalidate_identity_map(instance)
                 self.coll(alias).remove(instance._id, callback=self.handle_remove(callback))
         else:
+            self.invalidate_identity_map()
+
             if self._filters:
                 remove_filters = self.get_query_from_filters(self._filters)
-                self.coll(alias).remove(remove_filters, callback=self.handle_remove(callback))
+                self.coll(alias).remove(
+                    remove_filters, callback=self.handle_remove(callback), **self.get_write_options()
+                )
             else:
                 self.coll(alias).remove(callback=self.handle_remove(callback))
 
@@ -577,77 +1064,497 @@ class QuerySet(object):
 
         return self
 
-    def handle_auto_load_references(self, doc, callback):
-        def handle(*args, **kw):
-            if len(args) > 0:
-                callback(doc)
-                return
-
-            callback(None)
+    def lazy_decode(self, lazy_decode=True):
+        '''
+        Keeps the values of the loaded documents as they come from MongoDB and
+        only converts each field (embedded documents, dates, decimals...) the
+        first time it is accessed. Saving a loaded document reuses the values
+        of the fields that were never accessed.
 
-        return handle
+        Defaults to the `__lazy_decode__` attribute of the document class.
 
-    def handle_get(self, callback):
-        def handle(*args, **kw):
-            instance = args[0]
+        Usage::
 
-            if instance is None:
-                callback(None)
-            else:
-                doc = self.__klass__.from_son(
-                    instance,
-                    # if _loaded_fields is not empty then
-                    # document is partly loaded
-                    _is_partly_loaded=bool(self._loaded_fields),
-                    # set projections for references (if any)
-                    _reference_loaded_fields=self._reference_loaded_fields
-                )
+            # only name and email are converted
+            def handle_all(users):
+                for user in users:
+                    print(user.name, user.email)
 
-                if self.is_lazy:
-                    callback(doc)
-                else:
-                    doc.load_references(callback=self.handle_auto_load_references(doc, callback))
+            User.objects.lazy_decode().find_all(callback=handle_all)
+        '''
+        self._lazy_decode = lazy_decode
 
-        return handle
+        return self
 
-    @return_future
-    def get(self, id=None, callback=None, alias=None, **kwargs):
+    def select_related(self, *field_paths):
         '''
-        Gets a single item of the current queryset collection using it's id.
+        Loads the specified reference fields of the documents returned by subsequent queries
+        before returning them. The references of all the returned documents are collected and
+        each referenced document class is loaded with batched `$in` queries, so the same
+        referenced document is only loaded once.
 
-        In order to query a different database, please specify the `alias` of the database to query.
+        Paths can go through embedded documents and lists of embedded documents.
+
+        Usage::
+
+            Post.objects.select_related('author', 'comments.user').find_all(callback=handle_all)
         '''
+        for field_path in field_paths:
+            path = self._get_select_related_path(field_path)
+            if path not in self._select_related:
+                self._select_related.append(path)
 
-        from motorengine import Q
+        return self
 
-        if id is None and not kwargs:
-            raise RuntimeError("Either an id or a filter must be provided to get")
+    def _get_select_related_path(self, field_path):
+        from motorengine.fields.base_field import BaseField
+        from motorengine.fields.embedded_document_field import EmbeddedDocumentField
+        from motorengine.fields.list_field import ListField
+        from motorengine.fields.reference_field import ReferenceField
 
-        if id is not None:
-            if not isinstance(id, ObjectId):
-                id = ObjectId(id)
+        if isinstance(field_path, (BaseField, )):
+            field_path = field_path.name
 
+        path = tuple(field_path.split('.'))
+        document_type = self.__klass__
+
+        for index, field_name in enumerate(path):
+            field = document_type._fields.get(field_name)
+            if field is None:
+                raise ValueError("Invalid select_related field '%s': Field '%s' not found in '%s'." % (
+                    field_path, field_name, document_type.__name__
+                ))
+
+            if isinstance(field, (ListField, )):
+                field = field._base_field
+
+            if index == len(path) - 1:
+                if not isinstance(field, (ReferenceField, )):
+                    raise ValueError("Invalid select_related field '%s': '%s' is not a reference field." % (
+                        field_path, field_name
+                    ))
+            elif isinstance(field, (EmbeddedDocumentField, )):
+                document_type = field.embedded_type
+            else:
+                raise ValueError("Invalid select_related field '%s': '%s' is not an embedded document field." % (
+                    field_path, field_name
+                ))
+
+        return path
+
+    def find_related_references(self, documents, load_all_references=False):
+        '''
+        Returns the references to be loaded for the documents: all of them if `load_all_references`
+        is True and the ones specified with `select_related`.
+        '''
+        references = []
+
+        for document in documents:
+            if load_all_references:
+                document.find_references(document=document, results=references)
+
+            for path in self._select_related:
+                self._find_path_references(document, path, references)
+
+        return references
+
+    def _find_path_references(self, document, path, references):
+        field_name = path[0]
+        field = document._fields[field_name]
+
+        if len(path) == 1:
+            document.find_reference_field(document, references, field_name, field)
+            document.find_list_field(document, references, field_name, field)
+            return
+
+        value = document._values.get(field_name, None)
+        if value is None:
+            return
+
+        if not isinstance(value, (list, tuple)):
+            value = [value]
+
+        for item in value:
+            if item is not None:
+                self._find_path_references(item, path[1:], references)
+
+    def lookup_related(self, *fields):
+        '''
+        Resolves the specified reference fields on the server. Subsequent `find_all` and `get`
+        calls run an aggregation pipeline with the filters, sort, skip, limit and projection of
+        the queryset and a `$lookup` stage for each field, so the documents and the documents they
+        reference are loaded in a single round trip.
+
+        Only `ReferenceField` and `ListField(ReferenceField)` fields of the queried document whose
+        referenced documents are stored in the same database can be looked up.
+
+        Usage::
+
+            Post.objects.lookup_related('author', 'editors').find_all(callback=handle_all)
+        '''
+        from motorengine.fields.base_field import BaseField
+
+        for field in fields:
+            field_name = field.name if isinstance(field, (BaseField, )) else field
+
+            if field_name not in self.__klass__._fields:
+                raise ValueError("Invalid lookup_related field '%s': Field not found in '%s'." % (
+                    field_name, self.__klass__.__name__
+                ))
+
+            field = self.__klass__._fields[field_name]
+            if self._get_lookup_reference_type(field) is None:
+                raise ValueError("Invalid lookup_related field '%s': '%s' is not a reference field." % (
+                    field_name, field_name
+                ))
+
+            if field not in self._lookup_related:
+                self._lookup_related.append(field)
+
+        return self
+
+    def _get_lookup_reference_type(self, field):
+        from motorengine.fields.list_field import ListField
+        from motorengine.fields.reference_field import ReferenceField
+
+        if isinstance(field, (ListField, )):
+            field = field._base_field
+
+        if not isinstance(field, (ReferenceField, )):
+            return None
+
+        return field.reference_type
+
+    def get_lookup_field_name(self, field):
+        return "%s%s" % (LOOKUP_FIELD_PREFIX, field.db_field)
+
+    def get_projection(self):
+        if self._projection is not None:
+            return self._projection
+
+        return self._loaded_fields.to_query(self.__klass__)
+
+    def get_lookup_projection_stages(self):
+        '''
+        Returns the stages that apply the projection of the queryset after the `$lookup` stages.
+        '''
+        projection = self.get_projection()
+        if not projection:
+            return []
+
+        stage = {}
+        slices = {}
+        for field_name, value in projection.items():
+            if isinstance(value, dict) and '$slice' in value:
+                # {'$slice': n} and {'$slice': [skip, n]} are expressions in aggregations
+                arguments = value['$slice']
+                if not isinstance(arguments, (list, tuple)):
+                    arguments = [arguments]
+                slices[field_name] = {'$slice': ["$%s" % field_name] + list(arguments)}
+            else:
+                stage[field_name] = value
+
+        if not any(value for field_name, value in stage.items() if field_name != '_id'):
+            # only exclusions (or no fields): the slices can't be in the same $project stage
+            stages = []
+            if stage:
+                stages.append({'$project': stage})
+            if slices:
+                stages.append({'$addFields': slices})
+
+            return stages
+
+        stage.update(slices)
+        for field in self._lookup_related:
+            stage[self.get_lookup_field_name(field)] = QueryFieldList.ONLY
+
+        return [{'$project': stage}]
+
+    def get_lookup_pipeline(self, query_filters, limit):
+        '''
+        Returns the aggregation pipeline used by `find_all` and `get` when `lookup_related` is used.
+        '''
+        pipeline = []
+
+        if query_filters:
+            pipeline.append({'$match': query_filters})
+
+        if self._order_fields:
+            pipeline.append({'$sort': SON(self._order_fields)})
+
+        if self._skip:
+            pipeline.append({'$skip': self._skip})
+
+        if limit:
+            pipeline.append({'$limit': limit})
+
+        return pipeline + self.get_lookup_stages()
+
+    def get_lookup_stages(self):
+        stages = []
+
+        for field in self._lookup_related:
+            stages.append({'$lookup': {
+                'from': self._get_lookup_reference_type(field).__collection__,
+                'localField': field.db_field,
+                'foreignField': '_id',
+                'as': self.get_lookup_field_name(field),
+            }})
+
+        stages.extend(self.get_lookup_projection_stages())
+
+        return stages
+
+    def pop_lookup_fields(self, instance):
+        '''
+        Removes the documents joined by `$lookup` from a document returned by the pipeline.
+        '''
+        return [
+            (field, instance.pop(self.get_lookup_field_name(field), None) or [])
+            for field in self._lookup_related
+        ]
+
+    def fill_lookup_fields(self, document, joined_fields):
+        '''
+        Replaces the ids of the looked up fields of `document` with the joined documents, keeping
+        the order of lists. Ids of documents that do not exist are replaced with None.
+
+        Returns the joined documents.
+        '''
+        joined_documents = []
+
+        for field, items in joined_fields:
+            reference_type = self._get_lookup_reference_type(field)
+
+            documents = {}
+            for item in items:
+                joined_document = reference_type.from_son(item)
+                documents[joined_document._id] = joined_document
+                joined_documents.append(joined_document)
+
+            value = document._values.get(field.name, None)
+            if value is None:
+                continue
+
+            if isinstance(value, (list, tuple)):
+                document._values[field.name] = [self._get_lookup_document(documents, item) for item in value]
+            else:
+                document._values[field.name] = self._get_lookup_document(documents, value)
+
+        return joined_documents
+
+    def _get_lookup_document(self, documents, value):
+        from motorengine.document import BaseDocument
+
+        # documents reused from the identity map already have their looked up fields filled
+        if isinstance(value, (BaseDocument, )):
+            return value
+
+        return documents.get(value)
+
+    def find_joined_references(self, joined_documents, references):
+        # documents joined by $lookup load their own references if they are not lazy
+        for joined_document in joined_documents:
+            if not joined_document.is_lazy:
+                joined_document.find_references(document=joined_document, results=references)
+
+        return references
+
+    def handle_get_with_lookup(self, callback):
+        def handle(*arguments, **kw):
+            if arguments and len(arguments) > 1 and arguments[1]:
+                raise arguments[1]
+
+            instances = arguments[0]
+            self.handle_get(callback)(instances[0] if instances else None)
+
+        return handle
+
+    def handle_auto_load_references(self, doc, callback):
+        def handle(*args, **kw):
+            if len(args) > 0:
+                callback(doc)
+                return
+
+            callback(None)
+
+        return handle
+
+    def handle_get(self, callback):
+        def handle(*args, **kw):
+            instance = args[0]
+
+            if instance is None:
+                callback(None)
+            else:
+                joined_fields = self.pop_lookup_fields(instance)
+
+                # if _loaded_fields is not empty then
+                # document is partly loaded
+                doc = self.get_document_from_son(instance, is_partly_loaded=bool(self._loaded_fields))
+
+                joined_documents = self.fill_lookup_fields(doc, joined_fields)
+
+                references = self.find_related_references([doc], load_all_references=self.should_load_all_references())
+                self.find_joined_references(joined_documents, references)
+
+                if not references:
+                    callback(doc)
+                else:
+                    doc.fetch_references(references, callback=self.handle_auto_load_references(doc, callback))
+
+        return handle
+
+    @return_future
+    def get(self, id=None, callback=None, alias=None, **kwargs):
+        '''
+        Gets a single item of the current queryset collection using it's id.
+
+        If neither an id nor filters are passed, the filters of the queryset are used.
+
+        In order to query a different database, please specify the `alias` of the database to query.
+        '''
+
+        from motorengine import Q
+
+        if id is None and not kwargs and not self._filters:
+            raise RuntimeError("Either an id or a filter must be provided to get")
+
+        if id is not None:
+            if not isinstance(id, ObjectId):
+                id = ObjectId(id)
+
+            query_filters = None
             filters = {
                 "_id": id
             }
+        elif kwargs:
+            query_filters = Q(**kwargs)
+            filters = self.get_query_from_filters(query_filters)
         else:
-            filters = Q(**kwargs)
-            filters = self.get_query_from_filters(filters)
+            query_filters = self._filters
+            filters = self.get_query_from_filters(self._filters)
 
-        self.coll(alias).find_one(
-            filters, projection=self._loaded_fields.to_query(self.__klass__),
-            callback=self.handle_get(callback)
+        document = self.get_from_identity_map(id)
+        if document is not None:
+            callback(document)
+            return
+
+        if self._lookup_related:
+            pipeline = [{'$match': filters}, {'$limit': 1}] + self.get_lookup_stages()
+            self.coll(alias).aggregate(pipeline, **self.get_aggregate_options(query_filters)).to_list(
+                None, callback=self.handle_get_with_lookup(callback)
+            )
+            return
+
+        run_query = partial(
+            self.coll(alias).find_one, filters, projection=self.get_projection(),
+            callback=self.handle_get(callback), **self.get_find_options(query_filters)
         )
 
+        if self.should_explain(alias, filters):
+            self.run_in_strict_mode(alias, filters, self._get_find_one_cursor(alias, filters, query_filters), run_query)
+            return
+
+        run_query()
+
+    def _get_find_one_cursor(self, alias, filters, query_filters=None):
+        return self.coll(alias).find(
+            filters, projection=self.get_projection(), limit=1, **self.get_find_options(query_filters)
+        )
+
+    def should_explain(self, alias, query_filters=None):
+        '''
+        Returns True if the query must be explained before it runs, because strict mode is enabled for
+        the alias and it is the first query with this shape (see `motorengine.explain`).
+        '''
+        if self._lookup_related or get_strict_mode(self.get_alias(alias)) is None:
+            return False
+
+        if query_filters is None:
+            query_filters = self.get_query_from_filters(self._filters)
+
+        shape = (
+            get_query_shape(query_filters),
+            tuple(self._order_fields),
+            get_query_shape(self.get_projection()),
+        )
+
+        return should_explain_shape(self.get_alias(alias), self.__klass__.__collection__, shape)
+
+    def get_query_description(self, query_filters):
+        return "'%s' collection with filter %r" % (self.__klass__.__collection__, query_filters)
+
+    def handle_strict_mode(self, alias, query_filters, run_query):
+        def handle(*arguments, **kw):
+            if len(arguments) > 1 and arguments[1]:
+                raise arguments[1]
+
+            check_query_plan(
+                self.get_alias(alias), self.get_query_description(query_filters), get_plan_summary(arguments[0])
+            )
+            run_query()
+
+        return handle
+
+    def run_in_strict_mode(self, alias, query_filters, cursor, run_query):
+        '''
+        Explains `cursor` and checks its plan (see `motorengine.explain.check_query_plan`) before calling `run_query`.
+        '''
+        cursor.explain(callback=self.handle_strict_mode(alias, query_filters, run_query))
+
+    def handle_explain(self, callback):
+        def handle(*arguments, **kw):
+            if len(arguments) > 1 and arguments[1]:
+                raise arguments[1]
+
+            callback(get_plan_summary(arguments[0]))
+
+        return handle
+
+    @return_future
+    def explain(self, callback, alias=None):
+        '''
+        Explains the query that `find_all` would run with the current filters, order, projection and options.
+
+        Calls back with the winning plan (`winning_plan`), the names of its stages (`stages`), the index used
+        (`index_name`, `None` for collection scans, and `index_names` if more than one is used), the number of
+        index keys examined (`keys_examined`), documents examined (`docs_examined`) and returned (`returned`),
+        whether it is a collection scan (`is_collection_scan`) and the result of the explain command (`raw`).
+
+        Usage::
+
+            User.objects.filter(last_name="Heynemann").order_by(User.first_name).explain(callback=handle_plan)
+
+            def handle_plan(plan):
+                assert not plan.is_collection_scan, "Missing index on last_name"
+        '''
+        cursor = self._get_find_cursor(alias=alias)
+        cursor.explain(callback=self.handle_explain(callback))
+
+    def get_from_identity_map(self, id):
+        '''
+        Returns the document with the specified id from the active identity map, if it
+        can be returned by `get` without querying the database.
+        '''
+        if id is None or self._loaded_fields or self._select_related or self._lookup_related:
+            return None
+
+        identity_map = get_identity_map()
+        if identity_map is None:
+            return None
+
+        return identity_map.get(self.__klass__, id, self.get_loading_options())
+
     def get_query_from_filters(self, filters):
         if not filters:
             return {}
 
-        query = filters.to_query(self.__klass__)
+        query = filters.to_query(self.__klass__, self.get_collation(filters))
         return query
 
     def _get_find_cursor(self, alias):
-        find_arguments = {}
+        find_arguments = self.get_find_options()
 
         if self._order_fields:
             find_arguments['sort'] = self._order_fields
@@ -661,7 +1568,7 @@ class QuerySet(object):
         query_filters = self.get_query_from_filters(self._filters)
 
         return self.coll(alias).find(
-            query_filters, projection=self._loaded_fields.to_query(self.__klass__),
+            query_filters, projection=self.get_projection(),
             **find_arguments
         )
 
@@ -697,6 +1604,31 @@ class QuerySet(object):
 
         return self
 
+    def prepare(self, *arguments, **kwargs):
+        '''
+        Returns a prepared query for the filters of the queryset and the specified ones (as in `filter`), where
+        values can be `Param` placeholders.
+
+        The filters, fields, operators and projection are compiled once. Each call of `find_all`, `get` or
+        `count` of the prepared query only converts the values passed for the parameters (by name).
+
+        Usage::
+
+            from motorengine import Q, Param
+
+            adults_by_name = User.objects.order_by('age').prepare(Q(name=Param('name'), age__gt=Param('min_age')))
+
+            adults_by_name.find_all(name="Bernardo", min_age=18, callback=handle_all)
+            adults_by_name.count(name="Rafael", min_age=21, callback=handle_count)
+        '''
+        from motorengine.query_builder.node import Q
+        from motorengine.query_builder.prepared import PreparedQuery
+
+        if arguments or kwargs:
+            self.filter(*arguments, **kwargs)
+
+        return PreparedQuery(self, self._filters or Q())
+
     def filter_not(self, *arguments, **kwargs):
         '''
         Filters a queryset to negate all the filters passed in subsequent queries.
@@ -744,6 +1676,191 @@ class QuerySet(object):
         self._limit = limit
         return self
 
+    def batch_size(self, batch_size):
+        '''
+        Sets the number of documents returned by MongoDB in each batch of the cursor in subsequent queries.
+
+        Usage::
+
+            User.objects.batch_size(500).find_all(callback=handle_all)
+        '''
+
+        self._batch_size = batch_size
+        return self
+
+    def hint(self, index):
+        '''
+        Forces MongoDB to use the specified index in subsequent queries, either by name or by
+        its specification (a list of fields and directions, as in `order_by`).
+
+        Usage::
+
+            User.objects.hint('last_name_1').find_all(callback=handle_all)
+            User.objects.hint([(User.last_name, ASCENDING), ('first_name', ASCENDING)]).find_all(callback=handle_all)
+        '''
+
+        from motorengine.fields.base_field import BaseField
+
+        if isinstance(index, (list, tuple)):
+            index_fields = []
+
+            for field_name, direction in index:
+                if isinstance(field_name, (BaseField, )):
+                    field_name = field_name.db_field
+
+                index_fields.append((field_name, direction))
+
+            index = index_fields
+
+        self._hint = index
+        return self
+
+    def max_time_ms(self, max_time_ms):
+        '''
+        Aborts subsequent queries if they take longer than the specified number of milliseconds in the server.
+
+        Defaults to the `__max_time_ms__` attribute of the document class (`None` means no limit).
+
+        Usage::
+
+            User.objects.max_time_ms(200).find_all(callback=handle_all)
+        '''
+
+        self._max_time_ms = max_time_ms
+        return self
+
+    def comment(self, comment):
+        '''
+        Attaches a comment to subsequent queries, to find them in the profiler and in the server logs.
+
+        Usage::
+
+            User.objects.comment('newsletter').find_all(callback=handle_all)
+        '''
+
+        self._comment = comment
+        return self
+
+    def no_cursor_timeout(self, no_cursor_timeout=True):
+        '''
+        Keeps the cursor of subsequent queries open in the server even if it is idle for more than 10 minutes.
+        The cursor must be exhausted or closed (see `iterate` and `each_batch`) to release it.
+
+        Usage::
+
+            User.objects.no_cursor_timeout().each_batch(100, handle_batch, callback=handle_done)
+        '''
+
+        self._no_cursor_timeout = no_cursor_timeout
+        return self
+
+    def collation(self, collation):
+        '''
+        Uses the specified collation (a dict or a `pymongo.collation.Collation`) to compare strings in
+        subsequent queries.
+
+        Usage::
+
+            User.objects.collation({'locale': 'en', 'strength': 2}).filter(last_name="heynemann").find_all(
+                callback=handle_all
+            )
+        '''
+
+        self._collation = collation
+        return self
+
+    def get_write_options(self, filters=None):
+        '''
+        Returns the keyword arguments to be passed to `update` and `remove` when using `filters` (the filters
+        of the queryset by default).
+        '''
+        collation = self.get_collation(filters)
+        if collation is None:
+            return {}
+
+        return {'collation': collation}
+
+    def get_max_time_ms(self):
+        if self._max_time_ms is not None:
+            return self._max_time_ms
+
+        return self.__klass__.__max_time_ms__
+
+    def get_collation(self, filters=None):
+        '''
+        Returns the collation set with `collation` or else the collation of the fields declared with
+        one that are compared in `filters` (the filters of the queryset by default), if every other string
+        in the filters and the order of the queryset is compared with that collation too
+        (see `motorengine.query_builder.transform.get_query_collation`).
+        '''
+        from motorengine.query_builder.transform import get_query_collation
+
+        if self._collation is not None:
+            return self._collation
+
+        if filters is None:
+            filters = self._filters
+
+        if not filters:
+            return None
+
+        return get_query_collation(self.__klass__, filters, self._sort_fields)
+
+    def get_find_options(self, filters=None):
+        '''
+        Returns the keyword arguments of the cursor options to be passed to `find` and `find_one`.
+        '''
+        options = {}
+
+        if self._batch_size is not None:
+            options['batch_size'] = self._batch_size
+
+        if self._hint is not None:
+            options['hint'] = self._hint
+
+        max_time_ms = self.get_max_time_ms()
+        if max_time_ms is not None:
+            options['max_time_ms'] = max_time_ms
+
+        if self._comment is not None:
+            options['comment'] = self._comment
+
+        if self._no_cursor_timeout:
+            options['no_cursor_timeout'] = True
+
+        collation = self.get_collation(filters)
+        if collation is not None:
+            options['collation'] = collation
+
+        return options
+
+    def get_aggregate_options(self, filters=None):
+        '''
+        Returns the keyword arguments of the cursor options to be passed to `aggregate`.
+        '''
+        options = {}
+
+        if self._batch_size is not None:
+            options['batchSize'] = self._batch_size
+
+        if isinstance(self._hint, list):
+            options['hint'] = SON(self._hint)
+        elif self._hint is not None:
+            options['hint'] = self._hint
+
+        max_time_ms = self.get_max_time_ms()
+        if max_time_ms is not None:
+            options['maxTimeMS'] = max_time_ms
+
+        if self._comment is not None:
+            options['comment'] = self._comment
+
+        collation = self.get_collation(filters)
+        if collation is not None:
+            options['collation'] = collation
+
+        return options
+
     def order_by(self, field_name, direction=ASCENDING):
         '''
         Specified the order to be used when returning documents in subsequent queries.
@@ -753,6 +1870,10 @@ class QuerySet(object):
             from motorengine import DESCENDING  # or ASCENDING
 
             User.objects.order_by('first_name', direction=DESCENDING).find_all(callback=handle_all)
+
+        Fields of embedded documents can be specified with dotted paths::
+
+            User.objects.order_by('address.city').find_all(callback=handle_all)
         '''
 
         from motorengine.fields.base_field import BaseField
@@ -764,57 +1885,63 @@ class QuerySet(object):
         if isinstance(field_name, (BaseField, )):
             field_name = field_name.name
 
-        if field_name not in self.__klass__._fields:
+        db_field_path = self.__klass__.get_db_field_path(field_name)
+
+        if db_field_path is None:
             raise ValueError("Invalid order by field '%s': Field not found in '%s'." % (field_name, self.__klass__.__name__))
 
-        field = self.__klass__._fields[field_name]
-        self._order_fields.append((field.db_field, direction))
+        self._order_fields.append((db_field_path, direction))
+        self._sort_fields.append(self.__klass__.get_fields(field_name)[-1])
         return self
 
-    def handle_find_all_auto_load_references(self, callback, results):
-        def handle(*arguments, **kwargs):
-            self.current_count += 1
-            if self.current_count == self.result_size:
-                self.current_count = None
-                self.result_size = None
-                callback(results)
-
-        return handle
-
     def handle_find_all(self, callback, lazy=None):
         def handle(*arguments, **kwargs):
             if arguments and len(arguments) > 1 and arguments[1]:
                 raise arguments[1]
 
-            result = []
-            self.current_count = 0
-            self.result_size = len(arguments[0])
-
-            # if _loaded_fields is not empty then documents are partly loaded
-            is_partly_loaded = bool(self._loaded_fields)
+            result, references = self.get_documents_from_son(arguments[0], lazy=lazy)
 
-            for doc in arguments[0]:
-                obj = self.__klass__.from_son(
-                    doc,
-                    # set projections for references (if any)
-                    _reference_loaded_fields=self._reference_loaded_fields,
-                    _is_partly_loaded=is_partly_loaded
-                )
-
-                result.append(obj)
-
-            if not result:
+            if not references:
                 callback(result)
                 return
 
-            for doc in result:
-                if (lazy is not None and not lazy) or not doc.is_lazy:
-                    doc.load_references(doc._fields, callback=self.handle_find_all_auto_load_references(callback, result))
-                else:
-                    self.handle_find_all_auto_load_references(callback, result)()
+            # references of all the documents are loaded together
+            result[0].fetch_references(references, callback=self.handle_auto_load_references(result, callback))
 
         return handle
 
+    def get_documents_from_son(self, docs, lazy=None):
+        '''
+        Returns the documents for the data loaded by a query and the references that must be loaded
+        for them (with `fetch_references`) before they are returned.
+        '''
+        result = []
+        joined_documents = []
+
+        # if _loaded_fields is not empty then documents are partly loaded
+        is_partly_loaded = bool(self._loaded_fields)
+
+        for doc in docs:
+            joined_fields = self.pop_lookup_fields(doc)
+
+            obj = self.get_document_from_son(doc, is_partly_loaded=is_partly_loaded, lazy=lazy)
+
+            joined_documents.extend(self.fill_lookup_fields(obj, joined_fields))
+
+            result.append(obj)
+
+        references = self.find_related_references(result, load_all_references=self.should_load_all_references(lazy))
+        self.find_joined_references(joined_documents, references)
+
+        return result, references
+
+    def _get_results_cursor(self, alias, limit=None):
+        if self._lookup_related:
+            pipeline = self.get_lookup_pipeline(self.get_query_from_filters(self._filters), limit=limit)
+            return self.coll(alias).aggregate(pipeline, **self.get_aggregate_options())
+
+        return self._get_find_cursor(alias=alias)
+
     @return_future
     def find_all(self, callback, lazy=None, alias=None):
         '''
@@ -838,10 +1965,310 @@ class QuerySet(object):
         else:
             to_list_arguments['length'] = DEFAULT_LIMIT
 
-        cursor = self._get_find_cursor(alias=alias)
+        cursor = self._get_results_cursor(alias, limit=to_list_arguments['length'])
+
+        if self.should_explain(alias):
+            query_filters = self.get_query_from_filters(self._filters)
+            self.run_in_strict_mode(alias, query_filters, cursor, partial(cursor.to_list, **to_list_arguments))
+            return
 
         cursor.to_list(**to_list_arguments)
 
+    def handle_each_batch(self, result, cursor, batch_size, handler, lazy=None, document_count=0):
+        def handle(*arguments, **kwargs):
+            if arguments and len(arguments) > 1 and arguments[1]:
+                self.fail_each_batch(result, cursor, (type(arguments[1]), arguments[1], None))
+                return
+
+            if not arguments[0]:
+                future_set_result_unless_cancelled(result, document_count)
+                return
+
+            documents, references = self.get_documents_from_son(arguments[0], lazy=lazy)
+
+            process_batch = self.handle_process_batch(
+                result, cursor, batch_size, handler, lazy=lazy, document_count=document_count + len(documents)
+            )
+
+            if not references:
+                process_batch(documents)
+                return
+
+            # references of all the documents in the batch are loaded together
+            documents[0].fetch_references(
+                references, callback=self.handle_auto_load_references(documents, process_batch)
+            )
+
+        return handle
+
+    def fail_each_batch(self, result, cursor, exc_info):
+        '''
+        Closes the cursor of `each_batch` and fails its result with the error in `exc_info`.
+        '''
+        cursor.close()
+        if not result.done():
+            future_set_exc_info(result, exc_info)
+
+    def handle_process_batch(self, result, cursor, batch_size, handler, lazy=None, document_count=0):
+        def fetch_next_batch(handler_result):
+            if handler_result is False:
+                # the handler asked to stop before the cursor was exhausted
+                cursor.close()
+                future_set_result_unless_cancelled(result, document_count)
+                return
+
+            cursor.to_list(
+                length=batch_size,
+                callback=self.handle_each_batch(
+                    result, cursor, batch_size, handler, lazy=lazy, document_count=document_count
+                )
+            )
+
+        def handle_handler_future(future):
+            try:
+                handler_result = future.result()
+            except Exception:
+                self.fail_each_batch(result, cursor, sys.exc_info())
+                return
+
+            fetch_next_batch(handler_result)
+
+        def handle(documents):
+            try:
+                handler_result = handler(documents)
+            except Exception:
+                self.fail_each_batch(result, cursor, sys.exc_info())
+                return
+
+            if not is_future(handler_result):
+                fetch_next_batch(handler_result)
+                return
+
+            # backpressure: the next batch is only fetched after the handler is done with this one
+            IOLoop.current().add_future(handler_result, handle_handler_future)
+
+        return handle
+
+    def each_batch(self, batch_size, handler, callback=None, lazy=None, alias=None):
+        '''
+        Calls `handler` with lists of (at most) `batch_size` documents in the current queryset collection that
+        match specified filters (if any), without the `DEFAULT_LIMIT` of `find_all`.
+
+        Only one batch is kept in memory: if `handler` returns a Future, the next batch is only fetched once it
+        resolves. If `handler` returns (or resolves to) `False` the cursor is closed and no more batches are
+        fetched. Projections (`only`, `exclude`, `fields`) and lazy-reference settings are applied to every batch.
+
+        Returns a Future (and calls back) with the number of documents handled. If `handler` raises an error
+        (or returns a Future that fails) the cursor is closed and the Future fails with that error.
+
+        Usage::
+
+            @gen.coroutine
+            def handle_users(users):
+                for user in users:
+                    yield send_newsletter(user)
+
+            User.objects.filter(active=True).each_batch(500, handle_users, callback=handle_done)
+
+            def handle_done(document_count):
+                # all the users were handled
+                pass
+        '''
+        result = Future()
+        if callback is not None:
+            IOLoop.current().add_future(result, lambda future: callback(future.result()))
+
+        cursor = self._get_results_cursor(alias, limit=self._limit)
+        if not self._lookup_related:
+            cursor.batch_size(batch_size)
+
+        cursor.to_list(
+            length=batch_size,
+            callback=self.handle_each_batch(result, cursor, batch_size, handler, lazy=lazy)
+        )
+
+        return result
+
+    def get_keyset_sort(self):
+        '''
+        Returns the sort used by `paginate_after`: the `order_by` fields followed by `_id` as a tiebreaker.
+        '''
+        sort = list(self._order_fields)
+
+        if '_id' not in [db_field for db_field, direction in sort]:
+            direction = sort[-1][1] if sort else ASCENDING
+            sort.append(('_id', direction))
+
+        return sort
+
+    def get_keyset_key(self, son, sort):
+        key = []
+
+        for db_field, direction in sort:
+            value = son
+            for part in db_field.split('.'):
+                value = value.get(part) if isinstance(value, dict) else None
+            key.append(value)
+
+        return key
+
+    def encode_page_token(self, sort, key):
+        data = BSON.encode({'s': [db_field for db_field, direction in sort], 'k': key})
+        return base64.urlsafe_b64encode(data).decode('ascii')
+
+    def decode_page_token(self, sort, token):
+        try:
+            data = BSON(base64.urlsafe_b64decode(token.encode('ascii'))).decode()
+        except (BSONError, binascii.Error, TypeError, ValueError):
+            raise ValueError("Invalid pagination token '%s'." % token)
+
+        if data.get('s') != [db_field for db_field, direction in sort]:
+            raise ValueError("Invalid pagination token '%s': The token was created for a different order." % token)
+
+        return data['k']
+
+    def get_keyset_query(self, sort, key):
+        '''
+        Returns the range filter that matches the documents after `key` in the given `sort`.
+
+        MongoDB sorts null and missing values before any other value, and range operators
+        never match them, so they are matched explicitly.
+        '''
+        conditions = []
+
+        for index, (db_field, direction) in enumerate(sort):
+            condition = SON()
+            for previous_index, (previous_field, previous_direction) in enumerate(sort[:index]):
+                condition[previous_field] = key[previous_index]
+
+            value = key[index]
+
+            if value is None:
+                if direction == DESCENDING:
+                    # no value comes after null in descending order
+                    continue
+
+                condition[db_field] = {'$ne': None}
+            elif direction == DESCENDING and db_field != '_id':
+                condition['$or'] = [{db_field: {'$lt': value}}, {db_field: None}]
+            else:
+                comparison = '$lt' if direction == DESCENDING else '$gt'
+                condition[db_field] = {comparison: value}
+
+            conditions.append(condition)
+
+        if len(conditions) == 1:
+            return conditions[0]
+
+        return {'$or': conditions}
+
+    def get_page_query(self, last_doc_or_key, sort):
+        query_filters = self.get_query_from_filters(self._filters)
+
+        if last_doc_or_key is None:
+            return query_filters
+
+        if isinstance(last_doc_or_key, self.__klass__):
+            son = last_doc_or_key.to_son()
+            son['_id'] = last_doc_or_key._id
+            key = self.get_keyset_key(son, sort)
+        elif isinstance(last_doc_or_key, (list, tuple)):
+            key = list(last_doc_or_key)
+        else:
+            key = self.decode_page_token(sort, last_doc_or_key)
+
+        if len(key) != len(sort):
+            raise ValueError(
+                "Invalid pagination key %r: Expected values for %s." % (
+                    last_doc_or_key, ", ".join([db_field for db_field, direction in sort])
+                )
+            )
+
+        keyset_query = self.get_keyset_query(sort, key)
+
+        if not query_filters:
+            return keyset_query
+
+        return {'$and': [query_filters, keyset_query]}
+
+    def _get_page_cursor(self, last_doc_or_key, page_size, sort, alias):
+        query_filters = self.get_page_query(last_doc_or_key, sort)
+
+        # one more document is loaded to know if there is a next page
+        if self._lookup_related:
+            pipeline = [{'$sort': SON(sort)}, {'$limit': page_size + 1}]
+            if query_filters:
+                pipeline.insert(0, {'$match': query_filters})
+
+            return self.coll(alias).aggregate(pipeline + self.get_lookup_stages(), **self.get_aggregate_options())
+
+        return self.coll(alias).find(
+            query_filters, projection=self.get_projection(),
+            sort=sort, limit=page_size + 1, **self.get_find_options()
+        )
+
+    def get_page(self, docs, page_size, sort):
+        '''
+        Returns the data of the documents in the page and the token for the next page (or None).
+        '''
+        if len(docs) <= page_size:
+            return docs, None
+
+        docs = docs[:page_size]
+        return docs, self.encode_page_token(sort, self.get_keyset_key(docs[-1], sort))
+
+    def handle_paginate_after(self, callback, page_size, sort, lazy=None):
+        def handle(*arguments, **kwargs):
+            if arguments and len(arguments) > 1 and arguments[1]:
+                raise arguments[1]
+
+            docs, next_token = self.get_page(arguments[0], page_size, sort)
+            result, references = self.get_documents_from_son(docs, lazy=lazy)
+            page = edict(items=result, next=next_token)
+
+            if not references:
+                callback(page)
+                return
+
+            # references of all the documents are loaded together
+            result[0].fetch_references(references, callback=self.handle_auto_load_references(page, callback))
+
+        return handle
+
+    @return_future
+    def paginate_after(self, last_doc_or_key, page_size, callback, lazy=None, alias=None):
+        '''
+        Returns a page of at most `page_size` documents that match specified filters (if any), after
+        `last_doc_or_key` in the order specified with `order_by` (with `_id` as a tiebreaker).
+
+        Instead of skipping documents (which is as slow as the number of documents skipped), each page is
+        queried with range filters on the order fields, so every page costs the same when the collection has
+        an index with these fields (followed by `_id`).
+
+        `last_doc_or_key` is either `None` for the first page, the `next` token of the previous page, the last
+        document of the previous page or the list of its values for the order fields (followed by its `_id`).
+
+        Calls back with an object with the documents in `items` and the token of the next page in `next`
+        (`None` in the last page). `skip` and `limit` are not applied.
+
+        Usage::
+
+            queryset = User.objects.filter(active=True).order_by('last_name').order_by('first_name')
+            queryset.paginate_after(None, 50, callback=handle_page)
+
+            def handle_page(page):
+                # do something with page.items
+                if page.next is not None:
+                    queryset.paginate_after(page.next, 50, callback=handle_page)
+        '''
+        sort = self.get_keyset_sort()
+        cursor = self._get_page_cursor(last_doc_or_key, page_size, sort, alias)
+
+        cursor.to_list(
+            length=page_size + 1,
+            callback=self.handle_paginate_after(callback, page_size, sort, lazy=lazy)
+        )
+
     def handle_count(self, callback):
         def handle(*arguments, **kwargs):
             if arguments and len(arguments) > 1 and arguments[1]:
@@ -850,18 +2277,120 @@ class QuerySet(object):
 
         return handle
 
+    def get_max_count(self, approximate):
+        if approximate is True:
+            return DEFAULT_APPROXIMATE_COUNT
+
+        return approximate or None
+
+    def get_count_pipeline(self, with_limit_and_skip=False, max_count=None):
+        '''
+        Returns the aggregation pipeline used by `count` (the same one used by `count_documents` in
+        newer versions of pymongo).
+        '''
+        pipeline = [{'$match': self.get_query_from_filters(self._filters)}]
+
+        limit = None
+        if with_limit_and_skip:
+            if self._skip:
+                pipeline.append({'$skip': self._skip})
+            limit = self._limit
+
+        if max_count is not None:
+            limit = min(limit, max_count) if limit else max_count
+
+        if limit:
+            pipeline.append({'$limit': limit})
+
+        pipeline.append({'$group': {'_id': 1, 'n': {'$sum': 1}}})
+
+        return pipeline
+
+    def get_count_from_result(self, result):
+        if not result:
+            return 0
+
+        return result[0]['n']
+
+    def handle_count_documents(self, callback):
+        def handle(*arguments, **kwargs):
+            if arguments and len(arguments) > 1 and arguments[1]:
+                raise arguments[1]
+            callback(self.get_count_from_result(arguments[0]))
+
+        return handle
+
     @return_future
-    def count(self, callback, alias=None):
+    def count(self, callback, alias=None, approximate=False, with_limit_and_skip=False):
         '''
         Returns the number of documents in the collection that match the specified filters, if any.
+
+        Documents are counted with an aggregation, so the `hint`, `max_time_ms`, `comment` and `collation` of
+        the queryset are applied. `skip` and `limit` are only applied if `with_limit_and_skip` is True.
+
+        If `approximate` is True (or a number) counting stops at `DEFAULT_APPROXIMATE_COUNT` (or that number)
+        documents, so a result equal to it means "that many or more".
+
+        Usage::
+
+            User.objects.filter(active=True).count(approximate=100, callback=handle_count)
+
+            def handle_count(count):
+                print("%d%s users" % (count, "+" if count == 100 else ""))
         '''
-        cursor = self._get_find_cursor(alias=alias)
-        cursor.count(callback=self.handle_count(callback))
+        pipeline = self.get_count_pipeline(
+            with_limit_and_skip=with_limit_and_skip, max_count=self.get_max_count(approximate)
+        )
+        run_query = partial(
+            self.coll(alias).aggregate(pipeline, **self.get_aggregate_options()).to_list,
+            None, callback=self.handle_count_documents(callback)
+        )
+
+        if self.should_explain(alias):
+            cursor = self._get_find_cursor(alias=alias)
+            self.run_in_strict_mode(alias, self.get_query_from_filters(self._filters), cursor, run_query)
+            return
+
+        run_query()
+
+    def get_estimated_count_options(self):
+        max_time_ms = self.get_max_time_ms()
+        if max_time_ms is None:
+            return {}
+
+        return {'maxTimeMS': max_time_ms}
+
+    @return_future
+    def estimated_count(self, callback, alias=None):
+        '''
+        Returns the number of documents in the collection using its metadata, without scanning documents or
+        index keys. The result may be inaccurate after unclean shutdowns or in sharded clusters with orphaned
+        documents.
+
+        If the queryset has filters, the documents that match them are counted with `count` instead.
+
+        Usage::
+
+            User.objects.estimated_count(callback=handle_count)
+        '''
+        if self._filters:
+            self.count(callback=callback, alias=alias)
+            return
+
+        self.coll(alias).count(callback=self.handle_count(callback), **self.get_estimated_count_options())
 
     @property
     def aggregate(self):
         return Aggregation(self)
 
+    @property
+    def bulk(self):
+        '''
+        Returns a builder of unordered bulk writes of updates, upserts, replacements and deletions
+        for the documents of this queryset (see `motorengine.bulk`).
+        '''
+        return BulkOperations(self)
+
     def handle_ensure_index(self, callback, created_indexes, total_indexes):
         def handle(*arguments, **kw):
             if len(arguments) > 1 and arguments[1]:
@@ -876,11 +2405,19 @@ class QuerySet(object):
 
         return handle
 
+    def get_index_options(self, field):
+        options = dict(unique=field.unique, sparse=field.sparse)
+
+        if field.collation is not None:
+            options['collation'] = field.collation
+
+        return options
+
     @return_future
     def ensure_index(self, callback, alias=None):
         fields_with_index = []
         for field_name, field in self.__klass__._fields.items():
-            if field.unique or field.sparse:
+            if field.unique or field.sparse or field.collation is not None:
                 fields_with_index.append(field)
 
         created_indexes = []
@@ -888,13 +2425,12 @@ class QuerySet(object):
         for field in fields_with_index:
             self.coll(alias).ensure_index(
                 field.db_field,
-                unique=field.unique,
-                sparse=field.sparse,
                 callback=self.handle_ensure_index(
                     callback,
                     created_indexes,
                     len(fields_with_index)
                 ),
+                **self.get_index_options(field)
             )
 
         if not fields_with_index:
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Code generation of per-class `to_son` and `from_son` functions.
+
+Instead of looping over `_fields` and calling `get_value`, `to_son` and
+`from_son` of every field, a specialized function is generated for each
+Document class the first time it is serialized or deserialized:
+
+* fields that do not change values (the `BaseField` implementation) are inlined;
+* `sparse` checks are only emitted for sparse fields;
+* embedded documents call the compiled functions of their own class.
+
+Set `COMPILE_SERIALIZERS` to `False` to use the generic loops in
+`BaseDocument.to_son` and `BaseDocument.from_son` (e.g. when debugging).
+'''
+
+from motorengine.fields.base_field import BaseField
+from motorengine.fields.embedded_document_field import EmbeddedDocumentField
+from motorengine.fields.list_field import ListField
+
+COMPILE_SERIALIZERS = True
+
+MISSING = object()
+
+
+def is_identity(field, method_name):
+    return getattr(type(field), method_name) is getattr(BaseField, method_name)
+
+
+def is_embedded(field, method_name):
+    return isinstance(field, EmbeddedDocumentField) and \
+        getattr(type(field), method_name) is getattr(EmbeddedDocumentField, method_name)
+
+
+def is_identity_list(field, method_name):
+    return isinstance(field, ListField) and \
+        getattr(type(field), method_name) is getattr(ListField, method_name) and \
+        is_identity(field._base_field, method_name)
+
+
+def compile_function(name, lines, namespace):
+    source = "\n".join(lines)
+    exec(compile(source, "<motorengine %s>" % name, "exec"), namespace)
+    function = namespace[name]
+    function.__source__ = source
+
+    return function
+
+
+def compile_to_son(document_class):
+    '''
+    Generates the function used by `document_class.to_son`. It receives the
+    document and returns the dict to be sent to MongoDB.
+    '''
+    fields = list(document_class._fields.items())
+    namespace = {}
+
+    lines = [
+        "def to_son(document):",
+        "    values = document._values",
+        "    data = {}",
+    ]
+
+    for index, (name, field) in enumerate(fields):
+        field_var = "field_%d" % index
+        namespace[field_var] = field
+
+        if is_identity(field, 'get_value'):
+            lines.append("    value = values.get(%r, None)" % name)
+        else:
+            lines.append("    value = %s.get_value(values.get(%r, None))" % (field_var, name))
+
+        indent = "    "
+        if field.sparse:
+            lines.append("    if value is not None:")
+            indent = "        "
+
+        if is_identity(field, 'to_son'):
+            expression = "value"
+        elif is_embedded(field, 'to_son'):
+            expression = "None if value is None else value.to_son()"
+        elif is_identity_list(field, 'to_son'):
+            expression = "list(value)"
+        else:
+            expression = "%s.to_son(value)" % field_var
+
+        lines.append("%sdata[%r] = %s" % (indent, field.db_field, expression))
+
+    # dynamic fields are kept per instance
+    lines.extend([
+        "    dynamic_fields = document._dynamic_fields",
+        "    if dynamic_fields:",
+        "        for name, db_field in dynamic_fields.items():",
+        "            data[db_field] = values.get(name, None)",
+        "    return data",
+    ])
+
+    return compile_function("to_son", lines, namespace)
+
+
+def compile_from_son(document_class):
+    '''
+    Generates the function used by `document_class.from_son`. It receives the
+    dict loaded from MongoDB (without `_id`) and returns the values to
+    initialize the document with, keyed by field name.
+    '''
+    fields = list(document_class._fields.items())
+    namespace = {
+        'MISSING': MISSING,
+        'document_class': document_class,
+        'declared_db_fields': frozenset(field.db_field for name, field in fields),
+    }
+
+    lines = [
+        "def from_son(dic):",
+        "    field_values = {}",
+        "    found = 0",
+    ]
+
+    for index, (name, field) in enumerate(fields):
+        field_var = "field_%d" % index
+        namespace[field_var] = field
+
+        if is_identity(field, 'from_son'):
+            expression = "value"
+        elif is_embedded(field, 'from_son'):
+            type_var = "embedded_type_%d" % index
+            namespace[type_var] = field.embedded_type
+            expression = "None if value is None else %s.from_son(value)" % type_var
+        elif is_identity_list(field, 'from_son'):
+            expression = "list() if value is None else list(value)"
+        else:
+            expression = "%s.from_son(value)" % field_var
+
+        lines.extend([
+            "    value = dic.get(%r, MISSING)" % field.db_field,
+            "    if value is not MISSING:",
+            "        found += 1",
+            "        field_values[%r] = %s" % (field.name, expression),
+        ])
+
+    # keys that are not declared in the class are handled as dynamic fields
+    lines.extend([
+        "    if found != len(dic):",
+        "        for name, value in dic.items():",
+        "            if name in declared_db_fields:",
+        "                continue",
+        "            field = document_class.get_field_by_db_name(name)",
+        "            if field:",
+        "                field_values[field.name] = field.from_son(value)",
+        "            else:",
+        "                field_values[document_class.get_dynamic_field_name(name)] = value",
+        "    return field_values",
+    ])
+
+    return compile_function("from_son", lines, namespace)
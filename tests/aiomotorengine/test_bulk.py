@@ -6,6 +6,7 @@ from preggy import expect
 from motorengine.aiomotorengine import (
     Document, StringField
 )
+from motorengine.errors import BulkInsertError
 from tests.aiomotorengine import AsyncTestCase, async_test
 
 
@@ -14,10 +15,16 @@ class Comment(Document):
     text = StringField(required=True)
 
 
+class UniqueComment(Document):
+    __collection__ = "UniqueCommentBulk"
+    text = StringField(required=True, unique=True)
+
+
 class TestBulkInsert(AsyncTestCase):
     def setUp(self):
         super(TestBulkInsert, self).setUp()
         self.drop_coll("CommentBulk")
+        self.drop_coll("UniqueCommentBulk")
 
     @async_test
     @asyncio.coroutine
@@ -74,3 +81,40 @@ class TestBulkInsert(AsyncTestCase):
             )
         else:
             assert False, "Should not have gotten this far"
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_insert_generator_in_chunks(self):
+        comments = (Comment(text=str(number)) for number in range(25))
+
+        inserted = yield from Comment.objects.bulk_insert(comments, chunk_size=10)
+
+        expect(inserted).to_length(25)
+        expect([comment.text for comment in inserted]).to_equal([str(number) for number in range(25)])
+
+        count = yield from Comment.objects.count()
+        expect(count).to_equal(25)
+
+    @async_test
+    @asyncio.coroutine
+    def test_unordered_insert_reports_errors_per_document(self):
+        yield from UniqueComment.objects.ensure_index()
+
+        comments = [
+            UniqueComment(text="a"), UniqueComment(text=None), UniqueComment(text="a"), UniqueComment(text="b")
+        ]
+
+        try:
+            yield from UniqueComment.objects.bulk_insert(comments, ordered=False, chunk_size=2, concurrency=2)
+        except BulkInsertError:
+            err = sys.exc_info()[1]
+            expect([error.index for error in err.errors]).to_equal([1, 2])
+            expect(err.errors[1].code).to_equal(11000)
+        else:
+            assert False, "Should not have gotten this far"
+
+        expect(comments[0]._id).not_to_be_null()
+        expect(comments[3]._id).not_to_be_null()
+
+        count = yield from UniqueComment.objects.count()
+        expect(count).to_equal(2)
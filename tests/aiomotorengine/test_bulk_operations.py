@@ -0,0 +1,63 @@
+import asyncio
+
+from preggy import expect
+
+from motorengine.aiomotorengine import Document, StringField, IntField, Q
+from tests.aiomotorengine import AsyncTestCase, async_test
+
+
+class Account(Document):
+    __collection__ = "BulkAccount"
+
+    email = StringField(required=True, unique=True)
+    plan = StringField(db_field="p")
+    logins = IntField(default=0)
+
+
+class TestBulkOperations(AsyncTestCase):
+    def setUp(self):
+        super(TestBulkOperations, self).setUp()
+        self.drop_coll("BulkAccount")
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_write_in_bulk(self):
+        yield from Account.objects.ensure_index()
+        accounts = yield from Account.objects.bulk_insert([
+            Account(email="%d@example.com" % index, plan="free") for index in range(10)
+        ])
+
+        accounts[0].plan = "pro"
+        accounts[1].email = accounts[2].email
+
+        bulk = Account.objects.bulk
+        bulk.update(accounts[0]).update(accounts[1]).delete(accounts[3])
+        bulk.update(Q(email__in=["4@example.com", "5@example.com"]), {Account.logins: 2})
+        bulk.upsert(Account(email="new@example.com"))
+
+        result = yield from bulk.execute()
+
+        expect(len(bulk)).to_equal(0)
+        expect(result.matched_count).to_equal(3)
+        expect(result.deleted_count).to_equal(1)
+        expect(result.upserted_count).to_equal(1)
+        expect(result.errors).to_length(1)
+        expect(result.errors[0].index).to_equal(1)
+        expect(result.errors[0].code).to_equal(11000)
+
+        count = yield from Account.objects.count()
+        expect(count).to_equal(10)
+
+        pro = yield from Account.objects.get(plan="pro")
+        expect(pro._id).to_equal(accounts[0]._id)
+
+        upserted = yield from Account.objects.get(email="new@example.com")
+        expect(upserted._id).to_equal(result.upserted[0]._id)
+
+    @async_test
+    @asyncio.coroutine
+    def test_execute_without_operations(self):
+        result = yield from Account.objects.bulk.execute()
+
+        expect(result.matched_count).to_equal(0)
+        expect(result.results).to_be_empty()
@@ -0,0 +1,61 @@
+import asyncio
+from preggy import expect
+
+from motorengine.aiomotorengine import Document, StringField, IntField
+from tests.aiomotorengine import AsyncTestCase, async_test
+
+CASE_INSENSITIVE = {'locale': 'en', 'strength': 2}
+
+
+class Item(Document):
+    __collection__ = 'count_items'
+
+    name = StringField()
+    value = IntField(db_field="v")
+    email = StringField(db_field="e", collation=CASE_INSENSITIVE)
+
+
+class TestCount(AsyncTestCase):
+    def setUp(self):
+        super(TestCount, self).setUp()
+        self.drop_coll(Item.__collection__)
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_count_documents(self):
+        yield from Item.objects.bulk_insert([Item(name="item", value=index) for index in range(20)])
+
+        count = yield from Item.objects.count()
+        expect(count).to_equal(20)
+
+        count = yield from Item.objects.filter(value__gte=5).skip(12).limit(5).count(with_limit_and_skip=True)
+        expect(count).to_equal(3)
+
+        count = yield from Item.objects.count(approximate=10)
+        expect(count).to_equal(10)
+
+        count = yield from Item.objects.filter(value=100).count()
+        expect(count).to_equal(0)
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_count_documents_with_field_collation(self):
+        yield from Item.objects.bulk_insert([
+            Item(name="item", email="Heynemann@gmail.com"),
+            Item(name="item", email="heynemann@gmail.com"),
+            Item(name="item", email="other@gmail.com"),
+        ])
+
+        count = yield from Item.objects.filter(email__iexact="HEYNEMANN@gmail.com").count()
+        expect(count).to_equal(2)
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_estimate_count(self):
+        yield from Item.objects.bulk_insert([Item(name="item", value=index) for index in range(20)])
+
+        count = yield from Item.objects.estimated_count()
+        expect(count).to_equal(20)
+
+        count = yield from Item.objects.filter(value__lt=5).estimated_count()
+        expect(count).to_equal(5)
@@ -4,6 +4,7 @@ from uuid import uuid4
 from datetime import datetime
 
 from preggy import expect
+from bson.objectid import ObjectId
 
 from motorengine.aiomotorengine import (
     Document, StringField, BooleanField, ListField,
@@ -1303,6 +1304,35 @@ class TestDocument(AsyncTestCase):
         expect(base.list_val).to_length(3)
         expect(base.list_val[0]).to_be_instance_of(Ref)
 
+    @async_test
+    @asyncio.coroutine
+    def test_list_field_with_reference_field_keeps_order(self):
+        class Ref(Document):
+            __collection__ = 'ref'
+            val = StringField()
+
+        class Base(Document):
+            __collection__ = 'base'
+            list_val = ListField(ReferenceField(reference_document_type=Ref))
+
+        yield from Ref.objects.delete()
+        yield from Base.objects.delete()
+
+        refs = []
+        for i in range(5):
+            ref = yield from Ref.objects.create(val="v%d" % i)
+            refs.append(ref)
+
+        missing_id = ObjectId()
+        base = yield from Base.objects.create(list_val=list(reversed(refs)) + [missing_id])
+
+        base = yield from Base.objects.get(base._id)
+        yield from base.load_references()
+
+        expect(base.list_val).to_length(6)
+        expect([ref.val for ref in base.list_val[:5]]).to_be_like(["v4", "v3", "v2", "v1", "v0"])
+        expect(base.list_val[5]).to_be_null()
+
     @async_test
     @asyncio.coroutine
     def test_list_field_with_reference_field_without_lazy(self):
@@ -1329,3 +1359,65 @@ class TestDocument(AsyncTestCase):
 
         expect(base.list_val).to_length(3)
         expect(base.list_val[0]).to_be_instance_of(Ref)
+
+    @async_test
+    @asyncio.coroutine
+    def test_saving_a_loaded_document_only_updates_changed_fields(self):
+        class ChangedEmbedded(Document):
+            name = StringField()
+            views = IntField()
+
+        class ChangedDocument(Document):
+            title = StringField()
+            views = IntField(default=0)
+            embedded = EmbeddedDocumentField(ChangedEmbedded)
+
+        yield from ChangedDocument.objects.delete()
+
+        doc = yield from ChangedDocument.objects.create(
+            title="title", embedded=ChangedEmbedded(name="name", views=0)
+        )
+
+        # changed by someone else after we saved it
+        yield from ChangedDocument.objects.filter(title="title").update({
+            "title": "other title",
+            "embedded.name": "other name",
+        })
+
+        doc.views = 10
+        doc.embedded.views = 20
+        yield from doc.save()
+
+        loaded = yield from ChangedDocument.objects.get(doc._id)
+
+        expect(loaded.title).to_equal("other title")
+        expect(loaded.views).to_equal(10)
+        expect(loaded.embedded.name).to_equal("other name")
+        expect(loaded.embedded.views).to_equal(20)
+
+    @async_test
+    def test_can_find_all_with_lazy_decode(self):
+        class LazyEmbedded(Document):
+            name = StringField()
+
+        class LazyDocument(Document):
+            title = StringField()
+            created = DateTimeField(auto_now_on_insert=True)
+            items = ListField(EmbeddedDocumentField(LazyEmbedded))
+
+        yield from LazyDocument.objects.delete()
+        yield from LazyDocument.objects.create(title="title", items=[LazyEmbedded(name="name")])
+
+        docs = yield from LazyDocument.objects.lazy_decode().find_all()
+
+        expect(docs).to_length(1)
+        expect(docs[0]._is_raw_value("items")).to_be_true()
+        expect(docs[0].items[0].name).to_equal("name")
+
+        docs[0].title = "other"
+        yield from docs[0].save()
+
+        loaded = yield from LazyDocument.objects.get(docs[0]._id)
+        expect(loaded.title).to_equal("other")
+        expect(loaded.created).to_be_instance_of(datetime)
+        expect(loaded.items[0].name).to_equal("name")
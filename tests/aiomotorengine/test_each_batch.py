@@ -0,0 +1,65 @@
+import asyncio
+
+from preggy import expect
+
+from motorengine.aiomotorengine import Document, IntField
+from tests.aiomotorengine import AsyncTestCase, async_test
+
+
+class Post(Document):
+    __collection__ = 'each_batch_posts'
+
+    index = IntField()
+
+
+class TestEachBatch(AsyncTestCase):
+    def setUp(self):
+        super(TestEachBatch, self).setUp()
+        self.drop_coll(Post.__collection__)
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_handle_all_documents_in_batches(self):
+        yield from Post.objects.bulk_insert([Post(index=index) for index in range(25)])
+        batches = []
+
+        @asyncio.coroutine
+        def handle_batch(posts):
+            batches.append([post.index for post in posts])
+            yield from asyncio.sleep(0.01)
+
+        count = yield from Post.objects.order_by(Post.index).each_batch(10, handle_batch)
+
+        expect(count).to_equal(25)
+        expect(batches).to_length(3)
+        expect([index for batch in batches for index in batch]).to_equal(list(range(25)))
+
+    @async_test
+    @asyncio.coroutine
+    def test_handler_can_stop_iteration(self):
+        yield from Post.objects.bulk_insert([Post(index=index) for index in range(25)])
+
+        count = yield from Post.objects.each_batch(10, lambda posts: False)
+
+        expect(count).to_equal(10)
+
+    @async_test
+    @asyncio.coroutine
+    def test_handler_errors_are_raised(self):
+        yield from Post.objects.bulk_insert([Post(index=index) for index in range(25)])
+        batches = []
+
+        @asyncio.coroutine
+        def handle_batch(posts):
+            batches.append(posts)
+            yield from asyncio.sleep(0.01)
+            raise ValueError("handler failed")
+
+        try:
+            yield from Post.objects.each_batch(10, handle_batch)
+        except ValueError as err:
+            expect(str(err)).to_equal("handler failed")
+        else:
+            assert False, "Should not have gotten this far"
+
+        expect(batches).to_length(1)
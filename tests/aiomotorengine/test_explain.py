@@ -0,0 +1,59 @@
+import asyncio
+from preggy import expect
+
+from motorengine.aiomotorengine import Document, StringField, IntField
+from motorengine.errors import QueryPlanError
+from motorengine.explain import enable_strict_mode, disable_strict_mode
+from tests.aiomotorengine import AsyncTestCase, async_test
+
+
+class Visit(Document):
+    __collection__ = 'explain_visits'
+
+    url = StringField(unique=True)
+    hits = IntField()
+
+
+class TestExplain(AsyncTestCase):
+    def setUp(self):
+        super(TestExplain, self).setUp()
+        self.drop_coll(Visit.__collection__)
+
+    def tearDown(self):
+        disable_strict_mode()
+        super(TestExplain, self).tearDown()
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_explain_queries(self):
+        yield from Visit.ensure_index()
+        yield from Visit.objects.bulk_insert([Visit(url="url %d" % index, hits=index) for index in range(10)])
+
+        plan = yield from Visit.objects.filter(url="url 1").explain()
+        expect(plan.index_name).to_equal('url_1')
+        expect(plan.is_collection_scan).to_be_false()
+
+        plan = yield from Visit.objects.filter(hits=1).explain()
+        expect(plan.is_collection_scan).to_be_true()
+        expect(plan.docs_examined).to_equal(10)
+
+    @async_test
+    @asyncio.coroutine
+    def test_strict_mode_raises_for_collection_scans(self):
+        yield from Visit.ensure_index()
+        yield from Visit.objects.bulk_insert([Visit(url="url %d" % index, hits=index) for index in range(10)])
+        enable_strict_mode(raise_error=True)
+
+        visits = yield from Visit.objects.filter(url="url 1").find_all()
+        expect(visits).to_length(1)
+
+        try:
+            yield from Visit.objects.filter(hits=1).find_all()
+        except QueryPlanError as err:
+            expect(err.plan.is_collection_scan).to_be_true()
+        else:
+            assert False, "Should have raised QueryPlanError"
+
+        # each query shape is only explained once
+        visits = yield from Visit.objects.filter(hits=2).find_all()
+        expect(visits).to_length(1)
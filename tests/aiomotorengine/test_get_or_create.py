@@ -0,0 +1,53 @@
+import asyncio
+
+from bson.objectid import ObjectId
+from preggy import expect
+
+from motorengine.aiomotorengine import Document, StringField, IntField
+from tests.aiomotorengine import AsyncTestCase, async_test
+
+
+class Subscriber(Document):
+    __collection__ = "GetOrCreateSubscriber"
+
+    email = StringField(db_field="e", unique=True)
+    name = StringField(required=True)
+    visits = IntField(default=0)
+
+
+class TestGetOrCreate(AsyncTestCase):
+    def setUp(self):
+        super(TestGetOrCreate, self).setUp()
+        self.drop_coll("GetOrCreateSubscriber")
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_get_or_create(self):
+        subscriber, created = yield from Subscriber.objects.get_or_create(
+            email="a@a.com", defaults={"name": "Bernardo"}
+        )
+
+        expect(created).to_be_true()
+        expect(subscriber.email).to_equal("a@a.com")
+        expect(subscriber.name).to_equal("Bernardo")
+
+        other, created = yield from Subscriber.objects.get_or_create(email="a@a.com", defaults={"name": "Other"})
+
+        expect(created).to_be_false()
+        expect(other._id).to_equal(subscriber._id)
+        expect(other.name).to_equal("Bernardo")
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_upsert(self):
+        subscriber_id = ObjectId()
+
+        subscriber = yield from Subscriber(_id=subscriber_id, email="a@a.com", name="Bernardo").save(upsert=True)
+        expect(subscriber._id).to_equal(subscriber_id)
+
+        other = yield from Subscriber(email="a@a.com", name="Other").save(upsert=True)
+        expect(other._id).to_equal(subscriber_id)
+
+        subscribers = yield from Subscriber.objects.find_all()
+        expect(subscribers).to_length(1)
+        expect(subscribers[0].name).to_equal("Other")
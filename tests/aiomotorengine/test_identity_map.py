@@ -0,0 +1,64 @@
+import asyncio
+from unittest import skipIf
+from preggy import expect
+
+from motorengine.aiomotorengine import Document, StringField, ReferenceField, ListField, IdentityMap
+from motorengine.identity_map import contextvars
+from tests.aiomotorengine import AsyncTestCase, async_test
+
+
+class Account(Document):
+    __collection__ = 'identity_map_accounts'
+
+    name = StringField()
+
+
+class Member(Document):
+    __collection__ = 'identity_map_members'
+
+    name = StringField()
+    account = ReferenceField(reference_document_type=Account)
+    accounts = ListField(ReferenceField(reference_document_type=Account))
+
+
+@skipIf(contextvars is None, "IdentityMap requires contextvars")
+class TestIdentityMapQueries(AsyncTestCase):
+    def setUp(self):
+        super(TestIdentityMapQueries, self).setUp()
+        self.drop_coll(Account.__collection__)
+        self.drop_coll(Member.__collection__)
+
+    @async_test
+    @asyncio.coroutine
+    def test_get_find_all_and_references_return_the_same_instance(self):
+        account = yield from Account.objects.create(name="account")
+        yield from Member.objects.create(name="member", account=account)
+
+        with IdentityMap():
+            loaded = yield from Account.objects.get(account._id)
+            accounts = yield from Account.objects.find_all()
+            expect(accounts[0]).to_equal(loaded)
+
+            member = yield from Member.objects.get(name="member")
+            yield from member.load_references()
+            expect(member.account).to_equal(loaded)
+
+    @async_test
+    @asyncio.coroutine
+    def test_save_and_delete_update_identity_map(self):
+        with IdentityMap() as identity_map:
+            account = yield from Account.objects.create(name="account")
+            expect(identity_map.get(Account, account._id)).to_equal(account)
+
+            yield from account.delete()
+            expect(identity_map.get(Account, account._id)).to_be_null()
+
+            loaded = yield from Account.objects.get(account._id)
+            expect(loaded).to_be_null()
+
+            account = yield from Account.objects.create(name="account")
+            yield from Account.objects.filter(name="account").update({"name": "other"})
+            expect(identity_map).to_length(0)
+
+            loaded = yield from Account.objects.get(account._id)
+            expect(loaded.name).to_equal("other")
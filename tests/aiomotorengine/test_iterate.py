@@ -0,0 +1,91 @@
+import asyncio
+from preggy import expect
+
+from motorengine.aiomotorengine import Document, StringField, IntField, ReferenceField
+from tests.aiomotorengine import AsyncTestCase, async_test
+
+
+class Author(Document):
+    __collection__ = 'iterate_authors'
+
+    name = StringField()
+
+
+class Post(Document):
+    __collection__ = 'iterate_posts'
+    __lazy__ = False
+
+    index = IntField()
+    author = ReferenceField(reference_document_type=Author)
+
+
+@asyncio.coroutine
+def consume(iterator, limit=None):
+    result = []
+
+    while limit is None or len(result) < limit:
+        try:
+            document = yield from iterator.__anext__()
+        except StopAsyncIteration:
+            break
+
+        result.append(document)
+
+    return result
+
+
+class TestIterate(AsyncTestCase):
+    def setUp(self):
+        super(TestIterate, self).setUp()
+        self.drop_coll(Author.__collection__)
+        self.drop_coll(Post.__collection__)
+
+    @asyncio.coroutine
+    def create_posts(self, count):
+        author = yield from Author.objects.create(name="author")
+        yield from Post.objects.bulk_insert([Post(index=index, author=author) for index in range(count)])
+        return author
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_iterate_over_all_documents(self):
+        author = yield from self.create_posts(1050)
+
+        iterator = Post.objects.order_by(Post.index).iterate(batch_size=100)
+        posts = yield from consume(iterator)
+
+        expect(posts).to_length(1050)
+        expect([post.index for post in posts]).to_equal(list(range(1050)))
+        expect(posts[-1].author._id).to_equal(author._id)
+        expect(posts[-1].author.name).to_equal("author")
+        expect(iterator.closed).to_be_true()
+
+    @async_test
+    @asyncio.coroutine
+    def test_iterate_keeps_one_batch_in_memory(self):
+        yield from self.create_posts(30)
+
+        iterator = Post.objects.filter(index__lt=25).iterate(batch_size=10)
+
+        yield from consume(iterator, limit=1)
+        expect(iterator.batch).to_length(9)
+
+        posts = yield from consume(iterator)
+        expect(posts).to_length(24)
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_close_iterator_early(self):
+        yield from self.create_posts(50)
+
+        with_block = Post.objects.iterate(batch_size=10)
+        iterator = yield from with_block.__aenter__()
+        posts = yield from consume(iterator, limit=5)
+        yield from with_block.__aexit__(None, None, None)
+
+        expect(posts).to_length(5)
+        expect(iterator.closed).to_be_true()
+        expect(iterator.batch).to_length(0)
+
+        posts = yield from consume(iterator)
+        expect(posts).to_length(0)
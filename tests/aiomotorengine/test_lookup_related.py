@@ -0,0 +1,59 @@
+import asyncio
+from preggy import expect
+
+from motorengine.aiomotorengine import (
+    Document, StringField, IntField, ListField, ReferenceField, DESCENDING
+)
+from tests.aiomotorengine import AsyncTestCase, async_test
+
+
+class Author(Document):
+    __collection__ = 'lookup_related_authors'
+
+    name = StringField(required=True)
+
+
+class Post(Document):
+    __collection__ = 'lookup_related_posts'
+
+    title = StringField(required=True)
+    views = IntField(db_field="v")
+    author = ReferenceField(reference_document_type=Author, db_field="a")
+    editors = ListField(ReferenceField(reference_document_type=Author))
+
+
+class TestLookupRelated(AsyncTestCase):
+    def setUp(self):
+        super(TestLookupRelated, self).setUp()
+        self.drop_coll(Author.__collection__)
+        self.drop_coll(Post.__collection__)
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_lookup_related_on_find_all(self):
+        author = yield from Author.objects.create(name="Bernardo")
+        editor = yield from Author.objects.create(name="Rafael")
+
+        for i in range(3):
+            yield from Post.objects.create(title="post %d" % i, views=i, author=author, editors=[editor, author])
+
+        posts = yield from Post.objects.lookup_related("author", "editors") \
+            .order_by("views", DESCENDING).limit(2).find_all()
+
+        expect(posts).to_length(2)
+        expect(posts[0].title).to_equal("post 2")
+        expect(posts[1].title).to_equal("post 1")
+
+        for post in posts:
+            expect(post.author.name).to_equal("Bernardo")
+            expect([editor.name for editor in post.editors]).to_be_like(["Rafael", "Bernardo"])
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_lookup_related_on_get(self):
+        author = yield from Author.objects.create(name="Bernardo")
+        post = yield from Post.objects.create(title="post", author=author)
+
+        post = yield from Post.objects.lookup_related("author").get(post._id)
+
+        expect(post.author.name).to_equal("Bernardo")
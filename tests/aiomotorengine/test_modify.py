@@ -0,0 +1,58 @@
+import asyncio
+
+from preggy import expect
+
+from motorengine.aiomotorengine import Document, StringField, IntField, DESCENDING
+from tests.aiomotorengine import AsyncTestCase, async_test
+
+
+class Job(Document):
+    __collection__ = "ModifyJob"
+
+    name = StringField()
+    status = StringField(db_field="s", default="pending")
+    priority = IntField(default=0)
+    attempts = IntField(default=0)
+
+
+class TestModify(AsyncTestCase):
+    def setUp(self):
+        super(TestModify, self).setUp()
+        self.drop_coll("ModifyJob")
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_modify_the_first_document(self):
+        yield from Job.objects.create(name="low", priority=1)
+        yield from Job.objects.create(name="high", priority=5)
+
+        job = yield from Job.objects.filter(status="pending").modify(
+            set__status="running", inc__attempts=1, sort=[(Job.priority, DESCENDING)]
+        )
+        expect(job.name).to_equal("high")
+        expect(job.status).to_equal("running")
+        expect(job.attempts).to_equal(1)
+
+        job = yield from Job.objects.filter(status="pending").modify({Job.status: "running"}, new=False)
+        expect(job.name).to_equal("low")
+        expect(job.status).to_equal("pending")
+
+        job = yield from Job.objects.filter(status="pending").modify(set__status="running")
+        expect(job).to_be_null()
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_reload_document(self):
+        job = yield from Job.objects.create(name="job")
+        yield from Job.objects.filter(name="job").update(set__status="done")
+
+        job.name = "changed"
+        reloaded = yield from job.reload()
+
+        expect(reloaded).to_equal(job)
+        expect(job.name).to_equal("job")
+        expect(job.status).to_equal("done")
+
+        yield from job.delete()
+        reloaded = yield from job.reload()
+        expect(reloaded).to_be_null()
@@ -0,0 +1,52 @@
+import asyncio
+from preggy import expect
+
+from motorengine.aiomotorengine import Document, StringField, IntField
+from motorengine import DESCENDING
+from tests.aiomotorengine import AsyncTestCase, async_test
+
+
+class Entry(Document):
+    __collection__ = 'paginate_after_entries'
+
+    score = IntField()
+    title = StringField()
+
+
+class TestPaginateAfter(AsyncTestCase):
+    def setUp(self):
+        super(TestPaginateAfter, self).setUp()
+        self.drop_coll(Entry.__collection__)
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_paginate_with_compound_sort(self):
+        yield from Entry.objects.bulk_insert([
+            Entry(score=index % 3, title="entry %02d" % index) for index in range(10)
+        ])
+
+        queryset = Entry.objects.order_by(Entry.score, direction=DESCENDING).order_by(Entry.title)
+        expected = yield from queryset.find_all()
+
+        titles = []
+        page = yield from queryset.paginate_after(None, 4)
+        titles.extend([entry.title for entry in page.items])
+
+        while page.next is not None:
+            page = yield from queryset.paginate_after(page.next, 4)
+            titles.extend([entry.title for entry in page.items])
+
+        expect(titles).to_equal([entry.title for entry in expected])
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_paginate_after_document(self):
+        yield from Entry.objects.bulk_insert([Entry(score=index, title="entry") for index in range(5)])
+
+        queryset = Entry.objects.filter(score__gte=1).order_by(Entry.score)
+        page = yield from queryset.paginate_after(None, 2)
+        expect([entry.score for entry in page.items]).to_equal([1, 2])
+
+        page = yield from queryset.paginate_after(page.items[-1], 5)
+        expect([entry.score for entry in page.items]).to_equal([3, 4])
+        expect(page.next).to_be_null()
@@ -0,0 +1,39 @@
+import asyncio
+from preggy import expect
+
+from motorengine.aiomotorengine import Document, StringField, IntField, Q, Param
+from tests.aiomotorengine import AsyncTestCase, async_test
+
+
+class Member(Document):
+    __collection__ = 'prepared_query_members'
+
+    name = StringField(db_field="n")
+    age = IntField()
+
+
+class TestPreparedQuery(AsyncTestCase):
+    def setUp(self):
+        super(TestPreparedQuery, self).setUp()
+        self.drop_coll(Member.__collection__)
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_run_prepared_queries(self):
+        yield from Member.objects.bulk_insert([
+            Member(name="member %d" % (index % 2), age=index) for index in range(10)
+        ])
+
+        prepared = Member.objects.order_by('age').prepare(Q(name=Param('name'), age__gt=Param('min_age')))
+
+        members = yield from prepared.find_all(name="member 0", min_age=3)
+        expect([member.age for member in members]).to_equal([4, 6, 8])
+
+        members = yield from prepared.find_all(name="member 1", min_age=6)
+        expect([member.age for member in members]).to_equal([7, 9])
+
+        count = yield from prepared.count(name="member 1", min_age=0)
+        expect(count).to_equal(5)
+
+        member = yield from prepared.get(name="member 1", min_age=8)
+        expect(member.age).to_equal(9)
@@ -0,0 +1,70 @@
+import asyncio
+from preggy import expect
+
+from motorengine.aiomotorengine import (
+    Document, StringField, ListField, EmbeddedDocumentField, ReferenceField
+)
+from tests.aiomotorengine import AsyncTestCase, async_test
+
+
+class Author(Document):
+    __collection__ = 'select_related_authors'
+
+    name = StringField(required=True)
+
+
+class Comment(Document):
+    text = StringField(required=True)
+    user = ReferenceField(reference_document_type=Author)
+
+
+class Post(Document):
+    __collection__ = 'select_related_posts'
+
+    title = StringField(required=True)
+    author = ReferenceField(reference_document_type=Author)
+    editors = ListField(ReferenceField(reference_document_type=Author))
+    comments = ListField(EmbeddedDocumentField(embedded_document_type=Comment))
+
+
+class TestSelectRelated(AsyncTestCase):
+    def setUp(self):
+        super(TestSelectRelated, self).setUp()
+        self.drop_coll(Author.__collection__)
+        self.drop_coll(Post.__collection__)
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_select_related_on_find_all(self):
+        author = yield from Author.objects.create(name="Bernardo")
+        editor = yield from Author.objects.create(name="Rafael")
+
+        for i in range(3):
+            yield from Post.objects.create(
+                title="post %d" % i, author=author, editors=[editor, author],
+                comments=[Comment(text="comment", user=editor)]
+            )
+
+        posts = yield from Post.objects.select_related(
+            "author", "editors", "comments.user"
+        ).order_by("title").find_all()
+
+        expect(posts).to_length(3)
+
+        for post in posts:
+            expect(post.author.name).to_equal("Bernardo")
+            expect([editor.name for editor in post.editors]).to_be_like(["Rafael", "Bernardo"])
+            expect(post.comments[0].user.name).to_equal("Rafael")
+
+        # referenced documents are only loaded once
+        expect(posts[0].author).to_equal(posts[1].author)
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_select_related_on_get(self):
+        author = yield from Author.objects.create(name="Bernardo")
+        post = yield from Post.objects.create(title="post", author=author)
+
+        post = yield from Post.objects.select_related("author").get(post._id)
+
+        expect(post.author.name).to_equal("Bernardo")
@@ -0,0 +1,36 @@
+import asyncio
+
+from preggy import expect
+
+from motorengine.aiomotorengine import Document, StringField, IntField, ListField
+from tests.aiomotorengine import AsyncTestCase, async_test
+
+
+class Article(Document):
+    __collection__ = "UpdateOperatorsArticle"
+
+    title = StringField()
+    views = IntField(db_field="v", default=0)
+    tags = ListField(StringField())
+
+
+class TestUpdateOperators(AsyncTestCase):
+    def setUp(self):
+        super(TestUpdateOperators, self).setUp()
+        self.drop_coll("UpdateOperatorsArticle")
+
+    @async_test
+    @asyncio.coroutine
+    def test_can_update_with_operators(self):
+        yield from Article.objects.create(title="first", tags=["a"])
+        yield from Article.objects.create(title="second", tags=["a"])
+
+        result = yield from Article.objects.filter(title="first").update(inc__views=2, push__tags="b")
+        expect(result.count).to_equal(1)
+
+        yield from Article.objects.update({Article.title: "same"}, inc__views=1, pull__tags="a")
+
+        articles = yield from Article.objects.order_by("views").find_all()
+        expect([article.views for article in articles]).to_equal([1, 3])
+        expect([article.tags for article in articles]).to_equal([[], ["b"]])
+        expect(set(article.title for article in articles)).to_equal(set(["same"]))
@@ -5,7 +5,7 @@
 from preggy import expect
 
 from motorengine import StringField
-from motorengine.query.base import QueryOperator
+from motorengine.query.base import QueryOperator, escape_regex
 from tests import AsyncTestCase
 
 
@@ -14,3 +14,9 @@ class TestBaseQueryOperator(AsyncTestCase):
         query = QueryOperator()
         expect(query).not_to_be_null()
         expect(query.get_value(StringField(), "some value")).to_equal("some value")
+
+    def test_escape_regex(self):
+        expect(escape_regex("Bernardo")).to_equal("Bernardo")
+        expect(escape_regex("a.b*c+(d)[e]{f}^$|?\\")).to_equal("a\\.b\\*c\\+\\(d\\)\\[e\\]\\{f\\}\\^\\$\\|\\?\\\\")
+        expect(escape_regex("joão silva")).to_equal("joão silva")
+        expect(escape_regex(10)).to_equal("10")
@@ -4,7 +4,7 @@
 
 from preggy import expect
 
-from motorengine.query.i_exact import IExactOperator
+from motorengine.query.i_exact import IExactOperator, CollationIExactOperator
 from tests import AsyncTestCase
 
 
@@ -18,3 +18,20 @@ class TestIExactOperator(AsyncTestCase):
                 "$options": 'i'
             }
         })
+
+    def test_to_query_escapes_value(self):
+        query = IExactOperator()
+        expect(query.to_query("field_name", "1+1")).to_be_like({
+            "field_name": {
+                "$regex": "^1\\+1$",
+                "$options": 'i'
+            }
+        })
+
+
+class TestCollationIExactOperator(AsyncTestCase):
+    def test_to_query(self):
+        query = CollationIExactOperator()
+        expect(query.to_query("field_name", "bErNaRdO")).to_be_like({
+            "field_name": "bErNaRdO"
+        })
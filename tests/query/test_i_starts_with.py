@@ -4,7 +4,7 @@
 
 from preggy import expect
 
-from motorengine.query.i_starts_with import IStartsWithOperator
+from motorengine.query.i_starts_with import IStartsWithOperator, CollationIStartsWithOperator
 from tests import AsyncTestCase
 
 
@@ -18,3 +18,23 @@ class TestIStartsWithOperator(AsyncTestCase):
                 "$options": 'i'
             }
         })
+
+    def test_to_query_escapes_value(self):
+        query = IStartsWithOperator()
+        expect(query.to_query("field_name", "b.r")).to_be_like({
+            "field_name": {
+                "$regex": "^b\\.r",
+                "$options": 'i'
+            }
+        })
+
+
+class TestCollationIStartsWithOperator(AsyncTestCase):
+    def test_to_query(self):
+        query = CollationIStartsWithOperator()
+        expect(query.to_query("field_name", "bEr")).to_be_like({
+            "field_name": {
+                "$gte": "bEr",
+                "$lt": u"bEr\uffff"
+            }
+        })
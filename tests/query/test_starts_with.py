@@ -17,3 +17,11 @@ class TestStartsWithOperator(AsyncTestCase):
                 "$regex": "^Ber"
             }
         })
+
+    def test_to_query_escapes_value(self):
+        query = StartsWithOperator()
+        expect(query.to_query("field_name", "a.b(c")).to_be_like({
+            "field_name": {
+                "$regex": "^a\\.b\\(c"
+            }
+        })
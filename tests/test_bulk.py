@@ -3,12 +3,16 @@
 
 import sys
 
+from bson.codec_options import CodecOptions
 from preggy import expect
+from pymongo.errors import BulkWriteError
 from tornado.testing import gen_test
 
 from motorengine import (
     Document, StringField
 )
+from motorengine.bulk import BulkInsert
+from motorengine.errors import BulkInsertError
 from tests import AsyncTestCase
 
 
@@ -17,10 +21,16 @@ class Comment(Document):
     text = StringField(required=True)
 
 
+class UniqueComment(Document):
+    __collection__ = "UniqueCommentBulk"
+    text = StringField(required=True, unique=True)
+
+
 class TestBulkInsert(AsyncTestCase):
     def setUp(self):
         super(TestBulkInsert, self).setUp()
         self.drop_coll("CommentBulk")
+        self.drop_coll("UniqueCommentBulk")
 
     @gen_test
     def test_can_insert_in_bulk(self):
@@ -74,3 +84,126 @@ class TestBulkInsert(AsyncTestCase):
             )
         else:
             assert False, "Should not have gotten this far"
+
+    @gen_test
+    def test_can_insert_generator_in_chunks(self):
+        comments = (Comment(text=str(number)) for number in range(25))
+
+        inserted = yield Comment.objects.bulk_insert(comments, chunk_size=10)
+
+        expect(inserted).to_length(25)
+        expect([comment.text for comment in inserted]).to_equal([str(number) for number in range(25)])
+
+        count = yield Comment.objects.count()
+        expect(count).to_equal(25)
+
+        first = yield Comment.objects.get(inserted[0]._id)
+        expect(first.text).to_equal("0")
+
+    @gen_test
+    def test_unordered_insert_reports_errors_per_document(self):
+        yield UniqueComment.objects.ensure_index()
+
+        comments = [
+            UniqueComment(text="a"), UniqueComment(text=None), UniqueComment(text="a"), UniqueComment(text="b")
+        ]
+
+        try:
+            yield UniqueComment.objects.bulk_insert(comments, ordered=False, chunk_size=2, concurrency=2)
+        except BulkInsertError:
+            err = sys.exc_info()[1]
+            expect(err).to_have_an_error_message_of("2 of the 4 documents you are saving could not be inserted.")
+            expect([error.index for error in err.errors]).to_equal([1, 2])
+            expect(err.errors[1].code).to_equal(11000)
+            expect(err.documents).to_equal(comments)
+        else:
+            assert False, "Should not have gotten this far"
+
+        expect(comments[0]._id).not_to_be_null()
+        expect(comments[2]._id).to_be_null()
+        expect(comments[3]._id).not_to_be_null()
+
+        count = yield UniqueComment.objects.count()
+        expect(count).to_equal(2)
+
+
+class TestBulkInsertChunks(AsyncTestCase):
+    def get_chunks(self, bulk_insert, documents):
+        return list(bulk_insert.get_chunks(documents, CodecOptions()))
+
+    def test_chunks_by_count(self):
+        chunks = self.get_chunks(
+            BulkInsert(Comment.objects, chunk_size=2), (Comment(text=str(number)) for number in range(5))
+        )
+
+        expect([chunk.indexes for chunk in chunks]).to_equal([[0, 1], [2, 3], [4]])
+        expect(chunks[0].sons[0]['text']).to_equal("0")
+        expect(chunks[0].sons[0]['_id']).to_equal(chunks[0].ids[0])
+
+    def test_chunks_by_size(self):
+        documents = [Comment(text="x" * 100) for number in range(5)]
+        size = len(self.get_chunks(BulkInsert(Comment.objects), documents[:1])[0].sons[0].raw)
+
+        chunks = self.get_chunks(BulkInsert(Comment.objects, max_chunk_bytes=size * 2), documents)
+
+        expect([chunk.indexes for chunk in chunks]).to_equal([[0, 1], [2, 3], [4]])
+
+    def test_unordered_chunks_skip_invalid_documents(self):
+        bulk_insert = BulkInsert(Comment.objects, ordered=False)
+        chunks = self.get_chunks(bulk_insert, [Comment(text="a"), Comment(), Comment(text="b")])
+
+        expect([chunk.indexes for chunk in chunks]).to_equal([[0, 2]])
+        expect(bulk_insert.errors[1].message).to_equal(
+            "Validation for document 1 in the documents you are saving failed with: Field 'text' is required."
+        )
+
+    def test_ordered_chunks_stop_at_invalid_document(self):
+        bulk_insert = BulkInsert(Comment.objects, chunk_size=2)
+        documents = iter([Comment(text="a"), Comment(text="b"), Comment(text="c"), Comment(), Comment(text="e")])
+
+        chunks = self.get_chunks(bulk_insert, documents)
+
+        expect([chunk.indexes for chunk in chunks]).to_equal([[0, 1], [2]])
+        expect(bulk_insert.validation_error).to_have_an_error_message_of(
+            "Validation for document 3 in the documents you are saving failed with: Field 'text' is required."
+        )
+        # the documents after the invalid one are not read
+        expect(next(documents).text).to_equal("e")
+
+    def test_ordered_insert_with_invalid_document_in_second_chunk(self):
+        class Collection(object):
+            inserted = []
+
+            def insert_many(self, sons, ordered, callback):
+                self.inserted.append([son['text'] for son in sons])
+                callback(None, None)
+
+        bulk_insert = BulkInsert(Comment.objects, chunk_size=2)
+        documents = [Comment(text="a"), Comment(text="b"), Comment(text="c"), Comment(), Comment(text="e")]
+        chunks = bulk_insert.get_chunks(documents, CodecOptions())
+
+        try:
+            bulk_insert.send_chunks(Collection(), chunks, self.stop)
+        except ValueError:
+            err = sys.exc_info()[1]
+            expect(err).to_have_an_error_message_of(
+                "Validation for document 3 in the documents you are saving failed with: Field 'text' is required."
+            )
+        else:
+            assert False, "Should not have gotten this far"
+
+        expect(Collection.inserted).to_equal([["a", "b"], ["c"]])
+        expect([document._id is not None for document in documents]).to_equal([True, True, True, False, False])
+
+    def test_ordered_insert_stops_at_first_error(self):
+        bulk_insert = BulkInsert(Comment.objects)
+        chunk = self.get_chunks(bulk_insert, [Comment(text=str(number)) for number in range(3)])[0]
+
+        error = BulkWriteError({'writeErrors': [{'index': 1, 'code': 11000, 'errmsg': 'dup'}], 'nInserted': 1})
+        expect(bulk_insert.add_chunk_result(chunk, error)).to_be_false()
+
+        documents = bulk_insert.documents
+        expect(documents[0]._id).to_equal(chunk.ids[0])
+        expect(documents[1]._id).to_be_null()
+        expect(documents[2]._id).to_be_null()
+        expect(bulk_insert.errors[1].code).to_equal(11000)
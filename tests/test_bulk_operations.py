@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+
+from bson.objectid import ObjectId
+from preggy import expect
+from pymongo import UpdateOne, UpdateMany, ReplaceOne, DeleteOne, DeleteMany
+from tornado.testing import gen_test
+
+from motorengine import Document, StringField, IntField, Q
+from motorengine.bulk import BulkResult
+from tests import AsyncTestCase
+
+
+class Account(Document):
+    __collection__ = "BulkAccount"
+
+    email = StringField(required=True, unique=True)
+    plan = StringField(db_field="p")
+    logins = IntField(default=0)
+
+
+class TestBulkOperationsBuilder(AsyncTestCase):
+    def get_loaded_account(self, **kw):
+        account = Account.from_son(dict(_id=ObjectId(), email="a@example.com", p="free", logins=0, **kw))
+        return account
+
+    def test_update_by_filter(self):
+        bulk = Account.objects.bulk.update(Q(plan="free"), {Account.plan: "pro"})
+
+        expect(bulk).to_length(1)
+        request = bulk.operations[0].request
+        expect(request).to_be_instance_of(UpdateMany)
+        expect(request._filter).to_equal({"p": "free"})
+        expect(request._doc).to_equal({"$set": {"p": "pro"}})
+
+    def test_upsert_by_filter(self):
+        request = Account.objects.bulk.upsert(Q(email="a@example.com"), {"p": "pro"}).operations[0].request
+
+        expect(request).to_be_instance_of(UpdateOne)
+        expect(request._upsert).to_be_true()
+
+    def test_update_changed_document(self):
+        account = self.get_loaded_account()
+        account.plan = "pro"
+
+        request = Account.objects.bulk.update(account).operations[0].request
+
+        expect(request).to_be_instance_of(UpdateOne)
+        expect(request._filter).to_equal({"_id": account._id})
+        expect(request._doc).to_equal({"$set": {"p": "pro"}})
+
+    def test_unchanged_document_is_not_sent(self):
+        bulk = Account.objects.bulk.update(self.get_loaded_account())
+
+        expect(bulk).to_length(1)
+        expect(bulk.operations[0].request).to_be_null()
+        expect(bulk.get_chunks(bulk.operations)).to_equal([])
+
+    def test_replace_and_delete_documents(self):
+        account = self.get_loaded_account()
+        new_account = Account(email="b@example.com")
+
+        bulk = Account.objects.bulk.replace(account).upsert(new_account).delete(account).delete(Q(plan="free"))
+
+        requests = [operation.request for operation in bulk.operations]
+        expect(requests[0]).to_be_instance_of(ReplaceOne)
+        expect(requests[1]).to_be_instance_of(ReplaceOne)
+        expect(requests[1]._upsert).to_be_true()
+        expect(new_account._id).not_to_be_null()
+        expect(requests[2]).to_be_instance_of(DeleteOne)
+        expect(requests[3]).to_be_instance_of(DeleteMany)
+
+    def test_cant_update_unsaved_document(self):
+        try:
+            Account.objects.bulk.update(Account(email="a@example.com"))
+        except ValueError:
+            err = sys.exc_info()[1]
+            expect(str(err)).to_include("must be saved before it can be updated in bulk")
+        else:
+            assert False, "Should not have gotten this far"
+
+    def test_cant_update_invalid_document(self):
+        account = self.get_loaded_account()
+        account.email = None
+
+        try:
+            Account.objects.bulk.update(Q(plan="pro"), {"p": "free"}).update(account)
+        except ValueError:
+            err = sys.exc_info()[1]
+            expect(err).to_have_an_error_message_of(
+                "Validation for operation 1 in the bulk operations failed with: Field 'email' is required."
+            )
+        else:
+            assert False, "Should not have gotten this far"
+
+    def test_cant_use_other_filters(self):
+        try:
+            Account.objects.bulk.delete({"p": "free"})
+        except ValueError:
+            err = sys.exc_info()[1]
+            expect(err).to_have_an_error_message_of(
+                "Bulk operations receive either a document or a Q filter, not 'dict'."
+            )
+        else:
+            assert False, "Should not have gotten this far"
+
+    def test_chunks_by_count_and_size(self):
+        bulk = Account.objects.bulk
+        for index in range(5):
+            bulk.update(Q(logins=index), {"p": "pro"})
+
+        bulk.chunk_size = 2
+        expect(bulk.get_chunks(bulk.operations)).to_equal([[0, 1], [2, 3], [4]])
+
+        bulk.chunk_size = 100
+        bulk.max_chunk_bytes = bulk.operations[0].size * 3
+        expect(bulk.get_chunks(bulk.operations)).to_equal([[0, 1, 2], [3, 4]])
+
+    def test_result_of_chunks(self):
+        bulk = Account.objects.bulk
+        for index in range(4):
+            bulk.update(Q(logins=index), {"p": "pro"}, upsert=True)
+
+        result = BulkResult(bulk.operations)
+        result.add_chunk([0, 1], {'nMatched': 1, 'nModified': 1, 'upserted': [{'index': 1, '_id': 'new'}]})
+        result.add_chunk([2, 3], {
+            'nMatched': 1, 'nModified': 0, 'writeErrors': [{'index': 0, 'code': 11000, 'errmsg': 'dup'}]
+        })
+        result = result.to_result()
+
+        expect(result.matched_count).to_equal(2)
+        expect(result.modified_count).to_equal(1)
+        expect(result.upserted_count).to_equal(1)
+        expect(result.upserted).to_equal([{'index': 1, '_id': 'new'}])
+        expect(result.errors).to_length(1)
+        expect(result.errors[0].index).to_equal(2)
+        expect(result.errors[0].code).to_equal(11000)
+        expect(result.results[1].upserted_id).to_equal('new')
+        expect(result.results[2].error.message).to_equal('dup')
+        expect(result.results[3].error).to_be_null()
+
+
+class TestBulkOperations(AsyncTestCase):
+    def setUp(self):
+        super(TestBulkOperations, self).setUp()
+        self.drop_coll("BulkAccount")
+
+    @gen_test
+    def test_can_write_in_bulk(self):
+        yield Account.objects.ensure_index()
+        accounts = yield Account.objects.bulk_insert([
+            Account(email="%d@example.com" % index, plan="free") for index in range(10)
+        ])
+
+        accounts[0].plan = "pro"
+        accounts[1].email = accounts[2].email
+
+        bulk = Account.objects.bulk
+        bulk.update(accounts[0]).update(accounts[1]).delete(accounts[3])
+        bulk.update(Q(email__in=["4@example.com", "5@example.com"]), {Account.logins: 2})
+        bulk.upsert(Account(email="new@example.com"))
+
+        result = yield bulk.execute()
+
+        expect(len(bulk)).to_equal(0)
+        expect(result.matched_count).to_equal(3)
+        expect(result.deleted_count).to_equal(1)
+        expect(result.upserted_count).to_equal(1)
+        expect(result.errors).to_length(1)
+        expect(result.errors[0].index).to_equal(1)
+        expect(result.errors[0].code).to_equal(11000)
+
+        count = yield Account.objects.count()
+        expect(count).to_equal(10)
+
+        pro = yield Account.objects.get(plan="pro")
+        expect(pro._id).to_equal(accounts[0]._id)
+
+        upserted = yield Account.objects.get(email="new@example.com")
+        expect(upserted._id).to_equal(result.upserted[0]._id)
+        expect(result.results[4].upserted_id).to_equal(upserted._id)
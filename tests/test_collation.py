@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from preggy import expect
+
+from motorengine import Document, StringField, IntField, Q
+from motorengine.query_builder.transform import get_query_collation
+from tests import AsyncTestCase
+
+CASE_INSENSITIVE = {'locale': 'en', 'strength': 2}
+
+
+class Customer(Document):
+    __collection__ = "CollatedCustomer"
+
+    name = StringField(collation=CASE_INSENSITIVE)
+    email = StringField(db_field="e", collation={'locale': 'fr', 'strength': 1})
+    city = StringField()
+    visits = IntField()
+
+
+class TestCollationOperators(AsyncTestCase):
+    def test_iexact_on_collated_field_is_an_equality(self):
+        expect(Q(name__iexact="BeRnArDo").to_query(Customer, CASE_INSENSITIVE)).to_be_like({"name": "BeRnArDo"})
+
+    def test_istartswith_on_collated_field_is_a_range(self):
+        expect(Q(name__istartswith="Ber").to_query(Customer, CASE_INSENSITIVE)).to_be_like({
+            "name": {"$gte": "Ber", "$lt": u"Ber\uffff"}
+        })
+
+    def test_collated_fields_use_regular_expressions_without_the_collation(self):
+        expect(Q(name__iexact="B.").to_query(Customer)).to_be_like({
+            "name": {"$regex": "^B\\.$", "$options": "i"}
+        })
+        expect(Q(name__iexact="B").to_query(Customer, {'locale': 'pt'})).to_be_like({
+            "name": {"$regex": "^B$", "$options": "i"}
+        })
+
+    def test_fields_without_collation_use_regular_expressions(self):
+        expect(Q(city__iexact="S.P").to_query(Customer, CASE_INSENSITIVE)).to_be_like({
+            "city": {"$regex": "^S\\.P$", "$options": "i"}
+        })
+        expect(Q(name__icontains="er").to_query(Customer, CASE_INSENSITIVE)).to_be_like({
+            "name": {"$regex": "er", "$options": "i"}
+        })
+
+    def test_negated_iexact_on_collated_field(self):
+        expect((~Q(name__iexact="bernardo")).to_query(Customer, CASE_INSENSITIVE)).to_be_like({
+            "name": {"$ne": "bernardo"}
+        })
+
+    def test_query_collation(self):
+        expect(get_query_collation(Customer, Q(city="Rio"))).to_be_null()
+        expect(get_query_collation(Customer, Q(name="bernardo"))).to_be_null()
+        expect(get_query_collation(Customer, Q(name__iexact="bernardo"))).to_equal(CASE_INSENSITIVE)
+        expect(get_query_collation(Customer, Q(visits__gt=3) & Q(name__iexact="bernardo"))).to_equal(
+            CASE_INSENSITIVE
+        )
+        expect(get_query_collation(Customer, Q(name="Bernardo") | ~Q(name__istartswith="ber"))).to_equal(
+            CASE_INSENSITIVE
+        )
+
+    def test_query_collation_with_other_string_comparisons(self):
+        expect(get_query_collation(Customer, Q(city="Rio") & Q(name__iexact="bernardo"))).to_be_null()
+        expect(get_query_collation(Customer, Q(name__iexact="bernardo") & Q(other="Active"))).to_be_null()
+        expect(get_query_collation(Customer, Q(name__iexact="bernardo") & Q(other=1))).to_equal(CASE_INSENSITIVE)
+        expect(get_query_collation(Customer, Q({"city": "Rio"}) & Q(name__iexact="bernardo"))).to_be_null()
+
+    def test_query_collation_with_sort_fields(self):
+        query = Q(name__iexact="bernardo")
+
+        expect(get_query_collation(Customer, query, [Customer._fields['name']])).to_equal(CASE_INSENSITIVE)
+        expect(get_query_collation(Customer, query, [Customer._fields['visits']])).to_equal(CASE_INSENSITIVE)
+        expect(get_query_collation(Customer, query, [Customer._fields['city']])).to_be_null()
+
+    def test_query_collation_with_different_collations(self):
+        query = Q(name__iexact="bernardo") & Q(email__iexact="bernardo@example.com")
+
+        expect(get_query_collation(Customer, query)).to_be_null()
+
+
+class TestQuerySetCollation(AsyncTestCase):
+    def test_find_options_use_the_collation_of_the_filters(self):
+        expect(Customer.objects.filter(city="Rio").get_find_options()).to_be_like({})
+
+        queryset = Customer.objects.filter(name__iexact="bernardo")
+        expect(queryset.get_find_options()).to_be_like({'collation': CASE_INSENSITIVE})
+        expect(queryset.get_aggregate_options()).to_be_like({'collation': CASE_INSENSITIVE})
+        expect(queryset.get_write_options()).to_be_like({'collation': CASE_INSENSITIVE})
+
+    def test_collation_is_not_used_with_other_string_filters(self):
+        queryset = Customer.objects.filter(name__iexact="bernardo", city="Active")
+
+        expect(queryset.get_find_options()).to_be_like({})
+        expect(queryset.get_query_from_filters(queryset._filters)).to_be_like({
+            "name": {"$regex": "^bernardo$", "$options": "i"},
+            "city": "Active",
+        })
+
+    def test_collation_is_not_used_with_other_string_sort_keys(self):
+        queryset = Customer.objects.filter(name__iexact="bernardo")
+
+        expect(queryset.order_by("visits").get_find_options()).to_be_like({'collation': CASE_INSENSITIVE})
+        expect(queryset.order_by("city").get_find_options()).to_be_like({})
+        expect(queryset.get_query_from_filters(queryset._filters)).to_be_like({
+            "name": {"$regex": "^bernardo$", "$options": "i"},
+        })
+
+    def test_explicit_collation_is_used(self):
+        collation = {'locale': 'pt'}
+        queryset = Customer.objects.filter(name__iexact="bernardo").collation(collation)
+
+        expect(queryset.get_find_options()).to_be_like({'collation': collation})
+
+    def test_find_options_for_other_filters(self):
+        queryset = Customer.objects.filter(city="Rio")
+
+        expect(queryset.get_find_options(Q(name__istartswith="ber"))).to_be_like({'collation': CASE_INSENSITIVE})
+
+    def test_prepared_query_keeps_the_collation(self):
+        from motorengine import Param
+
+        prepared = Customer.objects.prepare(name__iexact=Param("name"))
+        queryset = prepared.bind(name="bernardo")
+
+        expect(queryset.get_query_from_filters(queryset._filters)).to_be_like({"name": "bernardo"})
+        expect(queryset.get_find_options()).to_be_like({'collation': CASE_INSENSITIVE})
+
+    def test_index_options(self):
+        expect(Customer.objects.get_index_options(Customer._fields['name'])).to_be_like({
+            'unique': None, 'sparse': False, 'collation': CASE_INSENSITIVE
+        })
+        expect(Customer.objects.get_index_options(Customer._fields['city'])).to_be_like({
+            'unique': None, 'sparse': False
+        })
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+from preggy import expect
+from tornado.testing import gen_test
+
+from motorengine import Document, StringField, IntField, ASCENDING
+from motorengine.queryset import DEFAULT_APPROXIMATE_COUNT
+from tests import AsyncTestCase
+
+
+class Item(Document):
+    __collection__ = 'count_items'
+
+    name = StringField()
+    value = IntField(db_field="v")
+
+
+class TestCountPipeline(AsyncTestCase):
+    def test_count_pipeline(self):
+        expect(Item.objects.get_count_pipeline()).to_be_like([
+            {'$match': {}},
+            {'$group': {'_id': 1, 'n': {'$sum': 1}}},
+        ])
+
+        queryset = Item.objects.filter(value__gt=1).skip(5).limit(10)
+        expect(queryset.get_count_pipeline()).to_be_like([
+            {'$match': {'v': {'$gt': 1}}},
+            {'$group': {'_id': 1, 'n': {'$sum': 1}}},
+        ])
+        expect(queryset.get_count_pipeline(with_limit_and_skip=True)).to_be_like([
+            {'$match': {'v': {'$gt': 1}}},
+            {'$skip': 5},
+            {'$limit': 10},
+            {'$group': {'_id': 1, 'n': {'$sum': 1}}},
+        ])
+        expect(queryset.get_count_pipeline(with_limit_and_skip=True, max_count=3)[2]).to_equal({'$limit': 3})
+
+    def test_approximate_count_limit(self):
+        expect(Item.objects.get_max_count(False)).to_be_null()
+        expect(Item.objects.get_max_count(True)).to_equal(DEFAULT_APPROXIMATE_COUNT)
+        expect(Item.objects.get_max_count(100)).to_equal(100)
+
+        expect(Item.objects.get_count_from_result([])).to_equal(0)
+        expect(Item.objects.get_count_from_result([{'_id': 1, 'n': 3}])).to_equal(3)
+
+
+class TestCount(AsyncTestCase):
+    def setUp(self):
+        super(TestCount, self).setUp()
+        self.drop_coll(Item.__collection__)
+
+    @gen_test
+    def test_can_count_documents(self):
+        yield Item.objects.bulk_insert([Item(name="item", value=index) for index in range(20)])
+
+        count = yield Item.objects.count()
+        expect(count).to_equal(20)
+
+        count = yield Item.objects.filter(value__gte=5).limit(5).count()
+        expect(count).to_equal(15)
+
+        count = yield Item.objects.filter(value__gte=5).skip(12).limit(5).count(with_limit_and_skip=True)
+        expect(count).to_equal(3)
+
+        count = yield Item.objects.filter(value__gte=5).hint([('_id', ASCENDING)]).max_time_ms(1000).count()
+        expect(count).to_equal(15)
+
+        count = yield Item.objects.filter(value=100).count()
+        expect(count).to_equal(0)
+
+    @gen_test
+    def test_can_count_approximately(self):
+        yield Item.objects.bulk_insert([Item(name="item", value=index) for index in range(20)])
+
+        count = yield Item.objects.count(approximate=10)
+        expect(count).to_equal(10)
+
+        count = yield Item.objects.filter(value__lt=5).count(approximate=10)
+        expect(count).to_equal(5)
+
+    @gen_test
+    def test_can_estimate_count(self):
+        yield Item.objects.bulk_insert([Item(name="item", value=index) for index in range(20)])
+
+        count = yield Item.objects.estimated_count()
+        expect(count).to_equal(20)
+
+        count = yield Item.objects.filter(value__lt=5).estimated_count()
+        expect(count).to_equal(5)
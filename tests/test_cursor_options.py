@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+from bson.son import SON
+from preggy import expect
+from tornado.testing import gen_test
+
+from motorengine import Document, StringField, ASCENDING, DESCENDING
+from tests import AsyncTestCase
+
+
+class Book(Document):
+    __collection__ = 'cursor_options_books'
+
+    title = StringField(db_field="t")
+
+
+class SlowBook(Book):
+    __max_time_ms__ = 500
+
+
+class TestCursorOptions(AsyncTestCase):
+    def test_no_options_by_default(self):
+        expect(Book.objects.get_find_options()).to_equal({})
+        expect(Book.objects.get_aggregate_options()).to_equal({})
+
+    def test_find_options(self):
+        queryset = Book.objects.batch_size(50).hint([(Book.title, ASCENDING), ('_id', DESCENDING)]) \
+            .max_time_ms(100).comment("books").no_cursor_timeout().collation({'locale': 'en', 'strength': 2})
+
+        expect(queryset.get_find_options()).to_be_like({
+            'batch_size': 50,
+            'hint': [('t', ASCENDING), ('_id', DESCENDING)],
+            'max_time_ms': 100,
+            'comment': "books",
+            'no_cursor_timeout': True,
+            'collation': {'locale': 'en', 'strength': 2},
+        })
+
+    def test_aggregate_options(self):
+        queryset = Book.objects.batch_size(50).hint([('t', ASCENDING)]).max_time_ms(100).comment("books") \
+            .no_cursor_timeout()
+
+        options = queryset.get_aggregate_options()
+        expect(options).to_be_like({
+            'batchSize': 50,
+            'hint': {'t': ASCENDING},
+            'maxTimeMS': 100,
+            'comment': "books",
+        })
+        expect(options['hint']).to_be_instance_of(SON)
+
+        expect(Book.objects.hint('t_1').get_aggregate_options()).to_equal({'hint': 't_1'})
+
+    def test_max_time_ms_defaults_to_document_class(self):
+        expect(Book.__max_time_ms__).to_be_null()
+        expect(SlowBook.objects.get_find_options()).to_equal({'max_time_ms': 500})
+        expect(SlowBook.objects.max_time_ms(10).get_aggregate_options()).to_equal({'maxTimeMS': 10})
+
+
+class TestCursorOptionsQueries(AsyncTestCase):
+    def setUp(self):
+        super(TestCursorOptionsQueries, self).setUp()
+        self.drop_coll(Book.__collection__)
+
+    @gen_test
+    def test_can_query_with_options(self):
+        yield Book.objects.create(title="Book")
+
+        queryset = Book.objects.filter(title="book").collation({'locale': 'en', 'strength': 2}) \
+            .hint([('_id', ASCENDING)]).max_time_ms(1000).comment("test").batch_size(10)
+
+        books = yield queryset.find_all()
+        expect(books).to_length(1)
+
+        book = yield Book.objects.collation({'locale': 'en', 'strength': 2}).get(title="book")
+        expect(book._id).to_equal(books[0]._id)
+
+        count = yield Book.objects.filter(title="Book").hint([('_id', ASCENDING)]).count()
+        expect(count).to_equal(1)
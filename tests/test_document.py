@@ -13,8 +13,9 @@ from motorengine import (
     Document, StringField, BooleanField, ListField,
     EmbeddedDocumentField, ReferenceField, DESCENDING,
     URLField, DateTimeField, UUIDField, IntField, JsonField,
-    BinaryField, FloatField, DecimalField, EmailField
+    BinaryField, FloatField, DecimalField, EmailField, DictField
 )
+import motorengine.document
 from motorengine import Q
 from motorengine.errors import InvalidDocumentError, LoadReferencesRequiredError, UniqueKeyViolationError
 from tests import AsyncTestCase
@@ -1292,6 +1293,34 @@ class TestDocument(AsyncTestCase):
         expect(base.list_val).to_length(3)
         expect(base.list_val[0]).to_be_instance_of(Ref)
 
+    @gen_test
+    def test_list_field_with_reference_field_keeps_order(self):
+        class Ref(Document):
+            __collection__ = 'ref'
+            val = StringField()
+
+        class Base(Document):
+            __collection__ = 'base'
+            list_val = ListField(ReferenceField(reference_document_type=Ref))
+
+        yield Ref.objects.delete()
+        yield Base.objects.delete()
+
+        refs = []
+        for i in range(5):
+            ref = yield Ref.objects.create(val="v%d" % i)
+            refs.append(ref)
+
+        missing_id = ObjectId()
+        base = yield Base.objects.create(list_val=list(reversed(refs)) + [missing_id])
+
+        base = yield Base.objects.get(base._id)
+        yield base.load_references()
+
+        expect(base.list_val).to_length(6)
+        expect([ref.val for ref in base.list_val[:5]]).to_be_like(["v4", "v3", "v2", "v1", "v0"])
+        expect(base.list_val[5]).to_be_null()
+
     def test_can_create_new_instance_with_id(self):
         user = EmployeeWithId(id="12345", emp_number="mynumber")
         user.save(callback=self.stop)
@@ -1367,3 +1396,348 @@ class TestDocument(AsyncTestCase):
         expect(doc.field_uuid).to_be_null()
         expect(doc.field_embedded).to_be_null()
         expect(doc.field_list).to_be_like([])
+
+    @gen_test
+    def test_saving_a_loaded_document_only_updates_changed_fields(self):
+        class ChangedEmbedded(Document):
+            name = StringField()
+            views = IntField()
+
+        class ChangedDocument(Document):
+            title = StringField()
+            views = IntField(default=0)
+            embedded = EmbeddedDocumentField(ChangedEmbedded)
+
+        yield ChangedDocument.objects.delete()
+
+        doc = yield ChangedDocument.objects.create(
+            title="title", embedded=ChangedEmbedded(name="name", views=0)
+        )
+
+        # changed by someone else after we saved it
+        yield ChangedDocument.objects.filter(title="title").update({
+            "title": "other title",
+            "embedded.name": "other name",
+        })
+
+        doc.views = 10
+        doc.embedded.views = 20
+        yield doc.save()
+
+        loaded = yield ChangedDocument.objects.get(doc._id)
+
+        expect(loaded.title).to_equal("other title")
+        expect(loaded.views).to_equal(10)
+        expect(loaded.embedded.name).to_equal("other name")
+        expect(loaded.embedded.views).to_equal(20)
+
+    @gen_test
+    def test_can_find_all_with_lazy_decode(self):
+        class LazyEmbedded(Document):
+            name = StringField()
+
+        class LazyDocument(Document):
+            title = StringField()
+            created = DateTimeField(auto_now_on_insert=True)
+            items = ListField(EmbeddedDocumentField(LazyEmbedded))
+
+        yield LazyDocument.objects.delete()
+        yield LazyDocument.objects.create(title="title", items=[LazyEmbedded(name="name")])
+
+        docs = yield LazyDocument.objects.lazy_decode().find_all()
+
+        expect(docs).to_length(1)
+        expect(docs[0]._is_raw_value("items")).to_be_true()
+        expect(docs[0].items[0].name).to_equal("name")
+
+        docs[0].title = "other"
+        yield docs[0].save()
+
+        loaded = yield LazyDocument.objects.get(docs[0]._id)
+        expect(loaded.title).to_equal("other")
+        expect(loaded.created).to_be_instance_of(datetime)
+        expect(loaded.items[0].name).to_equal("name")
+
+
+class TestDocumentChangedFields(AsyncTestCase):
+    def test_new_document_does_not_track_changes(self):
+        user = User(email="heynemann@gmail.com")
+        user.first_name = "Other"
+
+        expect(user._changed_fields).to_be_null()
+
+    def test_loaded_document_tracks_changed_fields(self):
+        user = User.from_son({"email": "heynemann@gmail.com", "first_name": "Bernardo"})
+        expect(user._changed_fields).to_be_empty()
+
+        user.first_name = "Other"
+        user.facebook_id = None
+
+        expect(user._changed_fields).to_be_like(set(["first_name", "facebook_id"]))
+
+        set_values, unset_values = user._delta()
+
+        expect(set_values).to_be_like({"first_name": "Other"})
+        expect(unset_values).to_be_like({"facebook_id": ""})
+
+    def test_delta_of_embedded_documents(self):
+        post = Post.from_son({
+            "title": "title",
+            "comments": [{"text": "comment", "user": None}]
+        })
+
+        expect(post._delta()).to_be_like(({}, {}))
+
+        post.title = "other"
+        # reading a list does not change it
+        expect(post.comments).to_length(1)
+
+        expect(post._delta()).to_be_like(({"title": "other"}, {}))
+
+        post.comments[0].text = "other comment"
+        post.comments.append(Comment(text="new comment"))
+
+        set_values, unset_values = post._delta()
+
+        expect(set_values).to_be_like({
+            "title": "other",
+            "comments": [{"text": "other comment", "user": None}, {"text": "new comment", "user": None}],
+        })
+        expect(unset_values).to_be_empty()
+
+    def test_update_of_lists_and_dicts_changed_in_place(self):
+        class ChangedDocument(Document):
+            tags = ListField(StringField())
+            data = DictField()
+
+        doc = ChangedDocument.from_son({"_id": ObjectId(), "tags": ["a"], "data": {"a": 1}, "_other": [1]})
+
+        expect(doc.tags).to_equal(["a"])
+        expect(doc.data).to_equal({"a": 1})
+        expect(doc.other).to_equal([1])
+        expect(ChangedDocument.objects.get_update_definition(doc)).to_be_null()
+
+        doc.tags.append("b")
+        doc.data["b"] = 2
+        doc.other.append(2)
+
+        expect(ChangedDocument.objects.get_update_definition(doc)).to_be_like({
+            "$set": {"tags": ["a", "b"], "data": {"a": 1, "b": 2}, "_other": [1, 2]},
+        })
+
+        doc._clear_changed_fields()
+        expect(ChangedDocument.objects.get_update_definition(doc)).to_be_null()
+
+    def test_delta_of_changed_embedded_document_fields(self):
+        class ChangedEmbedded(Document):
+            name = StringField()
+
+        class ChangedDocument(Document):
+            embedded = EmbeddedDocumentField(ChangedEmbedded, db_field="emb")
+
+        doc = ChangedDocument.from_son({"emb": {"name": "name"}})
+        doc.embedded.name = "other"
+
+        expect(doc._delta()).to_be_like(({"emb.name": "other"}, {}))
+
+        doc.embedded = ChangedEmbedded(name="new")
+
+        expect(doc._delta()).to_be_like(({"emb": {"name": "new"}}, {}))
+
+    def test_clear_changed_fields(self):
+        user = User(email="heynemann@gmail.com")
+        user._clear_changed_fields()
+
+        expect(user._changed_fields).to_be_empty()
+
+        user.email = "other@gmail.com"
+        expect(user._delta()).to_be_like(({"email": "other@gmail.com"}, {}))
+
+
+class TestDocumentLazyDecode(AsyncTestCase):
+    def get_post_son(self):
+        return {
+            "_id": ObjectId(),
+            "title": "title",
+            "body": "body",
+            "comments": [{"text": "comment", "user": None}]
+        }
+
+    def test_lazy_decoded_document_converts_fields_on_access(self):
+        post = Post.from_son(self.get_post_son(), _lazy_decode=True)
+
+        expect(post._values.raw_values).to_length(3)
+        expect(post._is_raw_value("comments")).to_be_true()
+
+        expect(post.title).to_equal("title")
+        expect(post._is_raw_value("title")).to_be_false()
+        expect(post._is_raw_value("comments")).to_be_true()
+
+        expect(post.comments[0]).to_be_instance_of(Comment)
+        expect(post.comments[0].text).to_equal("comment")
+        expect(post._is_raw_value("comments")).to_be_false()
+
+    def test_lazy_decoded_document_caches_converted_values(self):
+        post = Post.from_son(self.get_post_son(), _lazy_decode=True)
+
+        expect(post.comments[0]).to_equal(post.comments[0])
+
+    def test_to_son_reuses_raw_values(self):
+        son = self.get_post_son()
+        comments = son["comments"]
+        post = Post.from_son(son, _lazy_decode=True)
+
+        data = post.to_son()
+
+        expect(data["comments"]).to_equal(comments)
+        expect(data["title"]).to_equal("title")
+        expect(post._is_raw_value("comments")).to_be_true()
+
+    def test_lazy_decoded_document_tracks_changes(self):
+        post = Post.from_son(self.get_post_son(), _lazy_decode=True)
+        post.title = "other"
+
+        expect(post._delta()).to_be_like(({"title": "other"}, {}))
+        expect(post._is_raw_value("comments")).to_be_true()
+
+    def test_lazy_decode_defaults_to_document_class(self):
+        class LazyDecodedPost(Document):
+            __lazy_decode__ = True
+
+            title = StringField()
+
+        post = LazyDecodedPost.from_son({"title": "title"})
+        expect(post._is_raw_value("title")).to_be_true()
+        expect(post.title).to_equal("title")
+
+        post = LazyDecodedPost.from_son({"title": "title"}, _lazy_decode=False)
+        expect(post._is_raw_value("title")).to_be_false()
+
+        expect(Post.objects.lazy_decode()._lazy_decode).to_be_true()
+
+
+class TestDocumentDynamicFields(AsyncTestCase):
+    def test_dynamic_fields_are_kept_per_instance(self):
+        class DynamicPerInstanceDocument(Document):
+            name = StringField()
+
+        doc = DynamicPerInstanceDocument(name="Bernardo", a=1)
+        doc.b = 2
+
+        expect(doc.a).to_equal(1)
+        expect(doc.b).to_equal(2)
+        expect(doc._dynamic_fields).to_be_like({"a": "_a", "b": "_b"})
+
+        expect(DynamicPerInstanceDocument._fields).to_length(1)
+        expect(DynamicPerInstanceDocument._db_field_index).to_length(1)
+
+        other = DynamicPerInstanceDocument(name="Other")
+        expect(other._dynamic_fields).to_be_null()
+
+        with expect.error_to_happen(AttributeError):
+            other.a
+
+    def test_dynamic_fields_to_son(self):
+        class DynamicPerInstanceDocument(Document):
+            name = StringField()
+
+        doc = DynamicPerInstanceDocument.from_son({"name": "Bernardo", "_a": 1, "b": 2})
+
+        expect(doc.a).to_equal(1)
+        expect(doc.b).to_equal(2)
+        expect(doc.to_son()).to_be_like({"name": "Bernardo", "_a": 1, "_b": 2})
+        expect(doc.get_field_value("b")).to_equal(2)
+        expect(doc.validate()).to_be_true()
+
+    def test_dynamic_fields_round_trip(self):
+        class DynamicPerInstanceDocument(Document):
+            name = StringField()
+
+        doc = DynamicPerInstanceDocument(name="Bernardo", a=1)
+
+        for lazy_decode in (False, True):
+            loaded = DynamicPerInstanceDocument.from_son(doc.to_son(), _lazy_decode=lazy_decode)
+
+            expect(loaded.a).to_equal(1)
+            expect(loaded._dynamic_fields).to_be_like({"a": "_a"})
+            expect(loaded.to_son()).to_be_like({"name": "Bernardo", "_a": 1})
+
+        compile_serializers = motorengine.document.serializers.COMPILE_SERIALIZERS
+        motorengine.document.serializers.COMPILE_SERIALIZERS = not compile_serializers
+        try:
+            loaded = DynamicPerInstanceDocument.from_son(doc.to_son())
+        finally:
+            motorengine.document.serializers.COMPILE_SERIALIZERS = compile_serializers
+
+        expect(loaded.a).to_equal(1)
+
+    def test_dynamic_fields_delta(self):
+        class DynamicPerInstanceDocument(Document):
+            name = StringField()
+
+        doc = DynamicPerInstanceDocument.from_son({"name": "Bernardo", "_a": 1})
+        doc.other = "value"
+
+        expect(doc._delta()).to_be_like(({"_other": "value"}, {}))
+
+
+class TestDocumentReferenceBatches(AsyncTestCase):
+    def setUp(self):
+        super(TestDocumentReferenceBatches, self).setUp()
+        self.batch_size = motorengine.document.REFERENCE_BATCH_SIZE
+
+    def tearDown(self):
+        motorengine.document.REFERENCE_BATCH_SIZE = self.batch_size
+        super(TestDocumentReferenceBatches, self).tearDown()
+
+    def get_document(self, ids, _reference_loaded_fields=None):
+        class BatchedRef(Document):
+            name = StringField()
+
+        class BatchedBase(Document):
+            ref = ReferenceField(BatchedRef)
+            refs = ListField(ReferenceField(BatchedRef))
+
+        return BatchedRef, BatchedBase.from_son(
+            {"ref": ids[0], "refs": ids}, _reference_loaded_fields=_reference_loaded_fields
+        )
+
+    def test_references_are_grouped_by_type_and_projection(self):
+        ids = [ObjectId() for i in range(3)]
+        ref_type, doc = self.get_document(ids, _reference_loaded_fields={"refs": {"name": 1}})
+
+        references = doc.find_references(doc)
+        expect(references).to_length(4)
+
+        batches = doc.get_reference_batches(references)
+
+        expect(batches).to_length(2)
+        expect(batches[0][1:]).to_be_like((ref_type, None, [ids[0]]))
+        expect(batches[1][1:]).to_be_like((ref_type, {"name": 1}, ids))
+
+    def test_references_batches_are_chunked(self):
+        motorengine.document.REFERENCE_BATCH_SIZE = 2
+
+        ids = [ObjectId() for i in range(5)]
+        ref_type, doc = self.get_document(ids)
+
+        batches = doc.get_reference_batches(doc.find_references(doc))
+
+        expect(batches).to_length(3)
+        expect([batch[3] for batch in batches]).to_be_like([ids[:2], ids[2:4], ids[4:]])
+
+    def test_fill_references_keeps_order_and_handles_missing_ids(self):
+        ids = [ObjectId() for i in range(3)]
+        ref_type, doc = self.get_document(ids)
+
+        references = doc.find_references(doc)
+        key, document_type, projection, batch_ids = doc.get_reference_batches(references)[0]
+
+        loaded = dict((_id, ref_type(_id=_id, name=str(_id))) for _id in reversed(ids[:2]))
+        doc.fill_references(references, {key: loaded})
+
+        expect(doc.ref._id).to_equal(ids[0])
+        expect(doc.refs).to_length(3)
+        expect(doc.refs[0]._id).to_equal(ids[0])
+        expect(doc.refs[1]._id).to_equal(ids[1])
+        expect(doc.refs[2]).to_be_null()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+from preggy import expect
+from tornado import gen
+from tornado.testing import gen_test
+
+from motorengine import Document, StringField, IntField, ReferenceField
+from tests import AsyncTestCase
+
+
+class Author(Document):
+    __collection__ = 'each_batch_authors'
+
+    name = StringField()
+
+
+class Post(Document):
+    __collection__ = 'each_batch_posts'
+
+    index = IntField()
+    title = StringField()
+    author = ReferenceField(reference_document_type=Author)
+
+
+class TestEachBatch(AsyncTestCase):
+    def setUp(self):
+        super(TestEachBatch, self).setUp()
+        self.drop_coll(Author.__collection__)
+        self.drop_coll(Post.__collection__)
+
+    @gen.coroutine
+    def create_posts(self, count):
+        author = yield Author.objects.create(name="author")
+        yield Post.objects.bulk_insert([
+            Post(index=index, title="post %d" % index, author=author) for index in range(count)
+        ])
+        raise gen.Return(author)
+
+    @gen_test
+    def test_can_handle_all_documents_in_batches(self):
+        yield self.create_posts(1050)
+        batches = []
+
+        def handle_batch(posts):
+            batches.append([post.index for post in posts])
+
+        count = yield Post.objects.order_by(Post.index).each_batch(100, handle_batch)
+
+        expect(count).to_equal(1050)
+        expect(batches).to_length(11)
+        expect(batches[-1]).to_length(50)
+        expect([index for batch in batches for index in batch]).to_equal(list(range(1050)))
+
+    @gen_test
+    def test_waits_for_handler_future_before_fetching_next_batch(self):
+        yield self.create_posts(30)
+        events = []
+
+        @gen.coroutine
+        def handle_batch(posts):
+            events.append("start %d" % len(posts))
+            yield gen.sleep(0.01)
+            events.append("end %d" % len(posts))
+
+        count = yield Post.objects.each_batch(10, handle_batch)
+
+        expect(count).to_equal(30)
+        expect(events).to_equal(["start 10", "end 10"] * 3)
+
+    @gen_test
+    def test_handler_can_stop_iteration(self):
+        yield self.create_posts(30)
+        batches = []
+
+        def handle_batch(posts):
+            batches.append(posts)
+            return False
+
+        count = yield Post.objects.each_batch(10, handle_batch)
+
+        expect(count).to_equal(10)
+        expect(batches).to_length(1)
+
+    @gen_test
+    def test_respects_projection_and_lazy_settings(self):
+        author = yield self.create_posts(5)
+        batches = []
+
+        def handle_batch(posts):
+            batches.append(posts)
+
+        yield Post.objects.only("index").each_batch(10, handle_batch)
+        post = batches[0][0]
+        expect(post.is_partly_loaded).to_be_true()
+        expect(post.title).to_be_null()
+
+        yield Post.objects.filter(index=1).each_batch(10, handle_batch, lazy=False)
+        post = batches[1][0]
+        expect(post.author._id).to_equal(author._id)
+        expect(post.author.name).to_equal("author")
+
+    @gen_test
+    def test_handler_errors_fail_the_result(self):
+        yield self.create_posts(30)
+        batches = []
+
+        @gen.coroutine
+        def handle_batch(posts):
+            batches.append(posts)
+            yield gen.sleep(0.01)
+            raise ValueError("handler failed")
+
+        try:
+            yield Post.objects.each_batch(10, handle_batch)
+        except ValueError as err:
+            expect(str(err)).to_equal("handler failed")
+        else:
+            assert False, "Should not have gotten this far"
+
+        expect(batches).to_length(1)
+
+        def handle_batch_synchronously(posts):
+            raise ValueError("handler failed synchronously")
+
+        try:
+            yield Post.objects.each_batch(10, handle_batch_synchronously)
+        except ValueError as err:
+            expect(str(err)).to_equal("handler failed synchronously")
+        else:
+            assert False, "Should not have gotten this far"
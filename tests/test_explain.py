@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import logging
+
+from preggy import expect
+from tornado.testing import gen_test
+
+from motorengine import Document, StringField, IntField
+from motorengine.errors import QueryPlanError
+from motorengine.explain import (
+    enable_strict_mode, disable_strict_mode, get_query_shape, get_plan_summary, get_plan_problem,
+    check_query_plan
+)
+from tests import AsyncTestCase
+
+
+class Visit(Document):
+    __collection__ = 'explain_visits'
+
+    url = StringField(unique=True)
+    hits = IntField()
+
+
+COLLSCAN_EXPLAIN = {
+    'queryPlanner': {'winningPlan': {'stage': 'COLLSCAN', 'filter': {'hits': {'$eq': 1}}}},
+    'executionStats': {'nReturned': 1, 'totalKeysExamined': 0, 'totalDocsExamined': 100},
+}
+
+IXSCAN_EXPLAIN = {
+    'queryPlanner': {'winningPlan': {
+        'stage': 'FETCH',
+        'inputStage': {'stage': 'IXSCAN', 'indexName': 'url_1', 'keyPattern': {'url': 1}},
+    }},
+    'executionStats': {'nReturned': 2, 'totalKeysExamined': 2, 'totalDocsExamined': 2},
+}
+
+
+class TestQueryPlans(AsyncTestCase):
+    def tearDown(self):
+        disable_strict_mode()
+        super(TestQueryPlans, self).tearDown()
+
+    def test_query_shape_ignores_values(self):
+        expect(get_query_shape({'url': 'a', 'hits': {'$gt': 1}})).to_equal(
+            get_query_shape({'hits': {'$gt': 10}, 'url': 'b'})
+        )
+        expect(get_query_shape({'url': 'a'})).not_to_equal(get_query_shape({'url': {'$in': ['a']}}))
+
+    def test_plan_summary(self):
+        summary = get_plan_summary(IXSCAN_EXPLAIN)
+
+        expect(summary.stages).to_equal(['FETCH', 'IXSCAN'])
+        expect(summary.index_name).to_equal('url_1')
+        expect(summary.keys_examined).to_equal(2)
+        expect(summary.docs_examined).to_equal(2)
+        expect(summary.returned).to_equal(2)
+        expect(summary.is_collection_scan).to_be_false()
+        expect(get_plan_problem(summary)).to_be_null()
+
+        summary = get_plan_summary(COLLSCAN_EXPLAIN)
+        expect(summary.index_name).to_be_null()
+        expect(summary.is_collection_scan).to_be_true()
+        expect(get_plan_problem(summary)).to_equal("the query plan is a collection scan (COLLSCAN)")
+
+    def test_plan_problem_for_docs_examined_ratio(self):
+        summary = get_plan_summary(IXSCAN_EXPLAIN)
+        summary.docs_examined = 50
+
+        expect(get_plan_problem(summary)).to_equal(
+            "the query examined 50 documents to return 2 (more than 10 per document returned)"
+        )
+        expect(get_plan_problem(summary, max_docs_examined_ratio=100)).to_be_null()
+
+    def test_strict_mode_raises_or_logs(self):
+        summary = get_plan_summary(COLLSCAN_EXPLAIN)
+        check_query_plan('default', "'explain_visits' collection", summary)
+
+        enable_strict_mode(raise_error=True)
+        with expect.error_to_happen(
+            QueryPlanError,
+            message="Inefficient query in 'explain_visits' collection: the query plan is a collection scan (COLLSCAN)."
+        ):
+            check_query_plan('default', "'explain_visits' collection", summary)
+
+        enable_strict_mode()
+        messages = []
+        handler = logging.Handler()
+        handler.emit = lambda record: messages.append(record.getMessage())
+        logging.getLogger('motorengine.explain').addHandler(handler)
+        try:
+            check_query_plan('default', "'explain_visits' collection", summary)
+        finally:
+            logging.getLogger('motorengine.explain').removeHandler(handler)
+
+        expect(messages).to_length(1)
+
+    def test_should_explain_first_query_of_each_shape(self):
+        expect(Visit.objects.filter(url="a").should_explain(None)).to_be_false()
+
+        enable_strict_mode()
+        expect(Visit.objects.filter(url="a").should_explain(None)).to_be_true()
+        expect(Visit.objects.filter(url="b").should_explain(None)).to_be_false()
+        expect(Visit.objects.filter(url="b").order_by(Visit.hits).should_explain(None)).to_be_true()
+        expect(Visit.objects.filter(url="b").should_explain('other')).to_be_false()
+
+
+class TestExplain(AsyncTestCase):
+    def setUp(self):
+        super(TestExplain, self).setUp()
+        self.drop_coll(Visit.__collection__)
+
+    def tearDown(self):
+        disable_strict_mode()
+        super(TestExplain, self).tearDown()
+
+    @gen_test
+    def test_can_explain_queries(self):
+        yield Visit.ensure_index()
+        yield Visit.objects.bulk_insert([Visit(url="url %d" % index, hits=index) for index in range(10)])
+
+        plan = yield Visit.objects.filter(url="url 1").explain()
+        expect(plan.index_name).to_equal('url_1')
+        expect(plan.is_collection_scan).to_be_false()
+        expect(plan.returned).to_equal(1)
+
+        plan = yield Visit.objects.filter(hits=1).explain()
+        expect(plan.index_name).to_be_null()
+        expect(plan.is_collection_scan).to_be_true()
+        expect(plan.docs_examined).to_equal(10)
+
+    @gen_test
+    def test_strict_mode_explains_queries_before_running_them(self):
+        yield Visit.objects.bulk_insert([Visit(url="url %d" % index, hits=index) for index in range(10)])
+        enable_strict_mode()
+
+        visits = yield Visit.objects.filter(hits=1).find_all()
+        expect(visits).to_length(1)
+
+        visit = yield Visit.objects.get(hits=2)
+        expect(visit.url).to_equal("url 2")
+
+        count = yield Visit.objects.filter(hits__gt=4).count()
+        expect(count).to_equal(5)
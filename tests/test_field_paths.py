@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from preggy import expect
+
+from motorengine import (
+    Document, StringField, IntField, ListField, EmbeddedDocumentField, DESCENDING
+)
+from motorengine.fields.dynamic_field import DynamicField
+from tests import AsyncTestCase
+
+
+class Location(Document):
+    city = StringField(db_field="c")
+
+
+class Office(Document):
+    location = EmbeddedDocumentField(Location, db_field="loc")
+    size = IntField()
+
+
+class Company(Document):
+    name = StringField(db_field="n")
+    headquarters = EmbeddedDocumentField(Office, db_field="hq")
+    offices = ListField(EmbeddedDocumentField(Office))
+
+
+class TestFieldPaths(AsyncTestCase):
+    def test_field_chains_are_cached(self):
+        fields = Company.get_fields("headquarters.location.city")
+
+        expect(fields).to_equal([
+            Company._fields["headquarters"], Office._fields["location"], Location._fields["city"]
+        ])
+        expect(Company._field_paths).to_include("headquarters.location.city")
+
+        same_fields = Company.get_fields("headquarters.location.city")
+        expect(same_fields).to_equal(fields)
+        expect(same_fields is fields).to_be_false()
+
+    def test_unknown_paths_are_cached(self):
+        field = Company.get_fields("unknown")[0]
+
+        expect(field).to_be_instance_of(DynamicField)
+        expect(field.db_field).to_equal("_unknown")
+        expect(Company.get_fields("unknown")[0] is field).to_be_true()
+
+    def test_can_extend_field_list(self):
+        fields = ["head"]
+        expect(Company.get_fields("offices.size", fields=fields) is fields).to_be_true()
+        expect(fields).to_length(3)
+
+    def test_db_field_path(self):
+        expect(Company.get_db_field_path("name")).to_equal("n")
+        expect(Company.get_db_field_path("headquarters.location.city")).to_equal("hq.loc.c")
+        expect(Company.get_db_field_path("offices.location.city")).to_equal("offices.loc.c")
+        expect(Company.get_db_field_path("headquarters.invalid")).to_be_null()
+        expect(Company.get_db_field_path("name.other")).to_be_null()
+        expect(Company.get_db_field_path("invalid")).to_be_null()
+
+    def test_order_by_dotted_path(self):
+        queryset = Company.objects.order_by("headquarters.location.city", DESCENDING).order_by(Company.name)
+        expect(queryset._order_fields).to_equal([("hq.loc.c", DESCENDING), ("n", 1)])
+
+        with expect.error_to_happen(
+            ValueError, message="Invalid order by field 'headquarters.other': Field not found in 'Company'."
+        ):
+            Company.objects.order_by("headquarters.other")
+
+    def test_aggregation_field_names(self):
+        aggregation = Company.objects.aggregate
+        expect(aggregation.get_field_name("headquarters.size")).to_equal("hq.size")
+        expect(aggregation.get_field_name("n")).to_equal("n")
+        expect(aggregation.order_by("name", DESCENDING).pipeline[0].to_query()).to_equal({'$sort': {'n': DESCENDING}})
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+
+from bson.objectid import ObjectId
+from preggy import expect
+from tornado.testing import gen_test
+
+from motorengine import Document, StringField, IntField, EmbeddedDocumentField
+from motorengine.errors import InvalidDocumentError
+from tests import AsyncTestCase
+
+
+class Address(Document):
+    city = StringField()
+
+
+class Subscriber(Document):
+    __collection__ = "GetOrCreateSubscriber"
+
+    email = StringField(db_field="e", unique=True)
+    name = StringField(required=True)
+    visits = IntField(default=0)
+    address = EmbeddedDocumentField(Address)
+
+
+class TestUpsertDefinitions(AsyncTestCase):
+    def test_upsert_filter(self):
+        subscriber_id = ObjectId()
+
+        expect(Subscriber.objects.get_upsert_filter(Subscriber(_id=subscriber_id, email="a@a.com"))).to_equal({
+            "_id": subscriber_id
+        })
+        expect(Subscriber.objects.get_upsert_filter(Subscriber(email="a@a.com", name="a"))).to_equal({
+            "e": "a@a.com"
+        })
+        expect(Subscriber.objects.get_upsert_filter(Subscriber(name="a"))).to_be_null()
+
+    def test_get_or_create_definition(self):
+        query, update = Subscriber.objects.get_or_create_definition(
+            {"name": "Bernardo", Subscriber.visits: 1}, email="a@a.com", address__city="Rio"
+        )
+
+        expect(query).to_equal({"e": "a@a.com", "address.city": "Rio"})
+
+        on_insert = update["$setOnInsert"]
+        expect(on_insert["_id"]).to_be_instance_of(ObjectId)
+        del on_insert["_id"]
+        expect(on_insert).to_equal({"name": "Bernardo", "visits": 1})
+
+    def test_get_or_create_definition_with_operators(self):
+        query, update = Subscriber.objects.get_or_create_definition({"name": "Bernardo"}, visits__gt=2)
+
+        expect(query).to_equal({"visits": {"$gt": 2}})
+        expect(update["$setOnInsert"]).to_include("visits")
+
+    def test_get_or_create_validates_the_new_document(self):
+        try:
+            Subscriber.objects.get_or_create_definition(email="a@a.com")
+        except InvalidDocumentError:
+            err = sys.exc_info()[1]
+            expect(err).to_have_an_error_message_of("Field 'name' is required.")
+        else:
+            assert False, "Should not have gotten this far"
+
+    def test_get_or_create_by_id_fails(self):
+        try:
+            Subscriber.objects.get_or_create_definition(id=ObjectId())
+        except ValueError:
+            err = sys.exc_info()[1]
+            expect(str(err)).to_include("Can't get or create filtering by _id")
+        else:
+            assert False, "Should not have gotten this far"
+
+
+class TestGetOrCreate(AsyncTestCase):
+    def setUp(self):
+        super(TestGetOrCreate, self).setUp()
+        self.drop_coll("GetOrCreateSubscriber")
+
+    @gen_test
+    def test_can_get_or_create(self):
+        subscriber, created = yield Subscriber.objects.get_or_create(email="a@a.com", defaults={"name": "Bernardo"})
+
+        expect(created).to_be_true()
+        expect(subscriber._id).not_to_be_null()
+        expect(subscriber.email).to_equal("a@a.com")
+        expect(subscriber.name).to_equal("Bernardo")
+
+        other, created = yield Subscriber.objects.get_or_create(email="a@a.com", defaults={"name": "Other"})
+
+        expect(created).to_be_false()
+        expect(other._id).to_equal(subscriber._id)
+        expect(other.name).to_equal("Bernardo")
+
+        count = yield Subscriber.objects.count()
+        expect(count).to_equal(1)
+
+    @gen_test
+    def test_can_upsert_by_id(self):
+        subscriber_id = ObjectId()
+
+        subscriber = yield Subscriber(_id=subscriber_id, email="a@a.com", name="Bernardo").save(upsert=True)
+        expect(subscriber._id).to_equal(subscriber_id)
+
+        yield Subscriber(_id=subscriber_id, email="a@a.com", name="Other").save(upsert=True)
+
+        subscribers = yield Subscriber.objects.find_all()
+        expect(subscribers).to_length(1)
+        expect(subscribers[0].name).to_equal("Other")
+
+    @gen_test
+    def test_can_upsert_by_unique_fields(self):
+        subscriber = yield Subscriber(email="a@a.com", name="Bernardo").save(upsert=True)
+        expect(subscriber._id).not_to_be_null()
+
+        other = yield Subscriber(email="a@a.com", name="Other").save(upsert=True)
+        expect(other._id).to_equal(subscriber._id)
+
+        subscribers = yield Subscriber.objects.find_all()
+        expect(subscribers).to_length(1)
+        expect(subscribers[0].name).to_equal("Other")
@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import gc
+from unittest import skipIf
+
+from bson.objectid import ObjectId
+from preggy import expect
+from tornado.testing import gen_test
+
+from motorengine import Document, StringField, ReferenceField, ListField, IdentityMap
+from motorengine.identity_map import get_identity_map, contextvars
+from tests import AsyncTestCase
+
+
+class Account(Document):
+    __collection__ = 'identity_map_accounts'
+
+    name = StringField()
+
+
+class Member(Document):
+    __collection__ = 'identity_map_members'
+
+    name = StringField()
+    account = ReferenceField(reference_document_type=Account)
+    accounts = ListField(ReferenceField(reference_document_type=Account))
+
+
+class TestIdentityMap(AsyncTestCase):
+    @skipIf(contextvars is None, "IdentityMap requires contextvars")
+    def test_identity_map_is_active_in_with_block(self):
+        expect(get_identity_map()).to_be_null()
+
+        with IdentityMap() as identity_map:
+            expect(get_identity_map()).to_equal(identity_map)
+
+            with IdentityMap() as inner_identity_map:
+                expect(get_identity_map()).to_equal(inner_identity_map)
+
+            expect(get_identity_map()).to_equal(identity_map)
+
+        expect(get_identity_map()).to_be_null()
+
+    @skipIf(contextvars is not None, "contextvars is available")
+    def test_identity_map_requires_contextvars(self):
+        with expect.error_to_happen(
+            RuntimeError,
+            message="IdentityMap requires contextvars (Python 3.7+) to keep a separate map for each request or task."
+        ):
+            with IdentityMap():
+                pass
+
+        expect(get_identity_map()).to_be_null()
+
+    def test_can_add_get_and_remove_documents(self):
+        identity_map = IdentityMap()
+        account = Account(_id=ObjectId(), name="account")
+
+        identity_map.add(account)
+        expect(identity_map.get(Account, account._id)).to_equal(account)
+        expect(identity_map.get(Member, account._id)).to_be_null()
+        expect(account in identity_map).to_be_true()
+
+        identity_map.remove(Account, account._id)
+        expect(identity_map.get(Account, account._id)).to_be_null()
+
+        identity_map.add(account)
+        identity_map.remove_class(Account)
+        expect(identity_map).to_length(0)
+
+    def test_does_not_keep_new_or_partly_loaded_documents(self):
+        identity_map = IdentityMap()
+
+        identity_map.add(Account(name="account"))
+        identity_map.add(Account(_id=ObjectId(), _is_partly_loaded=True))
+
+        expect(identity_map).to_length(0)
+
+    def test_evicts_least_recently_used_documents(self):
+        identity_map = IdentityMap(max_size=2)
+        accounts = [Account(_id=ObjectId()) for i in range(3)]
+
+        identity_map.add(accounts[0])
+        identity_map.add(accounts[1])
+        identity_map.get(Account, accounts[0]._id)
+        identity_map.add(accounts[2])
+
+        expect(identity_map).to_length(2)
+        expect(identity_map.get(Account, accounts[0]._id)).to_equal(accounts[0])
+        expect(identity_map.get(Account, accounts[1]._id)).to_be_null()
+
+    def test_unbounded_identity_map_keeps_weak_references(self):
+        identity_map = IdentityMap(max_size=None)
+        account = Account(_id=ObjectId())
+
+        identity_map.add(account)
+        expect(identity_map).to_length(1)
+
+        del account
+        gc.collect()
+
+        expect(identity_map).to_length(0)
+
+    @skipIf(contextvars is None, "IdentityMap requires contextvars")
+    def test_documents_from_son_are_reused(self):
+        son = {"_id": ObjectId(), "name": "account"}
+
+        with IdentityMap():
+            account = Account.objects.get_document_from_son(dict(son))
+            expect(Account.objects.get_document_from_son(dict(son))).to_equal(account)
+
+            partly_loaded = Account.objects.get_document_from_son(dict(son), is_partly_loaded=True)
+            expect(partly_loaded).not_to_equal(account)
+
+        expect(Account.objects.get_document_from_son(dict(son))).not_to_equal(account)
+
+    @skipIf(contextvars is None, "IdentityMap requires contextvars")
+    def test_documents_loaded_with_other_options_are_not_reused(self):
+        son = {"_id": ObjectId(), "name": "member", "account": ObjectId()}
+
+        with IdentityMap() as identity_map:
+            member = Member.objects.get_document_from_son(dict(son))
+
+            lazy_decoded = Member.objects.lazy_decode().get_document_from_son(dict(son))
+            expect(lazy_decoded).not_to_equal(member)
+            expect(lazy_decoded._is_raw_value("name")).to_be_true()
+
+            with_references = Member.objects.get_document_from_son(dict(son), lazy=False)
+            expect(with_references).not_to_equal(member)
+
+            projected = Member.objects.fields(account__name=1).get_document_from_son(dict(son))
+            expect(projected).not_to_equal(member)
+            expect(projected._reference_loaded_fields).to_equal({"account": {"name": 1}})
+
+            expect(Member.objects.get_document_from_son(dict(son))).to_equal(member)
+            expect(identity_map.get(Member, member._id)).to_equal(member)
+
+            expect(Member.objects.get_from_identity_map(member._id)).to_equal(member)
+            expect(Member.objects.lazy_decode().get_from_identity_map(member._id)).to_be_null()
+
+    @skipIf(contextvars is None, "IdentityMap requires contextvars")
+    def test_saved_documents_are_reused_with_any_options(self):
+        account = Account(_id=ObjectId(), name="account")
+
+        with IdentityMap() as identity_map:
+            identity_map.add(account)
+
+            son = {"_id": account._id, "name": "account"}
+            expect(Account.objects.lazy_decode().get_document_from_son(son)).to_equal(account)
+            expect(Account.objects.lazy_decode().get_from_identity_map(account._id)).to_equal(account)
+
+    @skipIf(contextvars is None, "IdentityMap requires contextvars")
+    def test_get_by_id_uses_identity_map(self):
+        account = Account(_id=ObjectId(), name="account")
+
+        with IdentityMap() as identity_map:
+            identity_map.add(account)
+
+            Account.objects.get(account._id, callback=self.stop)
+            expect(self.wait()).to_equal(account)
+
+            expect(Account.objects.only("name").get_from_identity_map(account._id)).to_be_null()
+
+    @skipIf(contextvars is None, "IdentityMap requires contextvars")
+    def test_references_are_resolved_from_identity_map(self):
+        account = Account(_id=ObjectId(), name="account")
+        member = Member.from_son({"account": account._id, "accounts": [account._id, ObjectId()]})
+
+        with IdentityMap() as identity_map:
+            identity_map.add(account)
+
+            references = member.find_references(member)
+            member.resolve_references_from_identity_map(references)
+
+            batches = member.get_reference_batches(references)
+            expect(batches).to_length(1)
+            expect(batches[0][3]).to_length(1)
+
+            member.fill_references(references, {})
+            expect(member.account).to_equal(account)
+            expect(member.accounts[0]).to_equal(account)
+            expect(member.accounts[1]).to_be_null()
+
+
+@skipIf(contextvars is None, "IdentityMap requires contextvars")
+class TestIdentityMapQueries(AsyncTestCase):
+    def setUp(self):
+        super(TestIdentityMapQueries, self).setUp()
+        self.drop_coll(Account.__collection__)
+        self.drop_coll(Member.__collection__)
+
+    @gen_test
+    def test_get_find_all_and_references_return_the_same_instance(self):
+        account = yield Account.objects.create(name="account")
+        yield Member.objects.create(name="member", account=account)
+
+        with IdentityMap():
+            loaded = yield Account.objects.get(account._id)
+            accounts = yield Account.objects.find_all()
+            expect(accounts[0]).to_equal(loaded)
+
+            member = yield Member.objects.get(name="member")
+            yield member.load_references()
+            expect(member.account).to_equal(loaded)
+
+    @gen_test
+    def test_save_and_delete_update_identity_map(self):
+        with IdentityMap() as identity_map:
+            account = yield Account.objects.create(name="account")
+            expect(identity_map.get(Account, account._id)).to_equal(account)
+
+            yield account.delete()
+            expect(identity_map.get(Account, account._id)).to_be_null()
+
+            loaded = yield Account.objects.get(account._id)
+            expect(loaded).to_be_null()
+
+            account = yield Account.objects.create(name="account")
+            yield Account.objects.filter(name="account").update({"name": "other"})
+            expect(identity_map).to_length(0)
+
+            loaded = yield Account.objects.get(account._id)
+            expect(loaded.name).to_equal("other")
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from unittest import skipIf
+
+from bson.objectid import ObjectId
+from bson.son import SON
+from preggy import expect
+from tornado.testing import gen_test
+
+from motorengine import (
+    Document, StringField, IntField, ListField, ReferenceField, DESCENDING, IdentityMap
+)
+from motorengine.identity_map import contextvars
+from tests import AsyncTestCase
+
+
+class Author(Document):
+    __collection__ = 'lookup_related_authors'
+
+    name = StringField(required=True)
+
+
+class Post(Document):
+    __collection__ = 'lookup_related_posts'
+
+    title = StringField(required=True)
+    views = IntField(db_field="v")
+    author = ReferenceField(reference_document_type=Author, db_field="a")
+    editors = ListField(ReferenceField(reference_document_type=Author))
+
+
+class TestLookupRelatedPipeline(AsyncTestCase):
+    def test_lookup_related_validates_fields(self):
+        queryset = Post.objects.lookup_related("author", Post.editors, "author")
+        expect(queryset._lookup_related).to_be_like([Post.author, Post.editors])
+
+        with expect.error_to_happen(
+            ValueError,
+            message="Invalid lookup_related field 'invalid': Field not found in 'Post'."
+        ):
+            Post.objects.lookup_related("invalid")
+
+        with expect.error_to_happen(
+            ValueError,
+            message="Invalid lookup_related field 'title': 'title' is not a reference field."
+        ):
+            Post.objects.lookup_related("title")
+
+    def test_lookup_pipeline(self):
+        queryset = Post.objects.filter(views__gt=10).order_by("views", DESCENDING).skip(5).lookup_related("author", "editors")
+
+        pipeline = queryset.get_lookup_pipeline(queryset.get_query_from_filters(queryset._filters), limit=10)
+
+        expect(pipeline).to_be_like([
+            {'$match': {'v': {'$gt': 10}}},
+            {'$sort': SON([('v', DESCENDING)])},
+            {'$skip': 5},
+            {'$limit': 10},
+            {'$lookup': {
+                'from': 'lookup_related_authors', 'localField': 'a',
+                'foreignField': '_id', 'as': '__lookup__a'
+            }},
+            {'$lookup': {
+                'from': 'lookup_related_authors', 'localField': 'editors',
+                'foreignField': '_id', 'as': '__lookup__editors'
+            }},
+        ])
+
+    def test_lookup_pipeline_projection(self):
+        queryset = Post.objects.only("title").lookup_related("author")
+        expect(queryset.get_lookup_stages()[-1]).to_be_like({
+            '$project': {'title': 1, '__lookup__a': 1}
+        })
+
+        queryset = Post.objects.exclude("views").lookup_related("author")
+        expect(queryset.get_lookup_stages()[-1]).to_be_like({'$project': {'v': 0}})
+
+        queryset = Post.objects.fields(slice__editors=2).lookup_related("author")
+        expect(queryset.get_lookup_stages()[-1]).to_be_like({
+            '$addFields': {'editors': {'$slice': ['$editors', 2]}}
+        })
+
+        queryset = Post.objects.exclude("views").fields(slice__editors=2).lookup_related("author")
+        expect(queryset.get_lookup_stages()[1:]).to_be_like([
+            {'$project': {'v': 0}},
+            {'$addFields': {'editors': {'$slice': ['$editors', 2]}}},
+        ])
+
+    def test_fill_lookup_fields(self):
+        author_id, editor_id, missing_id = ObjectId(), ObjectId(), ObjectId()
+
+        queryset = Post.objects.lookup_related("author", "editors")
+        son = {
+            "_id": ObjectId(), "title": "title", "a": author_id, "editors": [editor_id, missing_id, author_id],
+            "__lookup__a": [{"_id": author_id, "name": "Bernardo"}],
+            "__lookup__editors": [{"_id": author_id, "name": "Bernardo"}, {"_id": editor_id, "name": "Rafael"}],
+        }
+
+        joined_fields = queryset.pop_lookup_fields(son)
+        expect(son).not_to_include("__lookup__a")
+        expect(son).not_to_include("__lookup__editors")
+
+        post = Post.from_son(son)
+        joined_documents = queryset.fill_lookup_fields(post, joined_fields)
+
+        expect(joined_documents).to_length(3)
+        expect(post._changed_fields).to_be_empty()
+        expect(post.author.name).to_equal("Bernardo")
+        expect(post.editors[0].name).to_equal("Rafael")
+        expect(post.editors[1]).to_be_null()
+        expect(post.editors[2].name).to_equal("Bernardo")
+        expect(post.to_son()["a"]).to_equal(author_id)
+
+    @skipIf(contextvars is None, "IdentityMap requires contextvars")
+    def test_lookup_related_twice_with_identity_map(self):
+        post_id, author_id, editor_id = ObjectId(), ObjectId(), ObjectId()
+
+        def get_son():
+            return {
+                "_id": post_id, "title": "title", "a": author_id, "editors": [editor_id],
+                "__lookup__a": [{"_id": author_id, "name": "Bernardo"}],
+                "__lookup__editors": [{"_id": editor_id, "name": "Rafael"}],
+            }
+
+        queryset = Post.objects.lookup_related("author", "editors")
+
+        with IdentityMap():
+            queryset.handle_get(self.stop)(get_son())
+            post = self.wait()
+
+            queryset.handle_get(self.stop)(get_son())
+            expect(self.wait()).to_equal(post)
+
+        expect(post.author.name).to_equal("Bernardo")
+        expect(post.editors[0].name).to_equal("Rafael")
+
+
+class TestLookupRelated(AsyncTestCase):
+    def setUp(self):
+        super(TestLookupRelated, self).setUp()
+        self.drop_coll(Author.__collection__)
+        self.drop_coll(Post.__collection__)
+
+    @gen_test
+    def test_can_lookup_related_on_find_all(self):
+        author = yield Author.objects.create(name="Bernardo")
+        editor = yield Author.objects.create(name="Rafael")
+
+        for i in range(3):
+            yield Post.objects.create(title="post %d" % i, views=i, author=author, editors=[editor, author])
+
+        posts = yield Post.objects.lookup_related("author", "editors") \
+            .order_by("views", DESCENDING).limit(2).find_all()
+
+        expect(posts).to_length(2)
+        expect(posts[0].title).to_equal("post 2")
+        expect(posts[1].title).to_equal("post 1")
+
+        for post in posts:
+            expect(post.author.name).to_equal("Bernardo")
+            expect([editor.name for editor in post.editors]).to_be_like(["Rafael", "Bernardo"])
+
+    @gen_test
+    def test_can_lookup_related_on_get(self):
+        author = yield Author.objects.create(name="Bernardo")
+        post = yield Post.objects.create(title="post", author=author)
+
+        post = yield Post.objects.lookup_related("author").get(post._id)
+
+        expect(post.author.name).to_equal("Bernardo")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from bson.objectid import ObjectId
+from preggy import expect
+
+from motorengine import Document, StringField, IntField, ReferenceField
+from motorengine.errors import LoadReferencesRequiredError
+from tests import AsyncTestCase
+
+
+class IndexedDocument(Document):
+    name = StringField(db_field="db_name")
+    age = IntField()
+
+
+class ChildIndexedDocument(IndexedDocument):
+    email = StringField()
+
+
+class ReferencingDocument(Document):
+    indexed = ReferenceField(IndexedDocument)
+
+
+class TestDocumentMetaClass(AsyncTestCase):
+    def test_builds_db_field_index(self):
+        index = IndexedDocument._db_field_index
+
+        expect(index).to_length(2)
+        expect(index['db_name']).to_equal(IndexedDocument._fields['name'])
+        expect(index['age']).to_equal(IndexedDocument._fields['age'])
+
+    def test_db_field_index_includes_inherited_fields(self):
+        index = ChildIndexedDocument._db_field_index
+
+        expect(index).to_include("db_name")
+        expect(index).to_include("age")
+        expect(index).to_include("email")
+        expect(IndexedDocument._db_field_index).not_to_include("email")
+
+    def test_get_field_by_db_name(self):
+        field = IndexedDocument.get_field_by_db_name("db_name")
+        expect(field).to_equal(IndexedDocument._fields['name'])
+
+        field = IndexedDocument.get_field_by_db_name("_age")
+        expect(field).to_equal(IndexedDocument._fields['age'])
+
+        expect(IndexedDocument.get_field_by_db_name("name")).to_be_null()
+        expect(IndexedDocument.get_field_by_db_name("invalid")).to_be_null()
+
+    def test_from_son_uses_db_field_index(self):
+        doc = IndexedDocument.from_son({"db_name": "Bernardo", "age": 32})
+
+        expect(doc.name).to_equal("Bernardo")
+        expect(doc.age).to_equal(32)
+
+    def test_class_attribute_returns_field(self):
+        expect(IndexedDocument.name).to_equal(IndexedDocument._fields['name'])
+        expect(ChildIndexedDocument.age).to_equal(IndexedDocument._fields['age'])
+
+    def test_instance_attribute_returns_value(self):
+        doc = ChildIndexedDocument(name="Bernardo", email="test@test.com")
+
+        expect(doc.name).to_equal("Bernardo")
+        expect(doc.email).to_equal("test@test.com")
+        expect(doc.age).to_be_null()
+
+        doc.age = 32
+        expect(doc.age).to_equal(32)
+        expect(doc._values['age']).to_equal(32)
+
+    def test_dynamic_field_access(self):
+        doc = IndexedDocument(name="Bernardo")
+        doc.nickname = "heynemann"
+
+        expect(doc.nickname).to_equal("heynemann")
+
+        with expect.error_to_happen(AttributeError):
+            doc.invalid_attribute
+
+    def test_reference_field_requires_load_references(self):
+        doc = ReferencingDocument(indexed=ObjectId())
+
+        with expect.error_to_happen(LoadReferencesRequiredError):
+            doc.indexed
+
+        indexed = IndexedDocument(name="Bernardo")
+        doc.indexed = indexed
+        expect(doc.indexed).to_equal(indexed)
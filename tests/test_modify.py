@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+
+from bson.objectid import ObjectId
+from preggy import expect
+from pymongo import ReturnDocument
+from tornado.testing import gen_test
+
+from motorengine import Document, StringField, IntField, DESCENDING
+from tests import AsyncTestCase
+
+
+class Job(Document):
+    __collection__ = "ModifyJob"
+
+    name = StringField()
+    status = StringField(db_field="s", default="pending")
+    priority = IntField(default=0)
+    attempts = IntField(default=0)
+
+
+class TestModifyOptions(AsyncTestCase):
+    def test_modify_options(self):
+        expect(Job.objects.get_modify_options()).to_be_like({
+            'projection': None, 'upsert': False, 'return_document': ReturnDocument.AFTER,
+        })
+
+        options = Job.objects.only("name").order_by("status").get_modify_options(new=False, upsert=True)
+        expect(options['projection']).to_equal({'name': True})
+        expect(options['return_document']).to_equal(ReturnDocument.BEFORE)
+        expect(options['upsert']).to_be_true()
+        expect(options['sort']).to_equal([('s', 1)])
+
+    def test_sort_overrides_order_by(self):
+        options = Job.objects.order_by("name").get_modify_options(sort=[(Job.status, DESCENDING), ("priority", 1)])
+
+        expect(options['sort']).to_equal([('s', DESCENDING), ('priority', 1)])
+
+    def test_invalid_sort_field(self):
+        try:
+            Job.objects.get_sort([("invalid", 1)])
+        except ValueError:
+            err = sys.exc_info()[1]
+            expect(err).to_have_an_error_message_of("Invalid sort field 'invalid': Field not found in 'Job'.")
+        else:
+            assert False, "Should not have gotten this far"
+
+    def test_reload_from(self):
+        job = Job.from_son({'_id': ObjectId(), 'name': 'a', 's': 'pending'})
+        job.name = 'changed'
+
+        job._reload_from(Job.from_son({'_id': job._id, 'name': 'b', 's': 'done'}))
+
+        expect(job.name).to_equal('b')
+        expect(job.status).to_equal('done')
+        expect(job._changed_fields).to_be_empty()
+
+    def test_cant_reload_unsaved_document(self):
+        try:
+            Job.objects.reload(Job(name="a"), callback=lambda document: None)
+        except ValueError:
+            err = sys.exc_info()[1]
+            expect(str(err)).to_include("must be saved before it can be reloaded")
+        else:
+            assert False, "Should not have gotten this far"
+
+
+class TestModify(AsyncTestCase):
+    def setUp(self):
+        super(TestModify, self).setUp()
+        self.drop_coll("ModifyJob")
+
+    @gen_test
+    def test_can_modify_the_first_document(self):
+        yield Job.objects.create(name="low", priority=1)
+        yield Job.objects.create(name="high", priority=5)
+
+        job = yield Job.objects.filter(status="pending").modify(
+            set__status="running", inc__attempts=1, sort=[(Job.priority, DESCENDING)]
+        )
+        expect(job.name).to_equal("high")
+        expect(job.status).to_equal("running")
+        expect(job.attempts).to_equal(1)
+
+        job = yield Job.objects.filter(status="pending").modify({Job.status: "running"}, new=False)
+        expect(job.name).to_equal("low")
+        expect(job.status).to_equal("pending")
+
+        job = yield Job.objects.filter(status="pending").modify(set__status="running")
+        expect(job).to_be_null()
+
+    @gen_test
+    def test_can_modify_with_projection_and_upsert(self):
+        job = yield Job.objects.filter(name="new").only("attempts").modify(inc__attempts=2, upsert=True)
+
+        expect(job.attempts).to_equal(2)
+        expect(job.is_partly_loaded).to_be_true()
+
+        count = yield Job.objects.count()
+        expect(count).to_equal(1)
+
+    @gen_test
+    def test_can_reload_document(self):
+        job = yield Job.objects.create(name="job")
+        yield Job.objects.filter(name="job").update(set__status="done")
+
+        job.name = "changed"
+        reloaded = yield job.reload()
+
+        expect(reloaded).to_equal(job)
+        expect(job.name).to_equal("job")
+        expect(job.status).to_equal("done")
+
+        yield job.delete()
+        reloaded = yield job.reload()
+        expect(reloaded).to_be_null()
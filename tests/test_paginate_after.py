@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+from bson.objectid import ObjectId
+from preggy import expect
+from tornado.testing import gen_test
+
+from motorengine import Document, StringField, IntField, ASCENDING, DESCENDING
+from tests import AsyncTestCase
+
+
+class Entry(Document):
+    __collection__ = 'paginate_after_entries'
+
+    score = IntField()
+    title = StringField()
+
+
+class TestPaginateAfterQuery(AsyncTestCase):
+    def test_sort_uses_id_as_tiebreaker(self):
+        expect(Entry.objects.get_keyset_sort()).to_be_like([('_id', 1)])
+
+        queryset = Entry.objects.order_by(Entry.score, direction=DESCENDING)
+        expect(queryset.get_keyset_sort()).to_be_like([('score', DESCENDING), ('_id', DESCENDING)])
+
+    def test_builds_range_filters_for_compound_sort(self):
+        queryset = Entry.objects.order_by(Entry.score, direction=DESCENDING).order_by(Entry.title)
+        sort = queryset.get_keyset_sort()
+        entry_id = ObjectId()
+
+        query = queryset.get_keyset_query(sort, [10, "b", entry_id])
+
+        expect(query).to_be_like({'$or': [
+            {'$or': [{'score': {'$lt': 10}}, {'score': None}]},
+            {'score': 10, 'title': {'$gt': "b"}},
+            {'score': 10, 'title': "b", '_id': {'$gt': entry_id}},
+        ]})
+
+    def test_builds_range_filters_for_null_keys(self):
+        entry_id = ObjectId()
+
+        queryset = Entry.objects.order_by(Entry.score)
+        query = queryset.get_keyset_query(queryset.get_keyset_sort(), [None, entry_id])
+
+        expect(query).to_be_like({'$or': [
+            {'score': {'$ne': None}},
+            {'score': None, '_id': {'$gt': entry_id}},
+        ]})
+
+        queryset = Entry.objects.order_by(Entry.score, direction=DESCENDING)
+        query = queryset.get_keyset_query(queryset.get_keyset_sort(), [None, entry_id])
+
+        expect(query).to_be_like({'score': None, '_id': {'$lt': entry_id}})
+
+    def test_combines_filters_with_key_of_last_document(self):
+        queryset = Entry.objects.filter(title="a").order_by(Entry.score)
+        sort = queryset.get_keyset_sort()
+        entry = Entry(score=3, title="a")
+        entry._id = ObjectId()
+
+        query = queryset.get_page_query(entry, sort)
+
+        expect(query).to_be_like({'$and': [
+            {'title': "a"},
+            {'$or': [{'score': {'$gt': 3}}, {'score': 3, '_id': {'$gt': entry._id}}]},
+        ]})
+
+    def test_page_token_round_trip(self):
+        queryset = Entry.objects.order_by(Entry.score)
+        sort = queryset.get_keyset_sort()
+        entry_id = ObjectId()
+
+        docs, token = queryset.get_page([
+            {'_id': ObjectId(), 'score': 1},
+            {'_id': entry_id, 'score': 2},
+            {'_id': ObjectId(), 'score': 3},
+        ], 2, sort)
+
+        expect(docs).to_length(2)
+        expect(queryset.decode_page_token(sort, token)).to_equal([2, entry_id])
+
+        docs, token = queryset.get_page([{'_id': entry_id, 'score': 2}], 2, sort)
+        expect(token).to_be_null()
+
+    def test_invalid_page_tokens(self):
+        queryset = Entry.objects.order_by(Entry.score)
+        sort = queryset.get_keyset_sort()
+        token = Entry.objects.encode_page_token(Entry.objects.get_keyset_sort(), [ObjectId()])
+
+        with expect.error_to_happen(ValueError):
+            queryset.decode_page_token(sort, "invalid")
+
+        with expect.error_to_happen(
+            ValueError, message="Invalid pagination token '%s': The token was created for a different order." % token
+        ):
+            queryset.decode_page_token(sort, token)
+
+        with expect.error_to_happen(ValueError):
+            queryset.get_page_query([1], sort)
+
+
+class TestPaginateAfter(AsyncTestCase):
+    def setUp(self):
+        super(TestPaginateAfter, self).setUp()
+        self.drop_coll(Entry.__collection__)
+
+    @gen_test
+    def test_can_paginate_with_compound_sort(self):
+        yield Entry.objects.bulk_insert([
+            Entry(score=index % 3, title="entry %02d" % index) for index in range(10)
+        ])
+
+        queryset = Entry.objects.order_by(Entry.score, direction=DESCENDING).order_by(Entry.title)
+        expected = yield queryset.find_all()
+
+        titles = []
+        page = yield queryset.paginate_after(None, 4)
+        titles.extend([entry.title for entry in page.items])
+
+        while page.next is not None:
+            page = yield queryset.paginate_after(page.next, 4)
+            titles.extend([entry.title for entry in page.items])
+
+        expect(titles).to_equal([entry.title for entry in expected])
+
+    @gen_test
+    def test_can_paginate_on_sparse_sort_field(self):
+        yield Entry.objects.bulk_insert([
+            Entry(score=index if index % 2 else None, title="entry %02d" % index) for index in range(9)
+        ])
+
+        for direction in (ASCENDING, DESCENDING):
+            queryset = Entry.objects.order_by(Entry.score, direction=direction)
+            expected = yield queryset.find_all()
+
+            entries = []
+            page = yield queryset.paginate_after(None, 2)
+            entries.extend(page.items)
+
+            while page.next is not None:
+                page = yield queryset.paginate_after(page.next, 2)
+                entries.extend(page.items)
+
+            # entries without score are ordered by _id, not in the order of find_all
+            expect(sorted([entry.title for entry in entries])).to_equal(["entry %02d" % index for index in range(9)])
+            expect([entry.score for entry in entries]).to_equal([entry.score for entry in expected])
+
+    @gen_test
+    def test_can_paginate_after_document(self):
+        yield Entry.objects.bulk_insert([Entry(score=index, title="entry") for index in range(5)])
+
+        queryset = Entry.objects.filter(score__gte=1).order_by(Entry.score)
+        page = yield queryset.paginate_after(None, 2)
+        expect([entry.score for entry in page.items]).to_equal([1, 2])
+
+        page = yield queryset.paginate_after(page.items[-1], 5)
+        expect([entry.score for entry in page.items]).to_equal([3, 4])
+        expect(page.next).to_be_null()
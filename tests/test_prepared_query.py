@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+
+from preggy import expect
+from tornado.testing import gen_test
+
+from motorengine import Document, StringField, IntField, DateTimeField, Q, Param
+from tests import AsyncTestCase
+
+
+class Member(Document):
+    __collection__ = 'prepared_query_members'
+
+    name = StringField(db_field="n")
+    age = IntField()
+    joined_at = DateTimeField()
+
+
+class TestPreparedQueryCompilation(AsyncTestCase):
+    def test_prepared_query_converts_params(self):
+        prepared = Member.objects.prepare(Q(name=Param('name'), age__gt=Param('min_age')))
+
+        expect(prepared.param_names).to_equal(frozenset(['name', 'min_age']))
+        expect(prepared.get_query(name="a", min_age=10)).to_be_like({'n': 'a', 'age': {'$gt': 10}})
+        expect(prepared.get_query(name="b", min_age=20)).to_be_like({'n': 'b', 'age': {'$gt': 20}})
+
+    def test_prepared_query_with_combinations_and_fixed_values(self):
+        prepared = Member.objects.filter(age__lt=100).prepare(
+            (Q(name=Param('name')) | ~Q(age__in=Param('ages'))) & Q(joined_at__gte=Param('since'))
+        )
+        since = datetime(2016, 1, 1)
+
+        expect(prepared.get_query(name="a", ages=[1, 2], since=since)).to_be_like({'$and': [
+            {'age': {'$lt': 100}},
+            {'$or': [{'n': 'a'}, {'age': {'$not': {'$in': [1, 2]}}}]},
+            {'joined_at': {'$gte': since}},
+        ]})
+
+    def test_prepared_query_validates_params(self):
+        prepared = Member.objects.prepare(name=Param('name'))
+
+        with expect.error_to_happen(ValueError, message="Missing values for parameters: name."):
+            prepared.get_query()
+
+        with expect.error_to_happen(ValueError, message="Unknown parameters: other."):
+            prepared.get_query(name="a", other="b")
+
+        with expect.error_to_happen(ValueError, message="Invalid parameter name 'callback': The name is reserved."):
+            Param('callback')
+
+    def test_bound_queryset_keeps_settings(self):
+        prepared = Member.objects.only('name').order_by('age').limit(5).prepare(name=Param('name'))
+        queryset = prepared.bind(name="a")
+
+        expect(queryset.get_query_from_filters(queryset._filters)).to_equal({'n': 'a'})
+        expect(queryset.get_projection()).to_equal(prepared.projection)
+        expect(queryset._order_fields).to_equal([('age', 1)])
+        expect(queryset._limit).to_equal(5)
+        expect(prepared.queryset._filters).not_to_equal(queryset._filters)
+
+
+class TestPreparedQuery(AsyncTestCase):
+    def setUp(self):
+        super(TestPreparedQuery, self).setUp()
+        self.drop_coll(Member.__collection__)
+
+    @gen_test
+    def test_can_run_prepared_queries(self):
+        yield Member.objects.bulk_insert([Member(name="member %d" % (index % 2), age=index) for index in range(10)])
+
+        prepared = Member.objects.order_by('age').prepare(Q(name=Param('name'), age__gt=Param('min_age')))
+
+        members = yield prepared.find_all(name="member 0", min_age=3)
+        expect([member.age for member in members]).to_equal([4, 6, 8])
+
+        members = yield prepared.find_all(name="member 1", min_age=6)
+        expect([member.age for member in members]).to_equal([7, 9])
+
+        count = yield prepared.count(name="member 1", min_age=0)
+        expect(count).to_equal(5)
+
+        member = yield prepared.get(name="member 1", min_age=8)
+        expect(member.age).to_equal(9)
+
+        member = yield prepared.get(name="member 1", min_age=9)
+        expect(member).to_be_null()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+
+from preggy import expect
+
+from motorengine import (
+    Document, StringField, ListField, IntField, DateTimeField, Q, EmbeddedDocumentField
+)
+from motorengine.query_builder.cache import QueryCache, query_cache, get_query_shape
+from tests import AsyncTestCase
+
+
+class Address(Document):
+    city = StringField(db_field="c")
+
+
+class Customer(Document):
+    name = StringField(db_field="n")
+    age = IntField()
+    created_at = DateTimeField()
+    address = EmbeddedDocumentField(Address, db_field="addr")
+    numbers = ListField(IntField())
+
+
+QUERIES = [
+    lambda: Q(name="Test"),
+    lambda: Q(name__lte="Test", age__gt=10),
+    lambda: Q(address__city__startswith="Rio"),
+    lambda: Q(numbers=[10]),
+    lambda: Q(created_at__gte=datetime(2016, 1, 1)),
+    lambda: Q(age__in=[1, 2, 3]),
+    lambda: Q(name__is_null=True),
+    lambda: Q(name__is_null=False),
+    lambda: Q({"n": {"$exists": True}}),
+    lambda: Q(age__gt=1) & Q(age__lt=10),
+    lambda: Q(name="Someone") & Q(age__gt=10),
+    lambda: Q(name="Someone") | Q(name="Else"),
+    lambda: (Q(address__city__lte="Test") & Q(name="Someone")) | Q(name="Else"),
+    lambda: Q(age=1) & ((Q(address__city="Test") & Q(name="Someone")) | Q(name="Else")),
+    lambda: ~Q(age__in=[1, 2]) & Q(name="Someone"),
+    lambda: ~(Q(name="Someone") | Q(age=3)) & Q(age=4),
+    lambda: Q(unknown_field="value"),
+]
+
+
+class TestQueryCache(AsyncTestCase):
+    def setUp(self):
+        super(TestQueryCache, self).setUp()
+        query_cache.clear()
+
+    def test_cached_queries_are_the_same_as_compiled_queries(self):
+        expected_queries = [get_query().compile_query(Customer) for get_query in QUERIES]
+        query_cache.clear()
+
+        for get_query, expected in zip(QUERIES, expected_queries):
+            expect(get_query().to_query(Customer)).to_be_like(expected)
+            expect(get_query().to_query(Customer)).to_be_like(expected)
+
+        expect(query_cache.misses).to_equal(len(QUERIES) - 1)  # is_null has the same shape twice
+        expect(query_cache.hits).to_equal(len(QUERIES) + 1)
+
+    def test_queries_with_same_shape_use_the_same_plan(self):
+        expect(Q(name="a", age__gt=1).to_query(Customer)).to_be_like({"n": "a", "age": {"$gt": 1}})
+        expect(Q(age__gt=2, name="b").to_query(Customer)).to_be_like({"n": "b", "age": {"$gt": 2}})
+        expect(Q(city="c").to_query(Address)).to_be_like({"c": "c"})
+
+        expect(query_cache.misses).to_equal(2)
+        expect(query_cache.hits).to_equal(1)
+        expect(query_cache).to_length(2)
+
+    def test_query_shape(self):
+        expect(get_query_shape(Q(name="a") | Q(age=2))).to_equal(
+            get_query_shape(Q(name="b") | Q(age=3))
+        )
+        expect(get_query_shape(Q(name="a") | Q(age=2))).not_to_equal(
+            get_query_shape(Q(name="a") & Q(age=2))
+        )
+
+    def test_evicts_least_recently_used_plans(self):
+        cache = QueryCache(max_size=2)
+
+        cache.to_query(Customer, Q(name="a"))
+        cache.to_query(Customer, Q(age=1))
+        cache.to_query(Customer, Q(name="b"))
+        cache.to_query(Customer, Q(address__city="c"))
+
+        expect(cache).to_length(2)
+        expect(cache.to_query(Customer, Q(name="d"))).to_be_like({"n": "d"})
+        expect(cache.hits).to_equal(2)
+        expect(cache.misses).to_equal(3)
+
+    def test_disabled_cache(self):
+        cache = QueryCache(max_size=0)
+
+        expect(cache.to_query(Customer, Q(name="a"))).to_be_null()
+        expect(cache).to_length(0)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+from bson.objectid import ObjectId
+from preggy import expect
+from tornado.testing import gen_test
+
+from motorengine import (
+    Document, StringField, ListField, EmbeddedDocumentField, ReferenceField
+)
+from tests import AsyncTestCase
+
+
+class Author(Document):
+    __collection__ = 'select_related_authors'
+
+    name = StringField(required=True)
+
+
+class Comment(Document):
+    text = StringField(required=True)
+    user = ReferenceField(reference_document_type=Author)
+
+
+class Post(Document):
+    __collection__ = 'select_related_posts'
+
+    title = StringField(required=True)
+    author = ReferenceField(reference_document_type=Author)
+    editors = ListField(ReferenceField(reference_document_type=Author))
+    comments = ListField(EmbeddedDocumentField(embedded_document_type=Comment))
+
+
+class TestSelectRelatedPaths(AsyncTestCase):
+    def test_select_related_validates_paths(self):
+        queryset = Post.objects.select_related("author", "editors", "comments.user", "author")
+        expect(queryset._select_related).to_be_like([("author", ), ("editors", ), ("comments", "user")])
+
+        with expect.error_to_happen(
+            ValueError,
+            message="Invalid select_related field 'invalid': Field 'invalid' not found in 'Post'."
+        ):
+            Post.objects.select_related("invalid")
+
+        with expect.error_to_happen(
+            ValueError,
+            message="Invalid select_related field 'title': 'title' is not a reference field."
+        ):
+            Post.objects.select_related("title")
+
+        with expect.error_to_happen(
+            ValueError,
+            message="Invalid select_related field 'author.name': 'author' is not an embedded document field."
+        ):
+            Post.objects.select_related("author.name")
+
+    def test_find_related_references_across_documents(self):
+        author_id = ObjectId()
+        posts = [
+            Post.from_son({
+                "title": "post %d" % i, "author": author_id, "editors": [author_id, ObjectId()],
+                "comments": [{"text": "comment", "user": ObjectId()}, {"text": "comment"}]
+            })
+            for i in range(3)
+        ]
+
+        queryset = Post.objects.select_related("author", "comments.user")
+        references = queryset.find_related_references(posts)
+
+        expect(references).to_length(6)
+
+        batches = posts[0].get_reference_batches(references)
+        expect(batches).to_length(1)
+        expect(batches[0][3]).to_length(4)
+
+        references = queryset.find_related_references(posts, load_all_references=True)
+        expect(references).to_length(15)
+
+
+class TestSelectRelated(AsyncTestCase):
+    def setUp(self):
+        super(TestSelectRelated, self).setUp()
+        self.drop_coll(Author.__collection__)
+        self.drop_coll(Post.__collection__)
+
+    @gen_test
+    def test_can_select_related_on_find_all(self):
+        author = yield Author.objects.create(name="Bernardo")
+        editor = yield Author.objects.create(name="Rafael")
+
+        for i in range(3):
+            yield Post.objects.create(
+                title="post %d" % i, author=author, editors=[editor, author],
+                comments=[Comment(text="comment", user=editor)]
+            )
+
+        posts = yield Post.objects.select_related(
+            "author", "editors", "comments.user"
+        ).order_by("title").find_all()
+
+        expect(posts).to_length(3)
+
+        for post in posts:
+            expect(post.author.name).to_equal("Bernardo")
+            expect([editor.name for editor in post.editors]).to_be_like(["Rafael", "Bernardo"])
+            expect(post.comments[0].user.name).to_equal("Rafael")
+
+        # referenced documents are only loaded once
+        expect(posts[0].author).to_equal(posts[1].author)
+
+    @gen_test
+    def test_can_select_related_on_get(self):
+        author = yield Author.objects.create(name="Bernardo")
+        post = yield Post.objects.create(title="post", author=author)
+
+        post = yield Post.objects.select_related("author").get(post._id)
+
+        expect(post.author.name).to_equal("Bernardo")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from preggy import expect
+
+from motorengine import (
+    Document, StringField, IntField, ListField, EmbeddedDocumentField, DateTimeField
+)
+from motorengine import serializers
+from tests import AsyncTestCase
+
+
+class SerializedEmbeddedDocument(Document):
+    title = StringField(db_field="db_title")
+
+
+class SerializedDocument(Document):
+    name = StringField(db_field="db_name")
+    age = IntField()
+    nickname = StringField(sparse=True)
+    tags = ListField(StringField())
+    embedded = EmbeddedDocumentField(SerializedEmbeddedDocument)
+    items = ListField(EmbeddedDocumentField(SerializedEmbeddedDocument))
+    created = DateTimeField(auto_now_on_insert=True)
+
+
+class TestSerializers(AsyncTestCase):
+    def setUp(self):
+        super(TestSerializers, self).setUp()
+        serializers.COMPILE_SERIALIZERS = True
+
+    def tearDown(self):
+        serializers.COMPILE_SERIALIZERS = True
+        super(TestSerializers, self).tearDown()
+
+    def get_document(self):
+        return SerializedDocument(
+            name="Bernardo", age=32, tags=["a", "b"],
+            embedded=SerializedEmbeddedDocument(title="embedded"),
+            items=[SerializedEmbeddedDocument(title="item")]
+        )
+
+    def test_compiled_to_son_matches_generic(self):
+        doc = self.get_document()
+        compiled = doc.to_son()
+
+        serializers.COMPILE_SERIALIZERS = False
+        expect(compiled).to_be_like(doc.to_son())
+
+        expect(compiled).not_to_include("nickname")
+        expect(compiled["db_name"]).to_equal("Bernardo")
+        expect(compiled["embedded"]).to_be_like({"db_title": "embedded"})
+        expect(compiled["items"]).to_be_like([{"db_title": "item"}])
+
+    def test_compiled_to_son_includes_sparse_fields_with_value(self):
+        doc = self.get_document()
+        doc.nickname = "heynemann"
+
+        expect(doc.to_son()["nickname"]).to_equal("heynemann")
+
+    def test_compiled_to_son_includes_dynamic_fields(self):
+        doc = self.get_document()
+        doc.other = "value"
+
+        expect(doc.to_son()["_other"]).to_equal("value")
+
+    def test_compiled_from_son_matches_generic(self):
+        son = self.get_document().to_son()
+
+        compiled = SerializedDocument.from_son(dict(son))
+        serializers.COMPILE_SERIALIZERS = False
+        generic = SerializedDocument.from_son(dict(son))
+
+        expect(compiled.to_son()).to_be_like(generic.to_son())
+        expect(compiled._changed_fields).to_be_empty()
+        expect(compiled.name).to_equal("Bernardo")
+        expect(compiled.embedded).to_be_instance_of(SerializedEmbeddedDocument)
+        expect(compiled.embedded.title).to_equal("embedded")
+        expect(compiled.items[0].title).to_equal("item")
+
+    def test_compiled_from_son_loads_unknown_keys(self):
+        doc = SerializedDocument.from_son({"db_name": "Bernardo", "extra": 1})
+
+        expect(doc.name).to_equal("Bernardo")
+        expect(doc.extra).to_equal(1)
+
+    def test_serializers_are_generated_per_class(self):
+        SerializedDocument.compile_serializers()
+
+        expect(SerializedDocument._compiled_to_son.__source__).to_include("data['db_name'] = value")
+        expect(SerializedDocument._compiled_to_son.__source__).to_include("if value is not None:")
+        expect(SerializedEmbeddedDocument._compiled_to_son).not_to_equal(SerializedDocument._compiled_to_son)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+from datetime import datetime
+
+from preggy import expect
+from tornado.testing import gen_test
+
+from motorengine import (
+    Document, StringField, IntField, ListField, EmbeddedDocumentField, DateTimeField, FloatField, Q
+)
+from motorengine.query_builder.transform import transform_update
+from tests import AsyncTestCase
+
+
+class Author(Document):
+    name = StringField(db_field="n")
+    born = DateTimeField()
+
+
+class Limits(Document):
+    value = IntField(db_field="v")
+
+
+class Quota(Document):
+    max = EmbeddedDocumentField(Limits)
+    limit = IntField()
+    numbers = ListField(IntField())
+
+
+class Article(Document):
+    __collection__ = "UpdateOperatorsArticle"
+
+    title = StringField()
+    views = IntField(db_field="v", default=0)
+    rating = FloatField()
+    tags = ListField(StringField())
+    authors = ListField(EmbeddedDocumentField(Author))
+    author = EmbeddedDocumentField(Author)
+    updated_at = DateTimeField()
+
+
+class TestTransformUpdate(AsyncTestCase):
+    def test_set_is_the_default_operator(self):
+        expect(transform_update(Article, title="new", set__views=2)).to_equal({
+            "$set": {"title": "new", "v": 2}
+        })
+
+    def test_numeric_operators(self):
+        expect(transform_update(Article, inc__views=2, mul__rating=1.5)).to_equal({
+            "$inc": {"v": 2},
+            "$mul": {"rating": 1.5},
+        })
+        expect(transform_update(Article, dec__views=3)).to_equal({"$inc": {"v": -3}})
+        expect(transform_update(Article, min__views=1, max__updated_at=datetime(2020, 1, 2))).to_equal({
+            "$min": {"v": 1},
+            "$max": {"updated_at": datetime(2020, 1, 2)},
+        })
+
+    def test_list_operators(self):
+        expect(transform_update(Article, push__tags="python", pull__tags="java")).to_equal({
+            "$push": {"tags": "python"},
+            "$pull": {"tags": "java"},
+        })
+        expect(transform_update(Article, push_all__tags=["a", "b"], pull_all__tags=("c", ))).to_equal({
+            "$push": {"tags": {"$each": ["a", "b"]}},
+            "$pullAll": {"tags": ["c"]},
+        })
+        expect(transform_update(Article, add_to_set__tags="a")).to_equal({"$addToSet": {"tags": "a"}})
+        expect(transform_update(Article, add_to_set__tags=["a", "b"])).to_equal({
+            "$addToSet": {"tags": {"$each": ["a", "b"]}}
+        })
+        expect(transform_update(Article, pop__tags=-1)).to_equal({"$pop": {"tags": -1}})
+
+    def test_pull_list_of_values(self):
+        expect(transform_update(Quota, pull__numbers=[1, 2])).to_equal({"$pull": {"numbers": {"$in": [1, 2]}}})
+        expect(transform_update(Article, pull__tags=("a", "b"))).to_equal({"$pull": {"tags": {"$in": ["a", "b"]}}})
+
+    def test_fields_named_like_operators(self):
+        expect(transform_update(Quota, max__value=3)).to_equal({"$set": {"max.v": 3}})
+        expect(transform_update(Quota, max__limit=3)).to_equal({"$max": {"limit": 3}})
+        expect(transform_update(Quota, set__max__value=3)).to_equal({"$set": {"max.v": 3}})
+
+    def test_values_are_converted_by_their_fields(self):
+        expect(transform_update(Article, push__authors=Author(name="Bernardo"))).to_equal({
+            "$push": {"authors": {"n": "Bernardo", "born": None}}
+        })
+
+    def test_embedded_fields(self):
+        expect(transform_update(Article, set__author__name="Bernardo")).to_equal({
+            "$set": {"author.n": "Bernardo"}
+        })
+
+    def test_unset_and_current_date(self):
+        expect(transform_update(Article, unset__title=True, current_date__updated_at=True)).to_equal({
+            "$unset": {"title": 1},
+            "$currentDate": {"updated_at": True},
+        })
+        expect(transform_update(Article, current_date__updated_at="timestamp")).to_equal({
+            "$currentDate": {"updated_at": {"$type": "timestamp"}},
+        })
+
+    def test_invalid_sub_property(self):
+        try:
+            transform_update(Article, set__title__first="a")
+        except ValueError:
+            err = sys.exc_info()[1]
+            expect(err).to_have_an_error_message_of(
+                "Invalid update 'set__title__first': sub-properties can only be updated in embedded document fields."
+            )
+        else:
+            assert False, "Should not have gotten this far"
+
+    def test_update_document(self):
+        expect(Article.objects.get_update_document({Article.title: "new"}, inc__views=1)).to_equal({
+            "$set": {"title": "new"},
+            "$inc": {"v": 1},
+        })
+
+    def test_update_document_requires_a_change(self):
+        try:
+            Article.objects.get_update_document()
+        except ValueError:
+            err = sys.exc_info()[1]
+            expect(err).to_have_an_error_message_of(
+                "Either a definition or update operators must be provided to update."
+            )
+        else:
+            assert False, "Should not have gotten this far"
+
+    def test_bulk_update_with_operators(self):
+        request = Article.objects.bulk.update(Q(title="a"), inc__views=1).operations[0].request
+
+        expect(request._doc).to_equal({"$inc": {"v": 1}})
+
+
+class TestUpdateOperators(AsyncTestCase):
+    def setUp(self):
+        super(TestUpdateOperators, self).setUp()
+        self.drop_coll("UpdateOperatorsArticle")
+
+    @gen_test
+    def test_can_update_with_operators(self):
+        yield Article.objects.create(title="first", tags=["a"])
+        yield Article.objects.create(title="second", tags=["a"])
+
+        result = yield Article.objects.filter(title="first").update(
+            inc__views=2, push__tags="b", set__author=Author(name="Bernardo")
+        )
+        expect(result.count).to_equal(1)
+
+        yield Article.objects.update(inc__views=1, add_to_set__tags=["a", "c"])
+
+        first = yield Article.objects.get(title="first")
+        expect(first.views).to_equal(3)
+        expect(first.tags).to_equal(["a", "b", "c"])
+        expect(first.author.name).to_equal("Bernardo")
+
+        second = yield Article.objects.get(title="second")
+        expect(second.views).to_equal(1)
+        expect(second.tags).to_equal(["a", "c"])
+
+    @gen_test
+    def test_can_update_with_definition_and_operators(self):
+        yield Article.objects.create(title="first")
+
+        yield Article.objects.filter(title="first").update({Article.title: "other"}, dec__views=1)
+
+        article = yield Article.objects.get(title="other")
+        expect(article.views).to_equal(-1)